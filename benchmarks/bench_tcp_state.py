@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+TCP状态转换性能基准
+
+对客户端(主动打开/主动关闭)和服务端(被动打开/被动关闭)各走一遍完整的
+握手和挥手，统计每次状态转换的平均耗时；同样的事件序列也在改为享元单例
+之前的实现(legacy_tcp_state.py)上运行一遍，作为对比。
+
+用法: python benchmarks/bench_tcp_state.py [--cycles N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import legacy_tcp_state  # noqa: E402
+from tcp_simulation.core.tcp_state import CLOSED  # noqa: E402
+
+CLIENT_EVENTS = ("OPEN", "SYN_ACK", "CLOSE", "ACK", "FIN", "TIMEOUT")
+SERVER_EVENTS = ("LISTEN", "SYN", "ACK", "FIN", "CLOSE", "ACK")
+TRANSITIONS_PER_CYCLE = len(CLIENT_EVENTS) + len(SERVER_EVENTS)
+
+class NullContext:
+    """不真正发送报文的连接上下文"""
+    
+    __slots__ = ()
+    
+    def send(self, segment):
+        pass
+    
+    def create_syn_packet(self):
+        return None
+    
+    create_syn_ack_packet = create_ack_packet = create_fin_packet = create_syn_packet
+
+def run_cycle(context=NullContext()):
+    """走一遍客户端和服务端的完整状态机"""
+    state = CLOSED
+    for event in CLIENT_EVENTS:
+        state = state.on_event(context, event)
+    state = CLOSED
+    for event in SERVER_EVENTS:
+        state = state.on_event(context, event)
+    return state
+
+def run_legacy_cycle(context=NullContext()):
+    """在旧实现上走一遍同样的状态机，每次转换都新建状态对象"""
+    state = legacy_tcp_state.ClosedState(context)
+    for event in CLIENT_EVENTS:
+        state = state.on_event(event)
+    state = legacy_tcp_state.ClosedState(context)
+    for event in SERVER_EVENTS:
+        state = state.on_event(event)
+    return state
+
+def measure(cycles, cycle=run_cycle):
+    """返回每次状态转换的耗时(ns)，取5次重复中的最小值"""
+    best = min(timeit.repeat(cycle, number=cycles, repeat=5))
+    return best / cycles / TRANSITIONS_PER_CYCLE * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description="TCP状态转换性能基准")
+    parser.add_argument("--cycles", type=int, default=20000, help="每次计时的循环数")
+    args = parser.parse_args()
+    
+    current = measure(args.cycles)
+    legacy = measure(args.cycles, run_legacy_cycle)
+    print(f"每次状态转换: {current:.0f} ns (旧实现 {legacy:.0f} ns，{legacy / current:.1f}x)")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+改为享元单例之前的TCP状态实现，仅供 bench_tcp_state.py 对比
+
+每次状态转换都新建一个携带上下文和 PacketAnalyzer 的状态对象，转换逻辑为
+各状态类中的 if 分支。除导入路径外与原实现一致。
+"""
+
+from abc import ABC, abstractmethod
+from typing import Optional, List
+from scapy.all import IP
+from tcp_simulation.utils.packet_analyzer import PacketAnalyzer
+
+class TCPState(ABC):
+    """TCP状态基类
+    
+    handle_packet/get_next_state 供 TCPSimulation.run 按固定脚本推进；
+    on_event 供离线仿真中通信双方各自的状态机按事件推进，
+    此时上下文需提供 send 及 create_*_packet 方法。
+    """
+    
+    name = "UNKNOWN"
+    
+    def __init__(self, context):
+        self.context = context
+        self.packet_analyzer = PacketAnalyzer()
+    
+    @abstractmethod
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        """处理数据包"""
+        pass
+    
+    @abstractmethod
+    def get_next_state(self) -> 'TCPState':
+        """获取下一个状态"""
+        pass
+    
+    def on_event(self, event: str) -> 'TCPState':
+        """
+        处理事件并返回下一个状态，未定义的事件保持当前状态
+        
+        Args:
+            event: OPEN/LISTEN/CLOSE(本地操作)，SYN/SYN_ACK/ACK/FIN/RST(收到的报文)，
+                   TIMEOUT(TIME_WAIT超时)
+        """
+        if event == "RST":
+            return ClosedState(self.context)
+        return self
+
+class ClosedState(TCPState):
+    """关闭状态"""
+    
+    name = "CLOSED"
+    
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        # 发送SYN包
+        return self.context.create_syn_packet()
+    
+    def get_next_state(self) -> 'TCPState':
+        return ListenState(self.context)
+    
+    def on_event(self, event: str) -> 'TCPState':
+        if event == "OPEN":
+            self.context.send(self.context.create_syn_packet())
+            return SynSentState(self.context)
+        if event == "LISTEN":
+            return ListenState(self.context)
+        return self
+
+class ListenState(TCPState):
+    """监听状态"""
+    
+    name = "LISTEN"
+    
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        # 发送SYN-ACK包
+        return self.context.create_syn_ack_packet()
+    
+    def get_next_state(self) -> 'TCPState':
+        return SynReceivedState(self.context)
+    
+    def on_event(self, event: str) -> 'TCPState':
+        if event == "SYN":
+            self.context.send(self.context.create_syn_ack_packet())
+            return SynReceivedState(self.context)
+        if event == "CLOSE":
+            return ClosedState(self.context)
+        return self
+
+class SynSentState(TCPState):
+    """SYN已发送状态"""
+    
+    name = "SYN_SENT"
+    
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        # 等待SYN-ACK，无需发送
+        return None
+    
+    def get_next_state(self) -> 'TCPState':
+        return EstablishedState(self.context)
+    
+    def on_event(self, event: str) -> 'TCPState':
+        if event == "SYN_ACK":
+            self.context.send(self.context.create_ack_packet())
+            return EstablishedState(self.context)
+        if event in ("CLOSE", "RST"):
+            return ClosedState(self.context)
+        return self
+
+class SynReceivedState(TCPState):
+    """SYN已接收状态"""
+    
+    name = "SYN_RECEIVED"
+    
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        # 发送ACK包
+        return self.context.create_ack_packet()
+    
+    def get_next_state(self) -> 'TCPState':
+        return EstablishedState(self.context)
+    
+    def on_event(self, event: str) -> 'TCPState':
+        if event == "ACK":
+            return EstablishedState(self.context)
+        if event == "SYN":
+            # 重复的SYN，重发SYN-ACK
+            self.context.send(self.context.create_syn_ack_packet())
+            return self
+        return super().on_event(event)
+
+class EstablishedState(TCPState):
+    """已建立连接状态"""
+    
+    name = "ESTABLISHED"
+    
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        # 发送FIN包
+        return self.context.create_fin_packet()
+    
+    def get_next_state(self) -> 'TCPState':
+        return FinWait1State(self.context)
+    
+    def on_event(self, event: str) -> 'TCPState':
+        if event == "CLOSE":
+            self.context.send(self.context.create_fin_packet())
+            return FinWait1State(self.context)
+        if event == "FIN":
+            self.context.send(self.context.create_ack_packet())
+            return CloseWaitState(self.context)
+        if event == "SYN_ACK":
+            # 对端未收到握手的ACK而重传了SYN-ACK
+            self.context.send(self.context.create_ack_packet())
+            return self
+        return super().on_event(event)
+
+class FinWait1State(TCPState):
+    """等待FIN-1状态"""
+    
+    name = "FIN_WAIT_1"
+    
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        # 发送ACK包
+        return self.context.create_ack_packet()
+    
+    def get_next_state(self) -> 'TCPState':
+        return FinWait2State(self.context)
+    
+    def on_event(self, event: str) -> 'TCPState':
+        if event == "ACK":
+            return FinWait2State(self.context)
+        if event == "FIN":
+            # 双方同时关闭
+            self.context.send(self.context.create_ack_packet())
+            return ClosingState(self.context)
+        return super().on_event(event)
+
+class FinWait2State(TCPState):
+    """等待FIN-2状态"""
+    
+    name = "FIN_WAIT_2"
+    
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        # 发送FIN包
+        return self.context.create_fin_packet()
+    
+    def get_next_state(self) -> 'TCPState':
+        return TimeWaitState(self.context)
+    
+    def on_event(self, event: str) -> 'TCPState':
+        if event == "FIN":
+            self.context.send(self.context.create_ack_packet())
+            return TimeWaitState(self.context)
+        return super().on_event(event)
+
+class ClosingState(TCPState):
+    """同时关闭状态"""
+    
+    name = "CLOSING"
+    
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        # 等待对端确认FIN，无需发送
+        return None
+    
+    def get_next_state(self) -> 'TCPState':
+        return TimeWaitState(self.context)
+    
+    def on_event(self, event: str) -> 'TCPState':
+        if event == "ACK":
+            return TimeWaitState(self.context)
+        if event == "FIN":
+            self.context.send(self.context.create_ack_packet())
+            return self
+        return super().on_event(event)
+
+class TimeWaitState(TCPState):
+    """等待时间状态"""
+    
+    name = "TIME_WAIT"
+    
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        # 发送ACK包
+        return self.context.create_ack_packet()
+    
+    def get_next_state(self) -> 'TCPState':
+        return ClosedState(self.context) 
+    
+    def on_event(self, event: str) -> 'TCPState':
+        if event == "TIMEOUT":
+            return ClosedState(self.context)
+        if event == "FIN":
+            # 对端未收到最后的ACK而重传了FIN
+            self.context.send(self.context.create_ack_packet())
+            return self
+        return super().on_event(event)
+
+class CloseWaitState(TCPState):
+    """等待关闭状态(被动关闭方已确认对端FIN)"""
+    
+    name = "CLOSE_WAIT"
+    
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        # 发送FIN包
+        return self.context.create_fin_packet()
+    
+    def get_next_state(self) -> 'TCPState':
+        return LastAckState(self.context)
+    
+    def on_event(self, event: str) -> 'TCPState':
+        if event == "CLOSE":
+            self.context.send(self.context.create_fin_packet())
+            return LastAckState(self.context)
+        if event == "FIN":
+            self.context.send(self.context.create_ack_packet())
+            return self
+        return super().on_event(event)
+
+class LastAckState(TCPState):
+    """最后确认状态"""
+    
+    name = "LAST_ACK"
+    
+    def handle_packet(self, packet: IP) -> Optional[IP]:
+        # 等待对端确认FIN，无需发送
+        return None
+    
+    def get_next_state(self) -> 'TCPState':
+        return ClosedState(self.context)
+    
+    def on_event(self, event: str) -> 'TCPState':
+        if event == "ACK":
+            return ClosedState(self.context)
+        if event == "FIN":
+            self.context.send(self.context.create_ack_packet())
+            return self
+        return super().on_event(event)
\ No newline at end of file
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+性能基准套件
+
+覆盖数据包构造、TCP状态转换、观察者通知、报文分析和pcap读写，每项给出
+单次操作的耗时(ns)。整个套件重复运行若干遍，每项取各遍的中位数，并记录
+各遍之间的相对波动。结果可以保存为JSON基线，之后的运行与基线比较，耗时
+增加超过容差的项目标记为回退；容差取阈值与两次运行测得的波动之和中的较大者。
+
+基线与机器相关，不随代码提交，比较前应在同一台机器上(例如先检出目标分支)生成。
+
+用法:
+    python benchmarks/suite.py                          # 运行全部基准
+    python benchmarks/suite.py --save benchmarks/baseline.json
+    python benchmarks/suite.py --compare benchmarks/baseline.json --threshold 0.15 --runs 5
+    python benchmarks/suite.py --filter pcap --quick
+"""
+import argparse
+import collections
+import json
+import os
+import platform
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from scapy.all import IP
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_tcp_state import TRANSITIONS_PER_CYCLE, run_cycle, run_legacy_cycle  # noqa: E402
+from tcp_simulation.core.observers import PacketObserver, Subject  # noqa: E402
+from tcp_simulation.core.engine import EventScheduler  # noqa: E402
+from tcp_simulation.core.loadgen import SynLoadGenerator  # noqa: E402
+from tcp_simulation.core.packet_factory import PacketFactory  # noqa: E402
+from tcp_simulation.core.responder import Responder  # noqa: E402
+from tcp_simulation.core.scenario import compile_scenario  # noqa: E402
+from tcp_simulation.core.segment import ACK, SYN, Segment  # noqa: E402
+from tcp_simulation.utils.headers import parse_tcp_header  # noqa: E402
+from tcp_simulation.utils.packet_analyzer import PacketAnalyzer  # noqa: E402
+from tcp_simulation.utils.pcap import PcapWriter  # noqa: E402
+from tcp_simulation.utils.pcap_reader import PcapReader, np, read_tcp_columns  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_THRESHOLD = 0.15
+DEFAULT_RUNS = 3
+PCAP_PACKETS = 10000
+
+# 名称 -> (准备函数, 计量单位)；准备函数返回(被计时的函数, 每次调用完成的操作数)
+BENCHMARKS: Dict[str, Tuple[Callable[[], Tuple[Callable[[], Any], int]], str]] = {}
+
+def benchmark(name: str, unit: str = "op"):
+    """注册一个基准"""
+    def register(setup):
+        BENCHMARKS[name] = (setup, unit)
+        return setup
+    return register
+
+def _tcp_args(flags: str = "S") -> Tuple[Any, ...]:
+    return ("192.168.1.100", "192.168.1.101", 12345, 80, flags, 1000, 0)
+
+@benchmark("packet_factory.create_tcp_packet", "packet")
+def bench_create_packet():
+    args = _tcp_args()
+    return (lambda: PacketFactory.create_tcp_packet(*args)), 1
+
+@benchmark("packet_factory.create_tcp_packet[template]", "packet")
+def bench_create_packet_template():
+    args = _tcp_args()
+    
+    def create():
+        PacketFactory.template_mode = True
+        try:
+            return PacketFactory.create_tcp_packet(*args)
+        finally:
+            PacketFactory.template_mode = False
+    return create, 1
+
+@benchmark("packet_factory.create_tcp_bytes", "packet")
+def bench_create_bytes():
+    args = _tcp_args()
+    return (lambda: PacketFactory.create_tcp_bytes(*args)), 1
+
+@benchmark("packet_factory.create_tcp_header[1460B payload]", "packet")
+def bench_create_header_payload():
+    payload = memoryview(bytes(1460))
+    args = _tcp_args("PA")
+    return (lambda: PacketFactory.create_tcp_header(*args, payload)), 1
+
+@benchmark("scenario.run[handshake+teardown]", "scenario")
+def bench_scenario():
+    scenario = compile_scenario({"steps": [
+        {"send": "S"}, {"expect": "SA"}, {"send": "A"},
+        {"send": "FA"}, {"expect": "A"}, {"expect": "FA"}, {"send": "A"},
+    ]})
+    return scenario.run, 1
+
+def _responder_setup(syn_cookies: bool):
+    # SYN队列为0时每次握手都走cookie
+    responder = Responder(EventScheduler(), "192.168.1.101", backlog=1024,
+                          syn_backlog=0 if syn_cookies else 1024, syn_cookies=syn_cookies)
+    responder.listen(80)
+    synacks = []
+    responder.on_send = lambda endpoint, segment: synacks.append(segment)
+    responder.on_accept = responder.flows.remove
+    syns = [Segment("192.168.1.100", "192.168.1.101", 1024 + i, 80, SYN, i, 0) for i in range(100)]
+    
+    def handshake():
+        for syn in syns:
+            responder.receive(syn)
+            synack = synacks.pop()
+            responder.receive(Segment("192.168.1.100", "192.168.1.101", syn.src_port, 80,
+                                      ACK, synack.ack, (synack.seq + 1) % (1 << 32)))
+    return handshake, len(syns)
+
+@benchmark("responder.handshake", "handshake")
+def bench_responder():
+    return _responder_setup(False)
+
+@benchmark("responder.handshake[syn cookies]", "handshake")
+def bench_responder_cookies():
+    return _responder_setup(True)
+
+class _UdpLoadGenerator(SynLoadGenerator):
+    """把SYN作为UDP负载发往本机未读取的套接字，不需要root权限"""
+    
+    def _open_sockets(self):
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM), None
+
+@benchmark("loadgen.syn[batch 64]", "packet")
+def bench_loadgen():
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    generator = _UdpLoadGenerator("192.168.1.100", "127.0.0.1", 80, rate=1e12, batch_size=64, seed=1)
+    generator.address = sink.getsockname()
+    generator.open()
+    
+    def run():
+        # 引用sink，使其在计时期间保持打开
+        generator.run(count=6400, on_report=lambda stats: None)
+        return sink
+    return run, 6400
+
+@benchmark("tcp_state.handshake_teardown", "transition")
+def bench_tcp_state():
+    return run_cycle, TRANSITIONS_PER_CYCLE
+
+@benchmark("tcp_state.handshake_teardown[legacy]", "transition")
+def bench_tcp_state_legacy():
+    # 改为享元单例之前的实现，作为对比
+    return run_legacy_cycle, TRANSITIONS_PER_CYCLE
+
+class _NullObserver(PacketObserver):
+    """什么都不做的观察者，只计量分发本身的开销"""
+    
+    def update(self, packet, event_type, **kwargs):
+        pass
+
+def _notify_setup(observers: int, batch_size: int = 0):
+    subject = Subject()
+    for _ in range(observers):
+        subject.attach(_NullObserver())
+    if batch_size:
+        subject.enable_batching(batch_size)
+    packet = PacketFactory.create_tcp_packet(*_tcp_args())
+    
+    def notify():
+        for _ in range(100):
+            subject.notify(packet, "SEND_CLOSED", time=0.0)
+    return notify, 100
+
+@benchmark("subject.notify[1 observer]", "notify")
+def bench_notify_1():
+    return _notify_setup(1)
+
+@benchmark("subject.notify[10 observers]", "notify")
+def bench_notify_10():
+    return _notify_setup(10)
+
+@benchmark("subject.notify[10 observers, batch 100]", "notify")
+def bench_notify_batched():
+    return _notify_setup(10, batch_size=100)
+
+@benchmark("packet_analyzer.analyze_tcp_packet", "packet")
+def bench_analyze():
+    packet = PacketFactory.create_tcp_packet(*_tcp_args("SA"))
+    return (lambda: PacketAnalyzer.analyze_tcp_packet(packet)), 1
+
+@benchmark("packet_analyzer.analyze_tcp_packet[received]", "packet")
+def bench_analyze_received():
+    # 抓包得到的报文保存了原始字节
+    packet = IP(PacketFactory.create_tcp_bytes(*_tcp_args("SA")))
+    return (lambda: PacketAnalyzer.analyze_tcp_packet(packet)), 1
+
+@benchmark("packet_analyzer.analyze_tcp_packet[received, full]", "packet")
+def bench_analyze_received_full():
+    packet = IP(PacketFactory.create_tcp_bytes(*_tcp_args("SA")))
+    return (lambda: PacketAnalyzer.analyze_tcp_packet(packet, full=True)), 1
+
+@benchmark("headers.parse_tcp_header", "packet")
+def bench_parse_header():
+    data = PacketFactory.create_tcp_bytes(*_tcp_args("SA"))
+    return (lambda: parse_tcp_header(data)), 1
+
+def _pcap_packets() -> List[bytes]:
+    template = PacketFactory.create_tcp_bytes(*_tcp_args("A"))
+    return [template] * PCAP_PACKETS
+
+@benchmark("pcap.write", "packet")
+def bench_pcap_write():
+    packets = _pcap_packets()
+    timestamps = [i * 0.001 for i in range(PCAP_PACKETS)]
+    filename = os.path.join(tempfile.mkdtemp(prefix="tcp-bench-"), "write.pcap")
+    
+    def write():
+        with PcapWriter(filename) as writer:
+            writer.write_many(packets, timestamps)
+    return write, PCAP_PACKETS
+
+def _pcap_file() -> str:
+    filename = os.path.join(tempfile.mkdtemp(prefix="tcp-bench-"), "read.pcap")
+    with PcapWriter(filename) as writer:
+        writer.write_many(_pcap_packets(), [i * 0.001 for i in range(PCAP_PACKETS)])
+    return filename
+
+@benchmark("pcap.read", "packet")
+def bench_pcap_read():
+    filename = _pcap_file()
+    
+    def read():
+        with PcapReader(filename) as reader:
+            # 不保留报文的memoryview，否则无法解除映射
+            collections.deque(reader, maxlen=0)
+    return read, PCAP_PACKETS
+
+@benchmark("pcap.read_tcp_columns", "packet")
+def bench_pcap_columns():
+    if np is None:
+        return None
+    filename = _pcap_file()
+    return (lambda: read_tcp_columns(filename)), PCAP_PACKETS
+
+def measure(func: Callable[[], Any], ops: int, min_time: float = 0.2, repeat: int = 5) -> float:
+    """
+    计时一个基准
+    
+    Args:
+        func: 被计时的函数
+        ops: 每次调用完成的操作数
+        min_time: 每轮计时的最短时长(秒)，据此确定每轮的调用次数
+        repeat: 计时轮数
+    
+    Returns:
+        float: 单次操作的耗时(ns)，取各轮中的最小值
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+    best = min([elapsed] + timer.repeat(repeat=repeat - 1, number=number))
+    return best / number / ops * 1e9
+
+def run(pattern: Optional[str] = None, min_time: float = 0.2, repeat: int = 5,
+        runs: int = 1) -> Dict[str, Any]:
+    """
+    运行名称中包含pattern的基准
+    
+    Args:
+        pattern: 只运行名称中包含该字符串的基准
+        min_time: 见 measure
+        repeat: 见 measure
+        runs: 整个套件运行的遍数；各遍依次运行全部基准，使机器负载的变化分摊到每一项
+    
+    Returns:
+        Dict[str, Any]: meta为运行环境，results为名称到 ns_per_op(各遍的中位数)/ops_per_sec/
+            unit/runs/noise 的映射，noise为各遍最大值与最小值之差相对中位数的比例，
+            只运行一遍时为None；缺少可选依赖的基准被跳过
+    """
+    cases = {}
+    for name, (setup, unit) in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        case = setup()
+        if case is not None:
+            cases[name] = case
+    samples: Dict[str, List[float]] = {name: [] for name in cases}
+    for _ in range(runs):
+        for name, (func, ops) in cases.items():
+            samples[name].append(measure(func, ops, min_time=min_time, repeat=repeat))
+    
+    results = {}
+    for name, values in samples.items():
+        ns = statistics.median(values)
+        noise = (max(values) - min(values)) / ns if len(values) > 1 else None
+        results[name] = {"ns_per_op": ns, "ops_per_sec": 1e9 / ns, "unit": BENCHMARKS[name][1],
+                         "runs": len(values), "noise": noise}
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "numpy": getattr(np, "__version__", None),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "runs": runs,
+        },
+        "results": results,
+    }
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    与基线比较
+    
+    每项的容差取 threshold 与基线、本次测得的波动(noise)之和中的较大者，
+    机器本身的波动不会被当作回退；没有波动数据(只运行一遍)时容差即为 threshold。
+    
+    Args:
+        baseline: 基线结果(run 的返回值或保存的JSON)
+        current: 本次结果
+        threshold: 最小容差，耗时增加超过容差视为回退，减少超过容差视为提升
+    
+    Returns:
+        List[Dict[str, Any]]: 每个基准一项，status为regression/improvement/ok/new
+    """
+    rows = []
+    for name, result in current["results"].items():
+        ns = result["ns_per_op"]
+        base = baseline["results"].get(name)
+        if base is None:
+            rows.append({"name": name, "baseline": None, "current": ns, "ratio": None,
+                         "tolerance": None, "status": "new"})
+            continue
+        ratio = ns / base["ns_per_op"]
+        tolerance = max(threshold, (base.get("noise") or 0.0) + (result.get("noise") or 0.0))
+        if ratio > 1 + tolerance:
+            status = "regression"
+        elif ratio < 1 - tolerance:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"name": name, "baseline": base["ns_per_op"], "current": ns,
+                     "ratio": ratio, "tolerance": tolerance, "status": status})
+    return rows
+
+def _format_ns(ns: Optional[float]) -> str:
+    if ns is None:
+        return "-"
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} us"
+    return f"{ns:.0f} ns"
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="TCP仿真性能基准套件")
+    parser.add_argument("--filter", help="只运行名称中包含该字符串的基准")
+    parser.add_argument("--quick", action="store_true", help="缩短计时，用于快速检查")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, help="把结果保存为JSON基线")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="与JSON基线比较")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="最小回退判定阈值(耗时增加的比例)，测得的波动更大时以波动为准")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS,
+                        help="整个套件运行的遍数，每项取中位数并据此估计波动")
+    args = parser.parse_args()
+    
+    if args.quick:
+        current = run(args.filter, min_time=0.05, repeat=3, runs=args.runs)
+    else:
+        current = run(args.filter, runs=args.runs)
+    
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(baseline, current, args.threshold)
+        for row in rows:
+            ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+            tolerance = f"±{row['tolerance']:.0%}" if row["tolerance"] is not None else "-"
+            print(f"{row['name']:<45} {_format_ns(row['baseline']):>10} {_format_ns(row['current']):>10} "
+                  f"{ratio:>7} {tolerance:>6}  {row['status']}")
+        regressions = [row["name"] for row in rows if row["status"] == "regression"]
+    else:
+        for name, result in current["results"].items():
+            noise = f"±{result['noise']:.0%}" if result["noise"] is not None else "-"
+            print(f"{name:<45} {_format_ns(result['ns_per_op']):>10}/{result['unit']}"
+                  f"  {result['ops_per_sec']:>12,.0f}/s {noise:>6}")
+        regressions = []
+    
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+        print(f"基线已保存到: {args.save}")
+    if regressions:
+        print(f"性能回退: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
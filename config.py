@@ -8,11 +8,41 @@ DEFAULT_CONFIG = {
     'src_port': 12345,
     'dst_port': 80,
     'initial_seq': 1000,
-    'packet_delay': 1,  # 数据包发送间隔（秒）
+    'packet_delay': None,  # 固定的数据包发送间隔（秒），None表示收到应答或超时后立即发送下一个
+    'rto': 1.0,  # 初始重传超时（秒），测得RTT后按RFC 6298计算
+    'rto_min': 0.2,  # 重传超时下限（秒）
+    'rto_max': 60.0,  # 重传超时上限（秒）
+    'reply_retries': 2,  # 实时模式下SYN/FIN未收到应答时的最大重传次数
     'interface': None,  # 网络接口，None表示自动选择
     'log_level': 'INFO',
+    'log_sample_rate': 1,  # 每N个数据包记录一条日志
+    'observer_policy': None,  # 观察者异步分发时队列满的策略：block、drop_oldest或sample，None表示同步调用
+    'observer_queue_size': 1024,  # 每个异步观察者的队列容量
+    'observer_batch_size': 0,  # 观察者批量通知的批大小，0表示逐包通知
+    'observer_batch_interval': None,  # 批量通知的最长缓存时间（秒）
     'save_pcap': True,  # 是否保存pcap文件
-    'pcap_filename': 'tcp_simulation.pcap'
+    'pcap_filename': 'tcp_simulation.pcap',
+    'pcap_format': 'pcap',  # pcap或pcapng
+    'pcap_max_bytes': None,  # 单个pcap文件的最大字节数，超过后滚动到新文件
+    'pcap_rotate_seconds': None,  # 单个pcap文件覆盖的最长时间（秒）
+    'metrics_enabled': True,  # 是否统计各阶段耗时
+    'metrics_file': None,  # 各阶段耗时的输出文件，.json为JSON，其余为Prometheus文本
+    'metrics_format': None,  # 指定输出格式：json或prometheus，None表示按扩展名判断
+    # 离线仿真(--offline)的链路参数
+    'latency': 0.001,  # 单向时延（秒）
+    'bandwidth': None,  # 链路带宽（bit/s），None表示不限速
+    'loss_rate': 0.0,  # 丢包率
+    'transfer_bytes': 0,  # 每条连接建立后客户端发送的数据量（字节），0表示只握手和挥手
+    'transfer_file': None,  # 发送该文件的内容代替transfer_bytes个零字节，文件以内存映射方式读取
+    'mss': 1460,  # 最大报文段长度（字节）
+    'rcv_wnd': 65535,  # 接收窗口（字节）
+    'congestion_control': 'reno',  # 拥塞控制算法：reno、cubic或bbr
+    # 服务端监听队列，listen_backlog为None时离线服务端收到SYN即创建连接
+    'listen_backlog': None,  # accept队列上限
+    'syn_backlog': 256,  # SYN队列（半连接）上限
+    'syn_cookies': False,  # SYN队列满时是否使用SYN cookie
+    'accept_rate': None,  # 服务端每秒accept的连接数，None表示立即accept
+    'seed': None  # 随机种子
 }
 
 # TCP标志位映射
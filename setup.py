@@ -17,6 +17,12 @@ setup(
         "typing-extensions>=4.0.0",
     ],
     extras_require={
+        "fast": [
+            "numpy>=1.21.0",
+        ],
+        "yaml": [
+            "PyYAML>=5.1",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
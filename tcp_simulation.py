@@ -6,9 +6,15 @@ import time
 import sys
 import logging
 import argparse
+import atexit
 import os
 from utils.packet_analyzer import PacketAnalyzer
 from config import DEFAULT_CONFIG, TCP_FLAGS
+from tcp_simulation.core.capture import CaptureSession, reply_filter
+from tcp_simulation.core.raw_socket import RawSocket
+from tcp_simulation.core.rtt import RTTEstimator
+from tcp_simulation.utils.logger import QueueLogging
+from tcp_simulation.utils.pcap import PcapWriter
 
 # 配置日志
 logging.basicConfig(level=logging.INFO,
@@ -26,15 +32,32 @@ class TCPSimulation:
         self.seq = self.config['initial_seq']
         self.ack = 0
         self.packet_analyzer = PacketAnalyzer()
-        self.captured_packets = []
-
+        # 报文边收发边写入pcap文件，不在内存中累积
+        self.pcap_writer = None
+        if self.config['save_pcap']:
+            self.pcap_writer = PcapWriter(
+                self.config['pcap_filename'],
+                format=self.config.get('pcap_format', 'pcap'),
+                max_bytes=self.config.get('pcap_max_bytes'),
+                max_seconds=self.config.get('pcap_rotate_seconds')
+            )
+        self.capture = None
+        # 抓包会话和原始套接字在 open 或进入上下文时打开，之后一直复用
+        self.socket = RawSocket(interface=self.config.get('interface'))
+        # 等待应答的超时由测得的RTT按RFC 6298计算
+        self.rtt = RTTEstimator(
+            initial_rto=self.config.get('rto', 1.0),
+            min_rto=self.config.get('rto_min', 1.0),
+            max_rto=self.config.get('rto_max', 60.0)
+        )
+    
     def create_tcp_packet(self, flags, seq=None, ack=None, payload=None):
         """创建TCP数据包"""
         if seq is None:
             seq = self.seq
         if ack is None:
             ack = self.ack
-            
+        
         packet = IP(src=self.src_ip, dst=self.dst_ip)/TCP(
             sport=self.src_port,
             dport=self.dst_port,
@@ -44,30 +67,43 @@ class TCPSimulation:
         )
         
         if payload:
-            packet = packet/Raw(load=payload)
-            
+            packet = packet/Raw(load=bytes(payload) if isinstance(payload, memoryview) else payload)
+        
         return packet
-
+    
     def send_and_capture(self, packet, description):
-        """发送数据包并捕获响应"""
-        logger.info(f"发送{description}包")
-        send(packet, verbose=0)
-        self.captured_packets.append(packet)
-        
-        # 捕获响应
-        response = sniff(
-            iface=self.config['interface'],
-            count=1,
-            timeout=2,
-            filter=f"host {self.src_ip} and host {self.dst_ip}"
-        )
-        
-        if response:
-            self.captured_packets.extend(response)
-            self.packet_analyzer.analyze_tcp_packet(response[0])
+        """发送数据包并捕获响应，SYN/FIN在RTO内未收到应答时按指数退避重传，纯ACK不等待应答"""
+        expects_reply = bool(int(packet[TCP].flags) & (TCP_FLAGS['SYN'] | TCP_FLAGS['FIN']))
+        retries = 0
+        data = bytes(packet)
+        # 抓包会话必须在第一次发送前就已打开，否则可能错过应答
+        self.open()
+        while True:
+            logger.info(f"发送{description}包")
+            self.socket.send(data, self.dst_ip)
+            sent = time.perf_counter()
+            self.record_packet(packet)
+            
+            # 捕获响应：整个仿真期间复用同一个抓包会话
+            response = self.capture.get(timeout=self.rtt.rto if expects_reply else 0)
+            
+            if response is not None:
+                # 重传过的报文不取RTT样本(Karn算法)
+                if expects_reply and not retries:
+                    self.rtt.sample(time.perf_counter() - sent)
+                self.record_packet(response)
+                self.packet_analyzer.analyze_tcp_packet(response)
+                break
+            if not expects_reply or retries >= self.config.get('reply_retries', 0):
+                break
+            retries += 1
+            self.rtt.backoff()
+            logger.info(f"未收到{description}包的应答，第{retries}次重传（RTO {self.rtt.rto:.3f}秒）")
         
-        time.sleep(self.config['packet_delay'])
-
+        delay = self.config.get('packet_delay')
+        if delay:
+            time.sleep(delay)
+    
     def three_way_handshake(self):
         """模拟TCP三次握手"""
         logger.info("开始TCP三次握手过程...")
@@ -85,7 +121,7 @@ class TCPSimulation:
         self.send_and_capture(ack_packet, "ACK")
         
         logger.info("TCP三次握手完成")
-
+    
     def four_way_handshake(self):
         """模拟TCP四次挥手"""
         logger.info("开始TCP四次挥手过程...")
@@ -107,14 +143,42 @@ class TCPSimulation:
         self.send_and_capture(final_ack, "ACK")
         
         logger.info("TCP四次挥手完成")
-
+    
+    def record_packet(self, packet):
+        """把数据包的IP层写入pcap文件"""
+        if self.pcap_writer is not None:
+            if not isinstance(packet, IP) and packet.haslayer(IP):
+                packet = packet[IP]
+            self.pcap_writer.write(bytes(packet), float(packet.time))
+    
+    def open(self):
+        """打开抓包会话和原始套接字，已打开时不做任何事"""
+        if self.capture is None:
+            self.capture = CaptureSession(
+                interface=self.config['interface'],
+                bpf_filter=reply_filter(self.src_ip, self.dst_ip, self.src_port, self.dst_port)
+            ).open()
+        self.socket.open()
+        return self
+    
+    def close(self):
+        """关闭抓包会话和原始套接字"""
+        if self.capture is not None:
+            self.capture.close()
+            self.capture = None
+        self.socket.close()
+    
+    def __enter__(self):
+        return self.open()
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
     def save_captured_packets(self):
-        """保存捕获的数据包"""
-        if self.config['save_pcap'] and self.captured_packets:
-            self.packet_analyzer.save_pcap(
-                self.captured_packets,
-                self.config['pcap_filename']
-            )
+        """关闭pcap文件，确保缓冲区中的数据包全部落盘"""
+        if self.pcap_writer is not None:
+            self.pcap_writer.close()
+            logger.info(f"数据包已保存到: {', '.join(self.pcap_writer.files)}")
 
 def parse_arguments():
     """解析命令行参数"""
@@ -127,6 +191,28 @@ def parse_arguments():
     parser.add_argument('--delay', type=float, help='数据包发送延迟（秒）')
     parser.add_argument('--no-save', action='store_true', help='不保存pcap文件')
     parser.add_argument('--debug', action='store_true', help='启用调试模式')
+    parser.add_argument('--offline', action='store_true', help='使用离线离散事件引擎仿真（无需root权限）')
+    parser.add_argument('--connections', type=int, default=1, help='离线/异步模式下仿真的连接数')
+    parser.add_argument('--loss-rate', type=float, help='离线模式下的链路丢包率')
+    parser.add_argument('--transfer-bytes', type=int, help='离线模式下每条连接发送的数据量（字节）')
+    parser.add_argument('--transfer-file', help='离线模式下每条连接发送该文件的内容（以内存映射方式读取）')
+    parser.add_argument('--cc', choices=['reno', 'cubic', 'bbr'], help='离线模式下的拥塞控制算法')
+    parser.add_argument('--workers', type=int, help='离线模式下按四元组分片的工作进程数')
+    parser.add_argument('--scenario', nargs='+', metavar='FILE',
+                        help='运行JSON/YAML场景文件（离线执行，无需root权限）')
+    parser.add_argument('--backlog', type=int, help='服务端accept队列上限（离线模式下启用监听队列）')
+    parser.add_argument('--syn-backlog', type=int, help='服务端SYN队列上限')
+    parser.add_argument('--syn-cookies', action='store_true', help='SYN队列满时使用SYN cookie')
+    parser.add_argument('--accept-rate', type=float, help='离线模式下服务端每秒accept的连接数')
+    parser.add_argument('--respond', type=float, nargs='?', const=0.0, metavar='SECONDS',
+                        help='在dst-ip:dst-port上作为服务端应答握手，可指定运行秒数')
+    parser.add_argument('--load', type=float, metavar='PPS',
+                        help='以指定速率（SYN/秒）向dst-ip:dst-port发送SYN，用于测试自己的服务')
+    parser.add_argument('--duration', type=float, help='压力模式的运行时长（秒），默认一直运行')
+    parser.add_argument('--full-handshake', action='store_true', help='压力模式下回复ACK完成三次握手')
+    parser.add_argument('--async', dest='async_mode', action='store_true',
+                        help='使用asyncio并发收发，多条连接同时握手')
+    parser.add_argument('--dst-ports', help='异步模式下的目标端口列表，以逗号分隔')
     
     return parser.parse_args()
 
@@ -153,6 +239,22 @@ def main():
             config['save_pcap'] = False
         if args.debug:
             config['log_level'] = 'DEBUG'
+        if args.loss_rate is not None:
+            config['loss_rate'] = args.loss_rate
+        if args.transfer_bytes is not None:
+            config['transfer_bytes'] = args.transfer_bytes
+        if args.transfer_file:
+            config['transfer_file'] = args.transfer_file
+        if args.cc:
+            config['congestion_control'] = args.cc
+        if args.backlog:
+            config['listen_backlog'] = args.backlog
+        if args.syn_backlog:
+            config['syn_backlog'] = args.syn_backlog
+        if args.syn_cookies:
+            config['syn_cookies'] = True
+        if args.accept_rate:
+            config['accept_rate'] = args.accept_rate
         
         # 设置日志级别
         logging.basicConfig(
@@ -160,19 +262,88 @@ def main():
             format='%(asctime)s - %(levelname)s - %(message)s'
         )
         
-        # 创建TCP仿真实例
-        tcp_sim = TCPSimulation(config)
+        # 日志交给后台线程格式化和输出，收发包路径不等待I/O
+        atexit.register(QueueLogging().start().stop)
+        
+        # 场景模式：编译并运行场景文件，有失败的场景时退出码为1
+        if args.scenario:
+            from tcp_simulation.core.scenario import run_scenarios
+            writer = None
+            if config['save_pcap']:
+                writer = PcapWriter(config['pcap_filename'], format=config.get('pcap_format', 'pcap'))
+            try:
+                results = run_scenarios(args.scenario, defaults=config, pcap_writer=writer)
+            finally:
+                if writer is not None:
+                    writer.close()
+            failed = [result for result in results if not result.passed]
+            logger.info(f"场景运行完成: {len(results) - len(failed)}/{len(results)} 个通过")
+            if failed:
+                sys.exit(1)
+            return
+        
+        # 离线模式：在虚拟时钟上仿真，不发送真实数据包
+        if args.offline:
+            pcap_filename = config['pcap_filename'] if config['save_pcap'] else None
+            if args.workers:
+                from tcp_simulation.core.sharded_simulation import ShardedSimulation
+                stats = ShardedSimulation(config, workers=args.workers).run(
+                    connections=args.connections, pcap_filename=pcap_filename)
+                stats.pop('shards')
+            else:
+                from tcp_simulation.core.offline_simulation import OfflineSimulation
+                stats = OfflineSimulation(config).run(connections=args.connections,
+                                                      pcap_filename=pcap_filename)
+            logger.info(f"离线仿真统计: {stats}")
+            return
         
-        # 执行三次握手
-        tcp_sim.three_way_handshake()
-        time.sleep(2)
+        # 应答模式：用原始套接字在本机地址上作为被动监听方
+        if args.respond is not None:
+            from tcp_simulation.core.responder import RawResponder
+            responder = RawResponder(
+                config['dst_ip'], config['dst_port'], interface=config.get('interface'),
+                backlog=config['listen_backlog'] or 128, syn_backlog=config['syn_backlog'],
+                syn_cookies=config['syn_cookies']
+            )
+            with responder:
+                stats = responder.serve(duration=args.respond or None)
+            logger.info(f"应答统计: {stats}")
+            return
+        
+        # 压力模式：按目标速率批量发送SYN，定期输出实际速率
+        if args.load:
+            from tcp_simulation.core.loadgen import SynLoadGenerator
+            generator = SynLoadGenerator(
+                config['src_ip'], config['dst_ip'], config['dst_port'], args.load,
+                full_handshake=args.full_handshake, interface=config.get('interface'),
+                seed=config.get('seed')
+            )
+            with generator:
+                stats = generator.run(duration=args.duration)
+            logger.info(f"压力统计: {stats}")
+            return
         
-        # 执行四次挥手
-        tcp_sim.four_way_handshake()
+        # 异步模式：每个目标端口发起connections条连接，并发完成握手和挥手
+        if args.async_mode:
+            from tcp_simulation.core.async_simulation import AsyncTCPSimulation
+            ports = [int(port) for port in args.dst_ports.split(',')] if args.dst_ports else [config['dst_port']]
+            targets = [(config['dst_ip'], port) for port in ports] * args.connections
+            for result in AsyncTCPSimulation(config).run(targets):
+                logger.info(f"连接结果: {result}")
+            return
+        
+        # 创建TCP仿真实例，退出时关闭抓包会话和原始套接字
+        with TCPSimulation(config) as tcp_sim:
+            # 执行三次握手
+            tcp_sim.three_way_handshake()
+            time.sleep(2)
+            
+            # 执行四次挥手
+            tcp_sim.four_way_handshake()
         
         # 保存捕获的数据包
         tcp_sim.save_captured_packets()
-        
+    
     except KeyboardInterrupt:
         logger.info("程序被用户中断")
         sys.exit(0)
@@ -182,8 +353,9 @@ def main():
 
 if __name__ == "__main__":
     # 检查是否具有管理员权限
-    if os.name == 'posix' and os.geteuid() != 0:
+    if (os.name == 'posix' and os.geteuid() != 0
+            and '--offline' not in sys.argv and '--scenario' not in sys.argv):
         logger.error("请使用管理员权限运行此程序！")
         sys.exit(1)
-        
+    
     main() 
\ No newline at end of file
@@ -0,0 +1,3 @@
+"""
+TCP协议仿真工具
+"""
\ No newline at end of file
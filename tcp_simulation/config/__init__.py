@@ -0,0 +1,3 @@
+"""
+TCP协议仿真工具的配置模块
+"""
\ No newline at end of file
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+import socket
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from scapy.all import IP
+from .bpf import FlowFilter
+from .flow_table import FlowKey
+from .observers import Subject
+from .raw_socket import open_raw_socket
+from .segment import Segment, SYN, ACK, FIN, RST
+from .tcp_state import TCPState, CLOSED, SYN_SENT, ESTABLISHED, FIN_WAIT_1, FIN_WAIT_2, TIME_WAIT
+from ..utils.headers import TCPHeader, parse_tcp_header
+
+logger = logging.getLogger(__name__)
+
+def segment_from_header(header: TCPHeader) -> Segment:
+    """把解析出的头部记录转换为Segment，负载复制为bytes"""
+    return Segment(header.src_ip, header.dst_ip, header.sport, header.dport,
+                   header.flags, header.seq, header.ack, bytes(header.payload))
+
+def parse_segment(data: bytes) -> Optional[Segment]:
+    """把原始套接字收到的IPv4报文解析为Segment，不是TCP报文时返回None"""
+    header = parse_tcp_header(data)
+    return segment_from_header(header) if header is not None else None
+
+def open_raw_sockets(interface: Optional[str] = None) -> Tuple[socket.socket, socket.socket]:
+    """
+    创建发送(IP_HDRINCL)和接收TCP报文用的一对原始套接字
+    
+    Args:
+        interface: 绑定的网络接口，None表示不绑定
+    
+    Returns:
+        Tuple[socket.socket, socket.socket]: (发送套接字, 接收套接字)
+    
+    Raises:
+        PermissionError: 没有root权限
+        NetworkError: 创建套接字失败
+    """
+    send_sock = open_raw_socket(socket.IPPROTO_RAW, interface)
+    try:
+        recv_sock = open_raw_socket(socket.IPPROTO_TCP, interface)
+    except Exception:
+        send_sock.close()
+        raise
+    return send_sock, recv_sock
+
+class AsyncPacketIO:
+    """基于asyncio的原始套接字收发管道
+    
+    一个读取回调负责接收所有TCP报文，按四元组分发到各连接的接收队列；
+    发送经由队列交给写任务完成，调用方不会被阻塞。
+    """
+    
+    def __init__(self, interface: Optional[str] = None, queue_size: int = 1024):
+        """
+        初始化收发管道
+        
+        Args:
+            interface: 绑定的网络接口，None表示不绑定
+            queue_size: 发送队列长度，队列满时send会等待
+        """
+        self.interface = interface
+        self.queue_size = queue_size
+        self._send_sock: Optional[socket.socket] = None
+        self._recv_sock: Optional[socket.socket] = None
+        self._send_queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._flows: Dict[FlowKey, asyncio.Queue] = {}
+        # 内核按活动连接过滤，不相关的TCP报文不再复制到用户态
+        self.flow_filter = FlowFilter()
+        self._filter_pending = False
+        
+        # 统计
+        self.sent = 0
+        self.received = 0
+        self.unmatched = 0
+    
+    def _open_sockets(self) -> Tuple[socket.socket, socket.socket]:
+        """创建发送(IP_HDRINCL)和接收用的原始套接字"""
+        return open_raw_sockets(self.interface)
+    
+    async def start(self) -> None:
+        """打开套接字，启动读取回调和写任务"""
+        if self._writer is not None:
+            return
+        self._send_sock, self._recv_sock = self._open_sockets()
+        self._send_sock.setblocking(False)
+        self._recv_sock.setblocking(False)
+        loop = asyncio.get_running_loop()
+        self._send_queue = asyncio.Queue(self.queue_size)
+        self._sync_filter()
+        loop.add_reader(self._recv_sock.fileno(), self._on_readable)
+        self._writer = loop.create_task(self._write_loop())
+    
+    async def close(self) -> None:
+        """等待发送队列清空后关闭套接字"""
+        if self._writer is None:
+            return
+        await self._send_queue.join()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+        asyncio.get_running_loop().remove_reader(self._recv_sock.fileno())
+        self._send_sock.close()
+        self._recv_sock.close()
+        self._send_sock = self._recv_sock = None
+        self._flows.clear()
+        self.flow_filter = FlowFilter()
+    
+    async def __aenter__(self) -> 'AsyncPacketIO':
+        await self.start()
+        return self
+    
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+    
+    def register(self, key: FlowKey) -> asyncio.Queue:
+        """
+        注册连接，返回其接收队列
+        
+        Args:
+            key: (本端IP, 本端端口, 对端IP, 对端端口)
+        
+        Returns:
+            asyncio.Queue: 队列元素为(解析后的报文段, 原始报文)
+        """
+        if key in self._flows:
+            raise ValueError(f"四元组已被占用: {key}")
+        queue = asyncio.Queue()
+        self._flows[key] = queue
+        self.flow_filter.add(key)
+        self._schedule_filter()
+        return queue
+    
+    def unregister(self, key: FlowKey) -> None:
+        """注销连接，之后到达的报文不再分发"""
+        if self._flows.pop(key, None) is not None:
+            self.flow_filter.remove(key)
+            self._schedule_filter()
+    
+    def _schedule_filter(self) -> None:
+        """同一轮事件循环内的连接增减合并为一次过滤器更新"""
+        if self._filter_pending or self._recv_sock is None:
+            return
+        self._filter_pending = True
+        asyncio.get_running_loop().call_soon(self._sync_filter)
+    
+    def _sync_filter(self) -> None:
+        """把当前连接集合对应的BPF过滤器挂到接收套接字上"""
+        self._filter_pending = False
+        sock = self._recv_sock
+        # 只有原始IP套接字收到的报文从IP头部开始
+        if sock is None or sock.fileno() < 0 or sock.type != socket.SOCK_RAW:
+            return
+        try:
+            self.flow_filter.attach(sock)
+        except OSError as e:
+            logger.warning("挂载BPF过滤器失败，改为在用户态过滤: %s", e)
+    
+    async def send(self, data: bytes, dst_ip: str) -> None:
+        """把报文放入发送队列"""
+        await self._send_queue.put((data, dst_ip))
+    
+    def _transmit(self, data: bytes, dst_ip: str) -> None:
+        self._send_sock.sendto(data, (dst_ip, 0))
+    
+    async def _write_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self._send_queue
+        while True:
+            data, dst_ip = await queue.get()
+            try:
+                while True:
+                    try:
+                        self._transmit(data, dst_ip)
+                        break
+                    except BlockingIOError:
+                        # 发送缓冲区已满，等待套接字可写
+                        writable = loop.create_future()
+                        loop.add_writer(self._send_sock.fileno(), writable.set_result, None)
+                        try:
+                            await writable
+                        finally:
+                            loop.remove_writer(self._send_sock.fileno())
+                self.sent += 1
+            except OSError as e:
+                logger.warning("发送到 %s 失败: %s", dst_ip, e)
+            finally:
+                queue.task_done()
+    
+    def _on_readable(self) -> None:
+        """读取回调：一次取完套接字中所有报文并按四元组分发"""
+        recv = self._recv_sock.recv
+        flows = self._flows
+        while True:
+            try:
+                data = recv(65535)
+            except (BlockingIOError, InterruptedError):
+                return
+            segment = parse_segment(data)
+            if segment is None:
+                continue
+            queue = flows.get((segment.dst_ip, segment.dst_port,
+                               segment.src_ip, segment.src_port))
+            if queue is None:
+                self.unmatched += 1
+                continue
+            self.received += 1
+            queue.put_nowait((segment, data))
+
+class AsyncTCPSimulation(Subject):
+    """基于asyncio的并发TCP仿真
+    
+    每条连接是一个协程，发送不阻塞，等待应答时只挂起自身；
+    多条连接的握手可以同时进行，总耗时取决于RTT而不是连接数乘以超时。
+    """
+    
+    def __init__(self, config: Dict[str, Any], io: Optional[AsyncPacketIO] = None):
+        """
+        初始化异步仿真器
+        
+        Args:
+            config: 与 TCPSimulation 相同的配置字典，另外支持以下可选项：
+                timeout(等待应答的超时，秒)、concurrency(同时进行的连接数上限)、
+                hold_time(连接建立后保持多久再关闭，秒)
+            io: 收发管道，默认按配置中的网络接口创建
+        """
+        super().__init__()
+        self.config = config
+        self.src_ip = config['src_ip']
+        self.dst_ip = config['dst_ip']
+        self.src_port = config['src_port']
+        self.dst_port = config['dst_port']
+        self.seq = config['initial_seq']
+        self.timeout = config.get('timeout', 2.0)
+        self.io = io or AsyncPacketIO(interface=config.get('interface'))
+    
+    async def _send(self, segment: Segment, state: TCPState) -> None:
+        data = segment.to_bytes()
+        await self.io.send(data, segment.dst_ip)
+        if self._observers:
+            self.notify(IP(data), f"SEND_{state.name}")
+    
+    async def _receive(self, queue: asyncio.Queue, state: TCPState) -> Optional[Segment]:
+        try:
+            segment, data = await asyncio.wait_for(queue.get(), self.timeout)
+        except asyncio.TimeoutError:
+            return None
+        if self._observers:
+            self.notify(IP(data), f"RECEIVE_{state.name}")
+        return segment
+    
+    async def connect(self, dst_ip: Optional[str] = None, dst_port: Optional[int] = None,
+                      src_port: Optional[int] = None, isn: Optional[int] = None) -> Dict[str, Any]:
+        """
+        与目标完成一次三次握手和四次挥手
+        
+        Args:
+            dst_ip: 目标IP地址，默认使用配置中的dst_ip
+            dst_port: 目标端口，默认使用配置中的dst_port
+            src_port: 源端口，默认使用配置中的src_port
+            isn: 初始序列号，默认使用配置中的initial_seq
+        
+        Returns:
+            Dict[str, Any]: 连接结果，包括最终状态、握手RTT(秒)以及是否被RST拒绝
+        """
+        dst_ip = dst_ip or self.dst_ip
+        dst_port = dst_port or self.dst_port
+        src_port = src_port or self.src_port
+        seq = self.seq if isn is None else isn
+        key = (self.src_ip, src_port, dst_ip, dst_port)
+        result: Dict[str, Any] = {'dst_ip': dst_ip, 'dst_port': dst_port, 'src_port': src_port,
+                                  'state': SYN_SENT.name, 'rtt': None, 'reset': False}
+        
+        queue = self.io.register(key)
+        try:
+            state = SYN_SENT
+            started = time.perf_counter()
+            await self._send(Segment(self.src_ip, dst_ip, src_port, dst_port, SYN, seq, 0), state)
+            seq += 1
+            
+            # 等待SYN-ACK，忽略与本次握手无关的报文
+            while True:
+                reply = await self._receive(queue, state)
+                if reply is None:
+                    return result
+                if reply.flags & RST:
+                    result['reset'] = True
+                    result['state'] = CLOSED.name
+                    return result
+                if reply.flags & (SYN | ACK) == SYN | ACK and reply.ack == seq:
+                    break
+            result['rtt'] = time.perf_counter() - started
+            rcv_nxt = (reply.seq + 1) & 0xFFFFFFFF
+            
+            state = ESTABLISHED
+            result['state'] = state.name
+            await self._send(Segment(self.src_ip, dst_ip, src_port, dst_port, ACK, seq, rcv_nxt), state)
+            hold_time = self.config.get('hold_time', 0.0)
+            if hold_time:
+                await asyncio.sleep(hold_time)
+            
+            # 主动关闭：等待对端确认FIN并发来自己的FIN
+            state = FIN_WAIT_1
+            await self._send(Segment(self.src_ip, dst_ip, src_port, dst_port, FIN | ACK, seq, rcv_nxt), state)
+            seq += 1
+            while state is not TIME_WAIT:
+                reply = await self._receive(queue, state)
+                if reply is None:
+                    break
+                if reply.flags & RST:
+                    result['reset'] = True
+                    state = CLOSED
+                    break
+                if reply.flags & ACK and reply.ack == seq:
+                    state = FIN_WAIT_2
+                if reply.flags & FIN:
+                    rcv_nxt = (reply.seq + len(reply.payload) + 1) & 0xFFFFFFFF
+                    await self._send(Segment(self.src_ip, dst_ip, src_port, dst_port, ACK, seq, rcv_nxt), state)
+                    state = TIME_WAIT
+            result['state'] = state.name
+            return result
+        finally:
+            self.io.unregister(key)
+    
+    async def run_async(self, targets: Optional[Iterable[Tuple[str, int]]] = None,
+                        concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        并发连接多个目标
+        
+        Args:
+            targets: (目标IP, 目标端口)序列，默认只连接配置中的目标
+            concurrency: 同时进行的连接数上限，None表示不限制
+        
+        Returns:
+            List[Dict[str, Any]]: 按targets顺序排列的连接结果
+        """
+        targets = list(targets or [(self.dst_ip, self.dst_port)])
+        concurrency = concurrency or self.config.get('concurrency')
+        semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        
+        async def connect_one(index: int, dst_ip: str, dst_port: int) -> Dict[str, Any]:
+            # 每条连接使用不同的源端口，保证四元组唯一
+            src_port = 1024 + (self.src_port - 1024 + index) % 64512
+            if semaphore is None:
+                return await self.connect(dst_ip, dst_port, src_port, self.seq + index)
+            async with semaphore:
+                return await self.connect(dst_ip, dst_port, src_port, self.seq + index)
+        
+        logger.info("开始异步TCP仿真: %d 个目标", len(targets))
+        started = time.perf_counter()
+        async with self.io:
+            results = await asyncio.gather(*(connect_one(i, ip, port)
+                                             for i, (ip, port) in enumerate(targets)))
+        established = sum(1 for result in results if result['rtt'] is not None)
+        logger.info("异步TCP仿真完成: %d/%d 个目标完成握手，耗时 %.3f 秒",
+                    established, len(results), time.perf_counter() - started)
+        return results
+    
+    def run(self, targets: Optional[Iterable[Tuple[str, int]]] = None,
+            concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """在新的事件循环中运行 run_async"""
+        return asyncio.run(self.run_async(targets, concurrency))
\ No newline at end of file
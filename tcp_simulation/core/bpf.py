@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import ctypes
+import logging
+import socket
+import sys
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .flow_table import FlowKey
+
+logger = logging.getLogger(__name__)
+
+# 经典BPF指令的操作码
+BPF_LD_W_ABS = 0x20
+BPF_LD_H_ABS = 0x28
+BPF_LD_B_ABS = 0x30
+BPF_LD_H_IND = 0x48
+BPF_LD_B_IND = 0x50
+BPF_LDX_B_MSH = 0xB1
+BPF_ALU_AND_K = 0x54
+BPF_JMP_JEQ_K = 0x15
+BPF_JMP_JGE_K = 0x35
+BPF_JMP_JGT_K = 0x25
+BPF_JMP_JSET_K = 0x45
+BPF_RET_K = 0x06
+
+SO_ATTACH_FILTER = getattr(socket, "SO_ATTACH_FILTER", 26)
+SNAPLEN = 0x40000
+MAX_JUMP = 255
+
+# 一条规则：('exact', 对端端口, 本端端口)、('range', 对端端口, 本端最小端口, 本端最大端口)
+# 或 ('mask', 对端端口掩码, 对端端口值, 本端端口掩码, 本端端口值)
+Rule = Tuple
+
+class _SockFilter(ctypes.Structure):
+    _fields_ = [("code", ctypes.c_uint16), ("jt", ctypes.c_uint8),
+                ("jf", ctypes.c_uint8), ("k", ctypes.c_uint32)]
+
+class _SockFprog(ctypes.Structure):
+    _fields_ = [("len", ctypes.c_ushort), ("filter", ctypes.POINTER(_SockFilter))]
+
+def _common_mask(values: Iterable[int]) -> Tuple[int, int]:
+    """所有值都相同的16位比特：返回(掩码, 这些比特的值)"""
+    values = list(values)
+    first = values[0]
+    differ = 0
+    for value in values:
+        differ |= value ^ first
+    mask = ~differ & 0xFFFF
+    return mask, first & mask
+
+def _ranges(ports: List[int]) -> List[Tuple[int, int]]:
+    """把有序端口列表合并成连续区间"""
+    result: List[Tuple[int, int]] = []
+    for port in ports:
+        if result and port == result[-1][1] + 1:
+            result[-1] = (result[-1][0], port)
+        else:
+            result.append((port, port))
+    return result
+
+class _Assembler:
+    """带标签的经典BPF汇编器，条件跳转只能向前且不超过255条指令"""
+    
+    def __init__(self):
+        self.code: List[Tuple[int, object, object, int]] = []
+        self.labels: Dict[str, int] = {}
+    
+    def emit(self, code: int, k: int = 0, jt: object = 0, jf: object = 0) -> None:
+        self.code.append((code, jt, jf, k))
+    
+    def label(self, name: str) -> None:
+        self.labels[name] = len(self.code)
+    
+    def assemble(self) -> List[Tuple[int, int, int, int]]:
+        program = []
+        for index, (code, jt, jf, k) in enumerate(self.code):
+            offsets = []
+            for target in (jt, jf):
+                if isinstance(target, str):
+                    target = self.labels[target] - index - 1
+                if not 0 <= target <= MAX_JUMP:
+                    raise OverflowError(f"BPF跳转距离超出范围: {target}")
+                offsets.append(target)
+            program.append((code, offsets[0], offsets[1], k))
+        return program
+
+class FlowFilter:
+    """按活动连接集合生成的BPF过滤器
+    
+    只放行对端发回本端、四元组属于活动连接的TCP报文。连接不多时逐个匹配端口；
+    超过 max_rules 条时，按对端端口把本端端口合并为连续区间；区间仍然太多时
+    只比较所有本端端口共有的比特(掩码匹配)，由用户态按四元组做最终分发。
+    规则在连接增减后才重新生成，attach 只在规则变化后重新编译并挂到套接字上。
+    """
+    
+    def __init__(self, flows: Iterable[FlowKey] = (), flags: Optional[int] = None,
+                 max_rules: int = 32, link_offset: int = 0):
+        """
+        初始化过滤器
+        
+        Args:
+            flows: 初始连接，元素为(本端IP, 本端端口, 对端IP, 对端端口)
+            flags: 只放行TCP标志位与之有交集的报文，None表示不限
+            max_rules: 逐个匹配或按区间匹配的规则数上限
+            link_offset: IP头部在报文中的偏移，原始IP套接字为0，以太网为14
+        """
+        self.flags = flags
+        self.max_rules = max_rules
+        self.link_offset = link_offset
+        self._limit = max_rules
+        self._flows: Set[FlowKey] = set(flows)
+        self._rules: Optional[Dict[Tuple[str, str], List[Rule]]] = None
+        self._attached: Optional[List[Tuple[int, int, int, int]]] = None
+        
+        # 统计
+        self.updates = 0
+    
+    def add(self, key: FlowKey) -> None:
+        """添加连接"""
+        if key not in self._flows:
+            self._flows.add(key)
+            self._invalidate()
+    
+    def remove(self, key: FlowKey) -> None:
+        """移除连接"""
+        if key in self._flows:
+            self._flows.discard(key)
+            self._invalidate()
+    
+    def _invalidate(self) -> None:
+        self._rules = None
+        self._limit = self.max_rules
+    
+    def __contains__(self, key: FlowKey) -> bool:
+        return key in self._flows
+    
+    def __len__(self) -> int:
+        return len(self._flows)
+    
+    @property
+    def mode(self) -> str:
+        """当前的匹配方式：none、exact、range或mask"""
+        rules = [rule for pair in self.rules().values() for rule in pair]
+        return rules[0][0] if rules else "none"
+    
+    def rules(self) -> Dict[Tuple[str, str], List[Rule]]:
+        """按(本端IP, 对端IP)分组的匹配规则，连接集合不变时直接返回缓存"""
+        if self._rules is not None:
+            return self._rules
+        pairs: Dict[Tuple[str, str], Dict[int, List[int]]] = {}
+        for local_ip, local_port, remote_ip, remote_port in self._flows:
+            pairs.setdefault((local_ip, remote_ip), {}).setdefault(remote_port, []).append(local_port)
+        
+        if len(self._flows) <= self._limit:
+            rules = {pair: [("exact", remote_port, local_port)
+                            for remote_port, local_ports in sorted(ports.items())
+                            for local_port in sorted(local_ports)]
+                     for pair, ports in pairs.items()}
+        else:
+            rules = {pair: [("range", remote_port, low, high)
+                            for remote_port, local_ports in sorted(ports.items())
+                            for low, high in _ranges(sorted(local_ports))]
+                     for pair, ports in pairs.items()}
+            if sum(len(pair_rules) for pair_rules in rules.values()) > self._limit:
+                rules = {}
+                for pair, ports in pairs.items():
+                    remote = _common_mask(ports)
+                    local = _common_mask(port for local_ports in ports.values() for port in local_ports)
+                    rules[pair] = [("mask",) + remote + local]
+        self._rules = rules
+        return rules
+    
+    def expression(self) -> str:
+        """生成等价的libpcap过滤表达式，用于Scapy等按表达式编译过滤器的抓包方式"""
+        clauses = []
+        for (local_ip, remote_ip), rules in sorted(self.rules().items()):
+            matches = []
+            for rule in rules:
+                if rule[0] == "exact":
+                    matches.append(f"(src port {rule[1]} and dst port {rule[2]})")
+                elif rule[0] == "range":
+                    matches.append(f"(src port {rule[1]} and dst portrange {rule[2]}-{rule[3]})")
+                else:
+                    matches.append(f"(tcp[0:2] & {rule[1]:#06x} = {rule[2]:#06x}"
+                                   f" and tcp[2:2] & {rule[3]:#06x} = {rule[4]:#06x})")
+            clauses.append(f"(src host {remote_ip} and dst host {local_ip} and ({' or '.join(matches)}))")
+        if not clauses:
+            return "tcp and not tcp"
+        expression = f"tcp and ({' or '.join(clauses)})"
+        if self.flags is not None:
+            expression += f" and tcp[13] & {self.flags:#04x} != 0"
+        return expression
+    
+    def program(self, match_all: bool = False) -> List[Tuple[int, int, int, int]]:
+        """
+        生成经典BPF程序
+        
+        Args:
+            match_all: 不检查地址和端口，放行所有TCP报文
+        
+        Returns:
+            List[Tuple[int, int, int, int]]: 指令列表，每条为(code, jt, jf, k)
+        """
+        offset = self.link_offset
+        asm = _Assembler()
+        # IPv4、TCP、不是后续分片
+        asm.emit(BPF_LD_B_ABS, offset)
+        asm.emit(BPF_ALU_AND_K, 0xF0)
+        asm.emit(BPF_JMP_JEQ_K, 0x40, 0, "drop")
+        asm.emit(BPF_LD_B_ABS, offset + 9)
+        asm.emit(BPF_JMP_JEQ_K, socket.IPPROTO_TCP, 0, "drop")
+        asm.emit(BPF_LD_H_ABS, offset + 6)
+        asm.emit(BPF_JMP_JSET_K, 0x1FFF, "drop", 0)
+        # X = IP头部长度
+        asm.emit(BPF_LDX_B_MSH, offset)
+        if self.flags is not None:
+            asm.emit(BPF_LD_B_IND, offset + 13)
+            asm.emit(BPF_JMP_JSET_K, self.flags, 0, "drop")
+        
+        if match_all:
+            asm.emit(BPF_RET_K, SNAPLEN)
+        pairs = {} if match_all else self.rules()
+        for index, ((local_ip, remote_ip), rules) in enumerate(sorted(pairs.items())):
+            next_pair = f"pair{index + 1}"
+            asm.emit(BPF_LD_W_ABS, offset + 12)
+            asm.emit(BPF_JMP_JEQ_K, int.from_bytes(socket.inet_aton(remote_ip), "big"), 0, next_pair)
+            asm.emit(BPF_LD_W_ABS, offset + 16)
+            asm.emit(BPF_JMP_JEQ_K, int.from_bytes(socket.inet_aton(local_ip), "big"), 0, next_pair)
+            for number, rule in enumerate(rules):
+                next_rule = f"pair{index}_rule{number + 1}" if number + 1 < len(rules) else next_pair
+                # A = 对端端口
+                asm.emit(BPF_LD_H_IND, offset)
+                if rule[0] == "mask":
+                    asm.emit(BPF_ALU_AND_K, rule[1])
+                    asm.emit(BPF_JMP_JEQ_K, rule[2], 0, next_rule)
+                    asm.emit(BPF_LD_H_IND, offset + 2)
+                    asm.emit(BPF_ALU_AND_K, rule[3])
+                    asm.emit(BPF_JMP_JEQ_K, rule[4], "accept", next_rule)
+                else:
+                    asm.emit(BPF_JMP_JEQ_K, rule[1], 0, next_rule)
+                    asm.emit(BPF_LD_H_IND, offset + 2)
+                    if rule[0] == "exact":
+                        asm.emit(BPF_JMP_JEQ_K, rule[2], "accept", next_rule)
+                    else:
+                        asm.emit(BPF_JMP_JGE_K, rule[2], 0, next_rule)
+                        asm.emit(BPF_JMP_JGT_K, rule[3], next_rule, "accept")
+                asm.label(next_rule)
+            asm.label(next_pair)
+        asm.label("drop")
+        asm.emit(BPF_RET_K, 0)
+        asm.label("accept")
+        asm.emit(BPF_RET_K, SNAPLEN)
+        return asm.assemble()
+    
+    def compile(self) -> List[Tuple[int, int, int, int]]:
+        """生成程序；规则过多导致跳转越界时改用更粗的匹配方式，最后退回只检查协议"""
+        while True:
+            try:
+                return self.program()
+            except OverflowError:
+                if self._limit <= 1:
+                    logger.warning("活动连接的地址组合过多，BPF过滤器只检查协议")
+                    return self.program(match_all=True)
+                self._limit //= 2
+                self._rules = None
+    
+    def attach(self, sock: socket.socket) -> bool:
+        """
+        把过滤器挂到套接字上，规则没有变化时不做任何事
+        
+        Returns:
+            bool: 是否重新挂载；非Linux平台不支持套接字过滤器，始终返回False
+        """
+        if not sys.platform.startswith("linux"):
+            return False
+        program = self.compile()
+        if program == self._attached:
+            return False
+        instructions = (_SockFilter * len(program))(*program)
+        fprog = _SockFprog(len(program), ctypes.cast(instructions, ctypes.POINTER(_SockFilter)))
+        sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_FILTER, bytes(fprog))
+        self._attached = program
+        self.updates += 1
+        logger.debug("BPF过滤器已更新: %d 条连接，%s 匹配，%d 条指令",
+                     len(self._flows), self.mode, len(program))
+        return True
\ No newline at end of file
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import collections
+import logging
+import threading
+from typing import Any, Deque, Optional
+from scapy.all import AsyncSniffer, IP, conf
+from .bpf import FlowFilter
+
+logger = logging.getLogger(__name__)
+
+def reply_filter(src_ip: str, dst_ip: str, src_port: Optional[int] = None,
+                 dst_port: Optional[int] = None) -> str:
+    """生成只匹配对端发回本端的TCP报文的BPF过滤表达式，给出端口时精确匹配该连接"""
+    if src_port is None or dst_port is None:
+        return f"tcp and src host {dst_ip} and dst host {src_ip}"
+    return FlowFilter([(src_ip, src_port, dst_ip, dst_port)]).expression()
+
+class CaptureSession:
+    """持久的抓包会话
+    
+    整个仿真期间只打开一次监听套接字，BPF过滤器在打开时编译并挂到
+    套接字上；后台线程把收到的报文写入定长环形缓冲区，状态机按需读取。
+    缓冲区满时丢弃最旧的报文。
+    """
+    
+    def __init__(
+        self,
+        interface: Optional[str] = None,
+        bpf_filter: Optional[str] = None,
+        buffer_size: int = 1024,
+        opened_socket: Optional[Any] = None
+    ):
+        """
+        初始化抓包会话
+        
+        Args:
+            interface: 网络接口，None表示自动选择
+            bpf_filter: BPF过滤表达式
+            buffer_size: 环形缓冲区容量(报文数)
+            opened_socket: 已打开的Scapy套接字，默认用 conf.L2listen 创建
+        """
+        self.interface = interface
+        self.bpf_filter = bpf_filter
+        self._buffer: Deque[IP] = collections.deque(maxlen=buffer_size)
+        self._ready = threading.Condition()
+        self._socket = opened_socket
+        self._owns_socket = opened_socket is None
+        self._sniffer: Optional[AsyncSniffer] = None
+        
+        # 统计
+        self.captured = 0
+        self.overwritten = 0
+    
+    @property
+    def is_open(self) -> bool:
+        """会话是否已打开"""
+        return self._sniffer is not None
+    
+    def open(self) -> 'CaptureSession':
+        """打开监听套接字并启动后台抓包线程"""
+        if self._sniffer is not None:
+            return self
+        if self._socket is None:
+            self._socket = conf.L2listen(iface=self.interface, filter=self.bpf_filter)
+        self._sniffer = AsyncSniffer(opened_socket=self._socket, prn=self._on_packet,
+                                     store=False)
+        self._sniffer.start()
+        logger.debug("抓包会话已打开: %s", self.bpf_filter)
+        return self
+    
+    def close(self) -> None:
+        """停止抓包并关闭套接字"""
+        if self._sniffer is None:
+            return
+        if self._sniffer.running:
+            self._sniffer.stop()
+        self._sniffer = None
+        if self._owns_socket and self._socket is not None:
+            self._socket.close()
+            self._socket = None
+    
+    def __enter__(self) -> 'CaptureSession':
+        return self.open()
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+    
+    def _on_packet(self, packet: IP) -> None:
+        with self._ready:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.overwritten += 1
+            self._buffer.append(packet)
+            self.captured += 1
+            self._ready.notify()
+    
+    def get(self, timeout: Optional[float] = None) -> Optional[IP]:
+        """
+        取出最早的一个报文
+        
+        Args:
+            timeout: 缓冲区为空时最多等待的秒数，None表示一直等待
+        
+        Returns:
+            Optional[IP]: 报文，超时返回None
+        """
+        with self._ready:
+            if not self._ready.wait_for(lambda: self._buffer, timeout):
+                return None
+            return self._buffer.popleft()
+    
+    def clear(self) -> None:
+        """丢弃缓冲区中尚未读取的报文"""
+        with self._ready:
+            self._buffer.clear()
+    
+    def __len__(self) -> int:
+        return len(self._buffer)
\ No newline at end of file
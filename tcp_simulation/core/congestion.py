@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import collections
+import math
+from typing import Deque, Dict, Optional, Tuple, Type
+
+from ..utils.error_handler import ConfigurationError
+
+class CongestionControl:
+    """拥塞控制算法基类
+    
+    cwnd/ssthresh 以字节为单位。发送方在收到推进 snd_una 的ACK时调用 on_ack，
+    三个重复ACK触发快速重传时调用 on_loss，重传定时器超时时调用 on_timeout。
+    """
+    
+    name = "base"
+    
+    def __init__(self, mss: int, initial_window: int = 10):
+        """
+        初始化拥塞窗口
+        
+        Args:
+            mss: 最大报文段长度(字节)
+            initial_window: 初始窗口(报文段数)，默认按RFC 6928取10
+        """
+        self.mss = mss
+        self.cwnd = float(initial_window * mss)
+        self.ssthresh = math.inf
+    
+    @property
+    def in_slow_start(self) -> bool:
+        return self.cwnd < self.ssthresh
+    
+    def on_ack(self, acked: int, rtt: Optional[float], delivery_rate: Optional[float],
+               now: float, inflight: int) -> None:
+        """
+        处理新确认的数据
+        
+        Args:
+            acked: 本次ACK新确认的字节数
+            rtt: 本次ACK得到的RTT样本(秒)，重传过的数据没有样本
+            delivery_rate: 交付速率样本(字节/秒)
+            now: 当前时间(秒)
+            inflight: 确认后仍在途的字节数
+        """
+    
+    def on_loss(self, now: float, inflight: int) -> None:
+        """快速重传：乘性减小"""
+        self.ssthresh = max(inflight / 2, 2 * self.mss)
+        self.cwnd = self.ssthresh
+    
+    def on_timeout(self, now: float, inflight: int) -> None:
+        """超时重传：回到慢启动"""
+        self.ssthresh = max(inflight / 2, 2 * self.mss)
+        self.cwnd = float(self.mss)
+    
+    def _slow_start(self, acked: int) -> None:
+        # RFC 3465 适当字节计数，每个ACK最多增加2个MSS
+        self.cwnd += min(acked, 2 * self.mss)
+
+class Reno(CongestionControl):
+    """Reno/NewReno：慢启动 + 每个RTT增加一个MSS的拥塞避免"""
+    
+    name = "reno"
+    
+    def on_ack(self, acked: int, rtt: Optional[float], delivery_rate: Optional[float],
+               now: float, inflight: int) -> None:
+        if self.in_slow_start:
+            self._slow_start(acked)
+        else:
+            self.cwnd += self.mss * acked / self.cwnd
+
+class Cubic(CongestionControl):
+    """CUBIC(RFC 8312)：拥塞避免阶段按距上次丢包的时间的三次函数增长"""
+    
+    name = "cubic"
+    
+    C = 0.4
+    BETA = 0.7
+    
+    def __init__(self, mss: int, initial_window: int = 10):
+        super().__init__(mss, initial_window)
+        self.w_max = 0.0
+        self.w_last_max = 0.0
+        self.w_est = 0.0
+        self.k = 0.0
+        self.origin = 0.0
+        self.epoch_start: Optional[float] = None
+        self.min_rtt = math.inf
+    
+    def on_ack(self, acked: int, rtt: Optional[float], delivery_rate: Optional[float],
+               now: float, inflight: int) -> None:
+        if rtt is not None and rtt < self.min_rtt:
+            self.min_rtt = rtt
+        if self.in_slow_start:
+            self._slow_start(acked)
+            return
+        mss = self.mss
+        if self.epoch_start is None:
+            self.epoch_start = now
+            if self.cwnd < self.w_max:
+                self.k = ((self.w_max - self.cwnd) / mss / self.C) ** (1 / 3)
+                self.origin = self.w_max
+            else:
+                self.k = 0.0
+                self.origin = self.cwnd
+            self.w_est = self.cwnd
+        rtt_estimate = self.min_rtt if self.min_rtt < math.inf else 0.0
+        t = now - self.epoch_start + rtt_estimate
+        target = self.origin + self.C * (t - self.k) ** 3 * mss
+        if target > self.cwnd:
+            self.cwnd += (target - self.cwnd) * acked / self.cwnd
+        else:
+            self.cwnd += 0.01 * mss * acked / self.cwnd
+        # TCP友好区域：不慢于同样条件下的Reno
+        self.w_est += 3 * (1 - self.BETA) / (1 + self.BETA) * mss * acked / self.cwnd
+        if self.w_est > self.cwnd:
+            self.cwnd = self.w_est
+    
+    def _reduce(self) -> None:
+        # 快速收敛：窗口比上次丢包时小，说明有新的流加入，提前让出带宽
+        if self.cwnd < self.w_last_max:
+            self.w_last_max = self.cwnd
+            self.w_max = self.cwnd * (1 + self.BETA) / 2
+        else:
+            self.w_last_max = self.cwnd
+            self.w_max = self.cwnd
+        self.epoch_start = None
+    
+    def on_loss(self, now: float, inflight: int) -> None:
+        self._reduce()
+        self.cwnd = max(self.cwnd * self.BETA, 2.0 * self.mss)
+        self.ssthresh = self.cwnd
+    
+    def on_timeout(self, now: float, inflight: int) -> None:
+        self._reduce()
+        self.ssthresh = max(self.cwnd * self.BETA, 2.0 * self.mss)
+        self.cwnd = float(self.mss)
+
+class BBRLike(CongestionControl):
+    """简化的BBR：按测得的瓶颈带宽和最小RTT估计BDP，以BDP的倍数作为拥塞窗口
+    
+    不对丢包做乘性减小；启动阶段窗口按确认的字节数增长，连续3轮带宽增长不足25%
+    视为管道已满，之后窗口在 cwnd_gain*BDP 附近按探测增益周期性上下浮动。
+    仿真中没有发送节拍(pacing)，增益直接作用在窗口上。
+    """
+    
+    name = "bbr"
+    
+    CWND_GAIN = 2.0
+    PROBE_GAINS = (1.25, 0.75, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0)
+    BW_WINDOW_ROUNDS = 10
+    MIN_RTT_WINDOW = 10.0
+    
+    def __init__(self, mss: int, initial_window: int = 10):
+        super().__init__(mss, initial_window)
+        self.btl_bw = 0.0
+        self.min_rtt = math.inf
+        self.min_rtt_stamp = 0.0
+        self.filled_pipe = False
+        self.full_bw = 0.0
+        self.full_bw_count = 0
+        self.round_start = 0.0
+        self.round_count = 0
+        self.cycle_index = 0
+        self._bw_samples: Deque[Tuple[int, float]] = collections.deque()
+    
+    @property
+    def bdp(self) -> float:
+        """瓶颈带宽与最小RTT之积(字节)"""
+        if self.min_rtt == math.inf:
+            return 0.0
+        return self.btl_bw * self.min_rtt
+    
+    def on_ack(self, acked: int, rtt: Optional[float], delivery_rate: Optional[float],
+               now: float, inflight: int) -> None:
+        if rtt is not None and (rtt <= self.min_rtt or now - self.min_rtt_stamp > self.MIN_RTT_WINDOW):
+            self.min_rtt = rtt
+            self.min_rtt_stamp = now
+        
+        # 每经过一个最小RTT算一轮
+        new_round = self.min_rtt < math.inf and now - self.round_start >= self.min_rtt
+        if new_round:
+            self.round_start = now
+            self.round_count += 1
+            self.cycle_index = (self.cycle_index + 1) % len(self.PROBE_GAINS)
+        
+        # 瓶颈带宽取最近若干轮交付速率样本的最大值
+        samples = self._bw_samples
+        if delivery_rate:
+            while samples and samples[-1][1] <= delivery_rate:
+                samples.pop()
+            samples.append((self.round_count, delivery_rate))
+        while samples and samples[0][0] <= self.round_count - self.BW_WINDOW_ROUNDS:
+            samples.popleft()
+        self.btl_bw = samples[0][1] if samples else 0.0
+        
+        if new_round and not self.filled_pipe:
+            if self.btl_bw >= self.full_bw * 1.25:
+                self.full_bw = self.btl_bw
+                self.full_bw_count = 0
+            else:
+                self.full_bw_count += 1
+                self.filled_pipe = self.full_bw_count >= 3
+        
+        minimum = 4.0 * self.mss
+        if not self.filled_pipe or not self.bdp:
+            self.cwnd += acked
+            return
+        target = self.CWND_GAIN * self.PROBE_GAINS[self.cycle_index] * self.bdp
+        self.cwnd = max(min(self.cwnd + acked, target), minimum)
+    
+    def on_loss(self, now: float, inflight: int) -> None:
+        pass
+    
+    def on_timeout(self, now: float, inflight: int) -> None:
+        self.cwnd = float(self.mss)
+
+CONGESTION_CONTROLS: Dict[str, Type[CongestionControl]] = {
+    Reno.name: Reno,
+    Cubic.name: Cubic,
+    BBRLike.name: BBRLike,
+}
+
+def create_congestion_control(name: str, mss: int, initial_window: int = 10) -> CongestionControl:
+    """按名称(reno、cubic或bbr)创建拥塞控制算法实例"""
+    cls = CONGESTION_CONTROLS.get(name.lower())
+    if cls is None:
+        raise ConfigurationError(
+            f"未知的拥塞控制算法: {name}，可选: {', '.join(CONGESTION_CONTROLS)}"
+        )
+    return cls(mss, initial_window)
\ No newline at end of file
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import collections
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 队列已满时的处理策略
+BLOCK = "block"  # 阻塞调用方直到有空位
+DROP_OLDEST = "drop_oldest"  # 丢弃队首最旧的事件
+SAMPLE = "sample"  # 队列过半后只接收每N个事件中的一个，队列满时丢弃新事件
+POLICIES = (BLOCK, DROP_OLDEST, SAMPLE)
+
+_queue_ids = itertools.count(1)
+
+class DispatchQueue:
+    """异步分发队列
+    
+    调用方通过 put 把参数放入有界队列后立即返回，由专用的后台线程按顺序调用目标函数，
+    慢速的观察者(写盘、分析)不会拖慢收发包路径。观察者都是同步阻塞的代码，
+    因此使用线程而不是asyncio任务执行。
+    """
+    
+    def __init__(
+        self,
+        target: Callable[..., Any],
+        maxsize: int = 1024,
+        policy: str = BLOCK,
+        sample_rate: int = 10,
+        name: Optional[str] = None
+    ):
+        """
+        初始化分发队列并启动后台线程
+        
+        Args:
+            target: 在后台线程中调用的函数
+            maxsize: 队列容量
+            policy: 队列已满时的策略，block、drop_oldest或sample
+            sample_rate: sample策略下队列过半后每N个事件接收一个
+            name: 后台线程名称
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"未知的队列策略: {policy}")
+        if maxsize < 1 or sample_rate < 1:
+            raise ValueError("队列容量和采样率必须为正整数")
+        self.target = target
+        self.maxsize = maxsize
+        self.policy = policy
+        self.sample_rate = sample_rate
+        self._items: Deque[Tuple[float, Callable[..., Any], Tuple[Any, ...], Dict[str, Any]]] = \
+            collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._busy = False
+        
+        # 统计
+        self.offered = 0
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.lag = 0.0
+        self.max_lag = 0.0
+        
+        self._thread = threading.Thread(
+            target=self._run, name=name or f"dispatch-{next(_queue_ids)}", daemon=True
+        )
+        self._thread.start()
+    
+    def put(self, *args: Any, **kwargs: Any) -> bool:
+        """
+        放入一个事件，后台线程以这些参数调用目标函数
+        
+        Returns:
+            bool: 事件是否进入队列(被丢弃或队列已关闭时为False)
+        """
+        return self.put_call(self.target, *args, **kwargs)
+    
+    def put_call(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> bool:
+        """放入一个事件，后台线程以这些参数调用func而不是目标函数，其余同 put"""
+        items = self._items
+        with self._cond:
+            if self._closed:
+                self.dropped += 1
+                return False
+            self.offered += 1
+            depth = len(items)
+            if self.policy == SAMPLE and depth >= self.maxsize // 2 and self.offered % self.sample_rate:
+                self.dropped += 1
+                return False
+            if depth >= self.maxsize:
+                if self.policy == BLOCK:
+                    self._cond.wait_for(lambda: len(items) < self.maxsize or self._closed)
+                    if self._closed:
+                        self.dropped += 1
+                        return False
+                elif self.policy == DROP_OLDEST:
+                    items.popleft()
+                    self.dropped += 1
+                else:
+                    self.dropped += 1
+                    return False
+            items.append((time.monotonic(), func, args, kwargs))
+            self.enqueued += 1
+            if len(items) > self.max_depth:
+                self.max_depth = len(items)
+            self._cond.notify_all()
+        return True
+    
+    def _run(self) -> None:
+        items = self._items
+        cond = self._cond
+        while True:
+            with cond:
+                cond.wait_for(lambda: items or self._closed)
+                if not items:
+                    return
+                enqueued_at, func, args, kwargs = items.popleft()
+                self._busy = True
+                cond.notify_all()
+            lag = time.monotonic() - enqueued_at
+            failed = False
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                logger.exception("后台分发线程 %s 处理事件失败", self._thread.name)
+                failed = True
+            with cond:
+                self.processed += 1
+                self.errors += failed
+                self.lag = lag
+                if lag > self.max_lag:
+                    self.max_lag = lag
+                self._busy = False
+                cond.notify_all()
+    
+    @property
+    def depth(self) -> int:
+        """当前队列深度"""
+        return len(self._items)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待队列中的事件全部处理完，超时返回False"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._items and not self._busy, timeout)
+    
+    def close(self, timeout: Optional[float] = None) -> None:
+        """处理完剩余事件后停止后台线程，之后放入的事件被丢弃"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+    
+    def metrics(self) -> Dict[str, Any]:
+        """
+        获取队列指标
+        
+        Returns:
+            Dict[str, Any]: depth/max_depth(队列深度)、offered/enqueued/processed/dropped/errors(事件数)、
+                lag/max_lag(事件从入队到开始处理的等待时间，秒)、oldest_age(队首事件已等待的时间，秒)
+        """
+        with self._cond:
+            oldest = self._items[0][0] if self._items else None
+            return {
+                'policy': self.policy,
+                'depth': len(self._items),
+                'max_depth': self.max_depth,
+                'offered': self.offered,
+                'enqueued': self.enqueued,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'errors': self.errors,
+                'lag': self.lag,
+                'max_lag': self.max_lag,
+                'oldest_age': time.monotonic() - oldest if oldest is not None else 0.0,
+            }
\ No newline at end of file
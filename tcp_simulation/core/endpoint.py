@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from typing import Callable, Optional, Tuple
+from .engine import EventScheduler, SimulatedLink, Timer
+from .congestion import create_congestion_control
+from .packet_factory import Payload
+from .rtt import RTTEstimator
+from .segment import Segment, SYN, FIN, ACK, RST
+from .tcp_state import (
+    TCPState, CLOSED, CLOSE_WAIT, ESTABLISHED, FIN_WAIT_1, FIN_WAIT_2, SYN_SENT, TIME_WAIT
+)
+from .transfer import DataReceiver, DataSender
+
+logger = logging.getLogger(__name__)
+
+SEQ_MOD = 1 << 32
+
+# 可以接收数据的状态
+_RECEIVE_STATES = (ESTABLISHED, FIN_WAIT_1, FIN_WAIT_2)
+
+def seq_gt(a: int, b: int) -> bool:
+    """按32位序列号空间比较 a > b"""
+    return 0 < ((a - b) % SEQ_MOD) < (1 << 31)
+
+class VirtualEndpoint:
+    """仿真TCP端点
+    
+    作为TCP状态机的上下文，负责构造报文、维护序列号和重传定时器，
+    报文通过 SimulatedLink 发送，由 EventScheduler 驱动。
+    同时也是流表中的一条流记录，大量并发连接时使用 __slots__ 控制内存。
+    """
+    
+    __slots__ = (
+        "scheduler", "local_ip", "local_port", "remote_ip", "remote_port",
+        "link", "rtt", "max_retries", "msl", "mss", "rcv_wnd", "congestion_control",
+        "iss", "snd_una", "snd_nxt", "rcv_nxt", "state",
+        "close_after", "opened_at", "established_at", "closed_at", "failed",
+        "on_send", "on_receive", "on_closed", "sender", "receiver", "_close_pending",
+        "_retransmit_segment", "_retransmit_timer", "_retries", "_sent_at",
+    )
+    
+    def __init__(
+        self,
+        scheduler: EventScheduler,
+        local_ip: str,
+        local_port: int,
+        remote_ip: str,
+        remote_port: int,
+        isn: int,
+        link: Optional[SimulatedLink] = None,
+        rto: float = 1.0,
+        max_retries: int = 5,
+        msl: float = 30.0,
+        min_rto: float = 1.0,
+        max_rto: float = 60.0,
+        mss: int = 1460,
+        rcv_wnd: int = 65535,
+        congestion_control: str = "reno"
+    ):
+        """
+        初始化端点
+        
+        Args:
+            scheduler: 事件调度器
+            local_ip: 本端IP地址
+            local_port: 本端端口
+            remote_ip: 对端IP地址
+            remote_port: 对端端口
+            isn: 初始序列号
+            link: 发往对端的链路
+            rto: 初始重传超时(秒)，之后按RFC 6298由测得的RTT计算，每次重传后翻倍
+            max_retries: 最大重传次数，超过后放弃连接
+            msl: 报文最大生存时间(秒)，TIME_WAIT持续2*MSL
+            min_rto: 重传超时下限(秒)
+            max_rto: 重传超时上限(秒)
+            mss: 最大报文段长度(字节)
+            rcv_wnd: 本端通告的接收窗口(字节)
+            congestion_control: 发送数据时使用的拥塞控制算法，reno、cubic或bbr
+        """
+        self.scheduler = scheduler
+        self.local_ip = local_ip
+        self.local_port = local_port
+        self.remote_ip = remote_ip
+        self.remote_port = remote_port
+        self.link = link
+        self.rtt = RTTEstimator(initial_rto=rto, min_rto=min_rto, max_rto=max_rto)
+        self.max_retries = max_retries
+        self.msl = msl
+        self.mss = mss
+        self.rcv_wnd = rcv_wnd
+        self.congestion_control = congestion_control
+        
+        # 发送/接收序列号
+        self.iss = isn % SEQ_MOD
+        self.snd_una = self.iss
+        self.snd_nxt = self.iss
+        self.rcv_nxt = 0
+        
+        self.state: TCPState = CLOSED
+        self.close_after: Optional[float] = None
+        self.opened_at: Optional[float] = None
+        self.established_at: Optional[float] = None
+        self.closed_at: Optional[float] = None
+        self.failed = False
+        
+        # 回调：on_send/on_receive(endpoint, segment)，on_closed(endpoint)
+        self.on_send: Optional[Callable[['VirtualEndpoint', Segment], None]] = None
+        self.on_receive: Optional[Callable[['VirtualEndpoint', Segment], None]] = None
+        self.on_closed: Optional[Callable[['VirtualEndpoint'], None]] = None
+        
+        # 数据传输阶段：第一次写入数据/收到数据时才创建
+        self.sender: Optional[DataSender] = None
+        self.receiver: Optional[DataReceiver] = None
+        self._close_pending = False
+        
+        self._retransmit_segment: Optional[Segment] = None
+        self._retransmit_timer: Optional[Timer] = None
+        self._retries = 0
+        self._sent_at: Optional[float] = None
+    
+    @property
+    def key(self) -> Tuple[str, int, str, int]:
+        """流表键：(本端IP, 本端端口, 对端IP, 对端端口)"""
+        return (self.local_ip, self.local_port, self.remote_ip, self.remote_port)
+    
+    @property
+    def can_send_data(self) -> bool:
+        """当前状态下是否可以发送数据"""
+        return self.state is ESTABLISHED or self.state is CLOSE_WAIT
+    
+    def _segment(self, flags: int, seq: int, ack: int) -> Segment:
+        return Segment(self.local_ip, self.remote_ip, self.local_port, self.remote_port,
+                       flags, seq, ack, window=self.rcv_wnd)
+    
+    def create_syn_packet(self) -> Segment:
+        """创建SYN报文段"""
+        return self._segment(SYN, self.iss, 0)
+    
+    def create_syn_ack_packet(self) -> Segment:
+        """创建SYN-ACK报文段"""
+        return self._segment(SYN | ACK, self.iss, self.rcv_nxt)
+    
+    def create_ack_packet(self) -> Segment:
+        """创建ACK报文段"""
+        return self._segment(ACK, self.snd_nxt, self.rcv_nxt)
+    
+    def create_fin_packet(self) -> Segment:
+        """创建FIN报文段"""
+        return self._segment(FIN | ACK, self.snd_nxt, self.rcv_nxt)
+    
+    def send(self, segment: Segment) -> None:
+        """发送报文段，SYN/FIN占用一个序列号并启动重传定时器"""
+        if segment.flags & (SYN | FIN):
+            if segment.seq == self.snd_nxt:
+                self.snd_nxt = (self.snd_nxt + 1) % SEQ_MOD
+            self._arm_retransmit(segment)
+        self._transmit(segment)
+    
+    def open(self) -> None:
+        """主动打开连接"""
+        self.opened_at = self.scheduler.now
+        self._dispatch("OPEN")
+    
+    def listen(self) -> None:
+        """被动打开，等待对端SYN"""
+        self._dispatch("LISTEN")
+    
+    def establish(self, rcv_nxt: int) -> None:
+        """
+        由监听方在握手完成后直接进入ESTABLISHED
+        
+        半连接由监听方的SYN队列(或SYN cookie)维护，本端此前没有经历LISTEN/SYN_RECEIVED，
+        这里按已发出的SYN-ACK补齐序列号。
+        
+        Args:
+            rcv_nxt: 期望的对端下一个序列号(对端ISN加一)
+        """
+        self.snd_una = self.snd_nxt = (self.iss + 1) % SEQ_MOD
+        self.rcv_nxt = rcv_nxt % SEQ_MOD
+        old_state = self.state
+        self.state = ESTABLISHED
+        self._on_state_changed(old_state)
+    
+    def write(self, data: Payload) -> None:
+        """
+        应用层写入要发送的数据
+        
+        连接建立前写入的数据在进入ESTABLISHED后开始发送；按MSS分段，
+        受拥塞窗口和对端通告窗口限制。bytes/memoryview/mmap 按引用保存，不复制。
+        """
+        if self.sender is None:
+            cc = create_congestion_control(self.congestion_control, self.mss)
+            self.sender = DataSender(self, cc, self.mss)
+        self.sender.write(data)
+    
+    def close(self) -> None:
+        """应用层关闭连接，已写入的数据全部被确认后才发送FIN"""
+        if self.sender is not None and not self.sender.done and self.can_send_data:
+            self._close_pending = True
+            return
+        self._dispatch("CLOSE")
+    
+    def _on_data_acked(self) -> None:
+        """已写入的数据全部被确认"""
+        if self._close_pending:
+            self._close_pending = False
+            self.close()
+    
+    def abort(self) -> None:
+        """放弃连接，直接进入CLOSED"""
+        self.failed = True
+        self._dispatch("RST")
+    
+    def receive(self, segment: Segment) -> None:
+        """处理从链路到达的报文段，转换为状态机事件"""
+        if self.on_receive is not None:
+            self.on_receive(self, segment)
+        
+        flags = segment.flags
+        if flags & RST:
+            self._dispatch("RST")
+            return
+        if self.sender is not None and flags & ACK and not flags & SYN:
+            self.sender.on_ack(segment)
+        
+        acked = False
+        if flags & ACK and seq_gt(segment.ack, self.snd_una) and not seq_gt(segment.ack, self.snd_nxt):
+            self.snd_una = segment.ack
+            acked = self.snd_una == self.snd_nxt
+            if acked:
+                if self._sent_at is not None:
+                    self.rtt.sample(self.scheduler.now - self._sent_at)
+                self._cancel_retransmit()
+        
+        if flags & SYN:
+            if flags & ACK and not acked and self.state is SYN_SENT:
+                # 未确认本端SYN的SYN-ACK无效
+                return
+            self.rcv_nxt = (segment.seq + 1) % SEQ_MOD
+            self._dispatch("SYN_ACK" if flags & ACK else "SYN")
+            return
+        
+        if acked:
+            self._dispatch("ACK")
+        if segment.payload and self.state in _RECEIVE_STATES:
+            self._receive_data(segment)
+        if flags & FIN:
+            end = (segment.seq + len(segment.payload)) % SEQ_MOD
+            # 携带的数据已由 _receive_data 交付时，rcv_nxt已推进到数据末尾
+            if segment.seq == self.rcv_nxt or (segment.payload and end == self.rcv_nxt):
+                self.rcv_nxt = (end + 1) % SEQ_MOD
+            self._dispatch("FIN")
+    
+    def _receive_data(self, segment: Segment) -> None:
+        """按序交付数据并立即确认，乱序到达时发出重复ACK"""
+        if self.receiver is None:
+            self.receiver = DataReceiver(self.rcv_wnd)
+        self.rcv_nxt = self.receiver.accept(segment.seq, len(segment.payload), self.rcv_nxt)
+        if not segment.flags & FIN:
+            self._transmit(self.create_ack_packet())
+    
+    def _transmit(self, segment: Segment) -> None:
+        if self.on_send is not None:
+            self.on_send(self, segment)
+        if self.link is not None:
+            self.link.transmit(segment)
+    
+    def _dispatch(self, event: str) -> None:
+        old_state = self.state
+        self.state = old_state.on_event(self, event)
+        if self.state is not old_state:
+            self._on_state_changed(old_state)
+    
+    def _on_state_changed(self, old_state: TCPState) -> None:
+        state = self.state
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s:%s %s -> %s", self.local_ip, self.local_port, old_state.name, state.name)
+        if state is ESTABLISHED:
+            self.established_at = self.scheduler.now
+            if self.sender is not None:
+                self.sender.pump()
+            if self.close_after is not None:
+                self.scheduler.schedule(self.close_after, self.close)
+        elif state is CLOSE_WAIT:
+            # 被动关闭方收到FIN后立即关闭
+            self.scheduler.schedule(0.0, self.close)
+        elif state is TIME_WAIT:
+            self.scheduler.schedule(2 * self.msl, self._dispatch, "TIMEOUT")
+        elif state is CLOSED:
+            self.closed_at = self.scheduler.now
+            self._cancel_retransmit()
+            if self.on_closed is not None:
+                self.on_closed(self)
+    
+    def _arm_retransmit(self, segment: Segment) -> None:
+        self._cancel_retransmit()
+        self._retransmit_segment = segment
+        self._retries = 0
+        self._sent_at = self.scheduler.now
+        self._retransmit_timer = self.scheduler.schedule(self.rtt.rto, self._on_retransmit_timeout)
+    
+    def _cancel_retransmit(self) -> None:
+        if self._retransmit_timer is not None:
+            self._retransmit_timer.cancel()
+        self._retransmit_timer = None
+        self._retransmit_segment = None
+        self._sent_at = None
+    
+    def _on_retransmit_timeout(self) -> None:
+        segment = self._retransmit_segment
+        if segment is None:
+            return
+        if self._retries >= self.max_retries:
+            logger.debug("%s:%s 重传次数超限，放弃连接", self.local_ip, self.local_port)
+            self._retransmit_timer = None
+            self.abort()
+            return
+        self._retries += 1
+        # Karn算法：重传过的报文段不取RTT样本
+        self._sent_at = None
+        self._transmit(segment)
+        self._retransmit_timer = self.scheduler.schedule(self.rtt.backoff(), self._on_retransmit_timeout)
\ No newline at end of file
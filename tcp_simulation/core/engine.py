@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import heapq
+import itertools
+import random
+from typing import Any, Callable, List, Optional, Tuple
+from .segment import Segment
+
+class Timer:
+    """调度器中的定时事件"""
+    
+    __slots__ = ("time", "callback", "args", "cancelled")
+    
+    def __init__(self, time: float, callback: Callable, args: Tuple[Any, ...]):
+        self.time = time
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+    
+    def cancel(self) -> None:
+        """取消事件(惰性删除，出队时跳过)"""
+        self.cancelled = True
+
+class EventScheduler:
+    """离散事件调度器：虚拟时钟 + 优先队列"""
+    
+    def __init__(self, start_time: float = 0.0):
+        self.now = start_time
+        self.processed = 0
+        self._queue: List[Tuple[float, int, Timer]] = []
+        self._sequence = itertools.count()
+    
+    def schedule(self, delay: float, callback: Callable, *args: Any) -> Timer:
+        """在当前虚拟时间之后delay秒执行回调"""
+        return self.schedule_at(self.now + delay, callback, *args)
+    
+    def schedule_at(self, when: float, callback: Callable, *args: Any) -> Timer:
+        """在指定虚拟时间执行回调，同一时刻的事件按提交顺序执行"""
+        if when < self.now:
+            raise ValueError(f"不能调度到过去的时间: {when} < {self.now}")
+        timer = Timer(when, callback, args)
+        heapq.heappush(self._queue, (when, next(self._sequence), timer))
+        return timer
+    
+    @property
+    def pending(self) -> int:
+        """队列中尚未执行的事件数(包括已取消的)"""
+        return len(self._queue)
+    
+    def run(self, until: Optional[float] = None, max_events: Optional[int] = None) -> int:
+        """
+        运行事件循环
+        
+        Args:
+            until: 虚拟时间上限，None表示运行到队列为空
+            max_events: 最多执行的事件数
+        
+        Returns:
+            int: 本次执行的事件数
+        """
+        queue = self._queue
+        heappop = heapq.heappop
+        count = 0
+        while queue:
+            when, _, timer = queue[0]
+            if until is not None and when > until:
+                break
+            heappop(queue)
+            if timer.cancelled:
+                continue
+            self.now = when
+            timer.callback(*timer.args)
+            count += 1
+            if max_events is not None and count >= max_events:
+                break
+        if until is not None and self.now < until and (not queue or queue[0][0] > until):
+            self.now = until
+        self.processed += count
+        return count
+
+class SimulatedLink:
+    """单向仿真链路，模拟传播时延、带宽(串行化时延)和随机丢包"""
+    
+    def __init__(
+        self,
+        scheduler: EventScheduler,
+        latency: float = 0.001,
+        bandwidth: Optional[float] = None,
+        loss_rate: float = 0.0,
+        rng: Optional[random.Random] = None
+    ):
+        """
+        初始化链路
+        
+        Args:
+            scheduler: 事件调度器
+            latency: 单向传播时延(秒)
+            bandwidth: 链路带宽(bit/s)，None表示不限速
+            loss_rate: 丢包率，取值[0, 1)
+            rng: 随机数发生器，传入带种子的实例可复现丢包序列
+        """
+        if not 0.0 <= loss_rate < 1.0:
+            raise ValueError(f"丢包率必须在[0, 1)之间: {loss_rate}")
+        self.scheduler = scheduler
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.loss_rate = loss_rate
+        self.rng = rng or random.Random()
+        self.receiver: Optional[Callable[[Segment], None]] = None
+        self._busy_until = 0.0
+        
+        # 链路统计
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+    
+    def attach(self, receiver: Callable[[Segment], None]) -> None:
+        """设置链路对端的接收回调"""
+        self.receiver = receiver
+    
+    def transmit(self, segment: Segment) -> None:
+        """发送报文段，按排队、串行化和传播时延安排到达事件"""
+        self.sent += 1
+        self.bytes_sent += segment.wire_len
+        
+        now = self.scheduler.now
+        if self.bandwidth:
+            start = self._busy_until if self._busy_until > now else now
+            self._busy_until = start + segment.wire_len * 8 / self.bandwidth
+            departure = self._busy_until
+        else:
+            departure = now
+        
+        if self.loss_rate and self.rng.random() < self.loss_rate:
+            self.dropped += 1
+            return
+        if self.receiver is not None:
+            self.scheduler.schedule_at(departure + self.latency, self.receiver, segment)
\ No newline at end of file
@@ -2,8 +2,9 @@
 TCP协议仿真工具的事件系统
 """
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from enum import Enum, auto
+from .dispatch import DispatchQueue, BLOCK
 
 class EventType(Enum):
     """事件类型枚举"""
@@ -24,17 +25,45 @@ class EventManager:
         self._handlers: Dict[EventType, List[Callable]] = {
             event_type: [] for event_type in EventType
         }
+        self._queues: Dict[Tuple[EventType, Callable], DispatchQueue] = {}
 
     def subscribe(self, event_type: EventType, handler: Callable) -> None:
         """订阅事件"""
         if handler not in self._handlers[event_type]:
             self._handlers[event_type].append(handler)
 
+    def subscribe_queued(self, event_type: EventType, handler: Callable, maxsize: int = 1024,
+                         policy: str = BLOCK, sample_rate: int = 10) -> DispatchQueue:
+        """异步订阅事件：emit 只把事件放入有界队列，由后台线程调用处理函数"""
+        key = (event_type, handler)
+        if key not in self._queues:
+            self._queues[key] = DispatchQueue(handler, maxsize=maxsize, policy=policy,
+                                              sample_rate=sample_rate,
+                                              name=f"event-{event_type.name}")
+            self._handlers[event_type].append(self._queues[key].put)
+        return self._queues[key]
+
     def unsubscribe(self, event_type: EventType, handler: Callable) -> None:
         """取消订阅事件"""
+        queue = self._queues.pop((event_type, handler), None)
+        if queue is not None:
+            self._handlers[event_type].remove(queue.put)
+            queue.close()
         if handler in self._handlers[event_type]:
             self._handlers[event_type].remove(handler)
 
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """等待所有异步订阅者处理完已入队的事件"""
+        for queue in self._queues.values():
+            queue.flush(timeout)
+
+    def queue_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """获取各异步订阅者的队列指标，键为 事件类型/处理函数名"""
+        return {
+            f"{event_type.name}/{getattr(handler, '__qualname__', repr(handler))}": queue.metrics()
+            for (event_type, handler), queue in self._queues.items()
+        }
+
     def emit(self, event: Event) -> None:
         """触发事件"""
         for handler in self._handlers[event.type]:
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+from typing import Any, Callable, Dict, Iterator, Optional, Set, Tuple
+from .endpoint import VirtualEndpoint
+from .engine import EventScheduler, SimulatedLink
+from .packet_factory import Payload
+from .segment import Segment, SYN, ACK
+
+# (本端IP, 本端端口, 对端IP, 对端端口)
+FlowKey = Tuple[str, int, str, int]
+
+EPHEMERAL_PORTS = (1024, 65535)
+
+class FlowTable:
+    """按四元组索引的流表，报文分流为O(1)的字典查找"""
+    
+    def __init__(self):
+        self._flows: Dict[FlowKey, VirtualEndpoint] = {}
+    
+    def add(self, flow: VirtualEndpoint) -> None:
+        """添加流，四元组已存在时抛出ValueError"""
+        key = flow.key
+        if key in self._flows:
+            raise ValueError(f"四元组已被占用: {key}")
+        self._flows[key] = flow
+    
+    def remove(self, flow: VirtualEndpoint) -> None:
+        """移除流"""
+        key = flow.key
+        if self._flows.get(key) is flow:
+            del self._flows[key]
+    
+    def get(self, local_ip: str, local_port: int,
+            remote_ip: str, remote_port: int) -> Optional[VirtualEndpoint]:
+        """按四元组查找流"""
+        return self._flows.get((local_ip, local_port, remote_ip, remote_port))
+    
+    def lookup(self, segment: Segment) -> Optional[VirtualEndpoint]:
+        """查找收到的报文段所属的流(报文的目的端即本端)"""
+        return self._flows.get((segment.dst_ip, segment.dst_port,
+                                segment.src_ip, segment.src_port))
+    
+    def __contains__(self, key: FlowKey) -> bool:
+        return key in self._flows
+    
+    def __len__(self) -> int:
+        return len(self._flows)
+    
+    def __iter__(self) -> Iterator[VirtualEndpoint]:
+        return iter(self._flows.values())
+
+class ConnectionManager:
+    """连接管理器
+    
+    代表一台仿真主机：所有连接共用一条出方向链路，收到的报文按四元组
+    分流到各自的状态机；发往监听端口的SYN会创建新的被动连接。
+    连接关闭后自动从流表中移除。
+    """
+    
+    def __init__(
+        self,
+        scheduler: EventScheduler,
+        local_ip: str,
+        link: Optional[SimulatedLink] = None,
+        rng: Optional[random.Random] = None,
+        **endpoint_options: Any
+    ):
+        """
+        初始化连接管理器
+        
+        Args:
+            scheduler: 事件调度器
+            local_ip: 本机默认IP地址
+            link: 出方向链路
+            rng: 用于生成初始序列号的随机数发生器
+            endpoint_options: 传给 VirtualEndpoint 的参数(rto、min_rto、max_rto、max_retries、msl、
+                mss、rcv_wnd、congestion_control)
+        """
+        self.scheduler = scheduler
+        self.local_ip = local_ip
+        self.link = link
+        self.rng = rng or random.Random()
+        self.endpoint_options = endpoint_options
+        self.flows = FlowTable()
+        self.listeners: Set[Tuple[str, int]] = set()
+        
+        # 新建连接的回调，签名与 VirtualEndpoint 的同名属性一致
+        self.on_send: Optional[Callable[[VirtualEndpoint, Segment], None]] = None
+        self.on_receive: Optional[Callable[[VirtualEndpoint, Segment], None]] = None
+        self.on_closed: Optional[Callable[[VirtualEndpoint], None]] = None
+        
+        self._next_port = EPHEMERAL_PORTS[0]
+        
+        # 统计
+        self.opened = 0
+        self.accepted = 0
+        self.closed = 0
+        self.failed = 0
+        self.unmatched = 0
+    
+    def _create_flow(self, local_ip: str, local_port: int, remote_ip: str,
+                     remote_port: int, isn: Optional[int]) -> VirtualEndpoint:
+        if isn is None:
+            isn = self.rng.getrandbits(32)
+        flow = VirtualEndpoint(self.scheduler, local_ip, local_port, remote_ip,
+                               remote_port, isn, link=self.link, **self.endpoint_options)
+        flow.on_send = self.on_send
+        flow.on_receive = self.on_receive
+        flow.on_closed = self._on_flow_closed
+        self.flows.add(flow)
+        return flow
+    
+    def _allocate_port(self, local_ip: str, remote_ip: str, remote_port: int) -> int:
+        low, high = EPHEMERAL_PORTS
+        for _ in range(high - low + 1):
+            port = self._next_port
+            self._next_port = low if port >= high else port + 1
+            if (local_ip, port, remote_ip, remote_port) not in self.flows:
+                return port
+        raise ValueError(f"没有可用的本地端口连接到 {remote_ip}:{remote_port}")
+    
+    def listen(self, port: int, local_ip: Optional[str] = None) -> None:
+        """在指定端口上被动监听"""
+        self.listeners.add((local_ip or self.local_ip, port))
+    
+    def connect(self, remote_ip: str, remote_port: int, local_port: Optional[int] = None,
+                local_ip: Optional[str] = None, isn: Optional[int] = None,
+                close_after: Optional[float] = None,
+                data: Optional[Payload] = None) -> VirtualEndpoint:
+        """
+        主动建立连接
+        
+        Args:
+            remote_ip: 对端IP地址
+            remote_port: 对端端口
+            local_port: 本端端口，None表示自动分配临时端口
+            local_ip: 本端IP地址，默认使用管理器的IP
+            isn: 初始序列号，None表示随机生成
+            close_after: 连接建立后多久主动关闭(秒)，None表示不关闭；
+                写入了数据时等数据全部被确认后才关闭
+            data: 连接建立后要发送给对端的数据，按引用保存，多条连接可以共用同一块缓冲区
+        
+        Returns:
+            VirtualEndpoint: 新建的连接
+        """
+        local_ip = local_ip or self.local_ip
+        if local_port is None:
+            local_port = self._allocate_port(local_ip, remote_ip, remote_port)
+        flow = self._create_flow(local_ip, local_port, remote_ip, remote_port, isn)
+        flow.close_after = close_after
+        if data:
+            flow.write(data)
+        self.opened += 1
+        flow.open()
+        return flow
+    
+    def receive(self, segment: Segment) -> None:
+        """链路接收回调：按四元组将报文分流到对应连接"""
+        flow = self.flows.lookup(segment)
+        if flow is None:
+            if segment.flags & (SYN | ACK) == SYN and (segment.dst_ip, segment.dst_port) in self.listeners:
+                flow = self._create_flow(segment.dst_ip, segment.dst_port,
+                                         segment.src_ip, segment.src_port, None)
+                self.accepted += 1
+                flow.listen()
+            else:
+                self.unmatched += 1
+                return
+        flow.receive(segment)
+    
+    def _on_flow_closed(self, flow: VirtualEndpoint) -> None:
+        self.flows.remove(flow)
+        if flow.failed:
+            self.failed += 1
+        else:
+            self.closed += 1
+        if self.on_closed is not None:
+            self.on_closed(flow)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取连接统计"""
+        return {
+            'active': len(self.flows),
+            'opened': self.opened,
+            'accepted': self.accepted,
+            'closed': self.closed,
+            'failed': self.failed,
+            'unmatched': self.unmatched,
+        }
\ No newline at end of file
@@ -2,7 +2,7 @@
 TCP协议仿真工具的接口定义
 """
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any, Optional, Sequence
 
 class IPacketFactory(ABC):
     """数据包工厂接口"""
@@ -36,6 +36,11 @@ class IObserver(ABC):
         """更新观察者"""
         pass
 
+    def update_batch(self, events: Sequence[Any]) -> None:
+        """批量更新观察者，默认逐个调用 update"""
+        for event in events:
+            self.update(event)
+
 class ILogger(ABC):
     """日志接口"""
     @abstractmethod
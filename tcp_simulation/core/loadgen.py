@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import collections
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import random
+import socket
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .async_simulation import open_raw_sockets, parse_segment
+from .flow_table import EPHEMERAL_PORTS
+from .packet_factory import PacketFactory
+from .segment import SYN, ACK, RST
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖，用于批量构造报文
+    np = None
+
+logger = logging.getLogger(__name__)
+
+RECORD_SIZE = 40  # 不带选项的IPv4+TCP报文长度
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IoVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+class _SockAddrIn(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_uint16),
+        ("sin_addr", ctypes.c_uint8 * 4),
+        ("sin_zero", ctypes.c_uint8 * 8),
+    ]
+
+def _load_sendmmsg() -> Optional[Any]:
+    """取libc中的sendmmsg，不可用(非Linux或没有该符号)时返回None"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        function = libc.sendmmsg
+    except (OSError, AttributeError, TypeError):
+        return None
+    function.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    function.restype = ctypes.c_int
+    return function
+
+_sendmmsg = _load_sendmmsg()
+
+class TokenBucket:
+    """令牌桶限速器：平均速率为rate，最多积攒burst个令牌"""
+    
+    __slots__ = ("rate", "burst", "tokens", "updated")
+    
+    def __init__(self, rate: float, burst: Optional[float] = None, now: Optional[float] = None):
+        """
+        初始化令牌桶
+        
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量，默认为rate的1/100(至少1个)，即最多积攒10毫秒的令牌
+            now: 当前时间(秒)，默认为 time.perf_counter()
+        """
+        if rate <= 0:
+            raise ValueError(f"速率必须大于0: {rate}")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate / 100)
+        self.tokens = self.burst
+        self.updated = time.perf_counter() if now is None else now
+    
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+    
+    def consume(self, count: int, now: float) -> int:
+        """取出最多count个令牌，返回实际取出的个数"""
+        self._refill(now)
+        taken = min(count, int(self.tokens))
+        self.tokens -= taken
+        return taken
+    
+    def delay(self, count: int, now: float) -> float:
+        """距离攒够count个令牌(不超过桶容量)还需要的秒数"""
+        self._refill(now)
+        missing = min(count, self.burst) - self.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+class BatchSender:
+    """固定长度报文的批量发送器
+    
+    报文依次写入 buffer 中长度为 record_size 的槽位，flush 一次系统调用(sendmmsg)
+    发出整批报文；sendmmsg 不可用时逐个 sendto。消息头和iovec在初始化时指向
+    buffer 中的各个槽位，发送时不复制报文也不重新分配。
+    """
+    
+    def __init__(self, sock: socket.socket, batch_size: int = 64,
+                 address: Optional[Tuple[str, int]] = None,
+                 record_size: int = RECORD_SIZE, use_sendmmsg: bool = True):
+        """
+        初始化发送器
+        
+        Args:
+            sock: 发送套接字
+            batch_size: 每批最多发送的报文数
+            address: 目的地址，None表示套接字已连接
+            record_size: 每个报文的长度
+            use_sendmmsg: 是否尝试使用sendmmsg
+        """
+        self.sock = sock
+        self.batch_size = batch_size
+        self.record_size = record_size
+        self.buffer = bytearray(batch_size * record_size)
+        self.sendmmsg = _sendmmsg if use_sendmmsg else None
+        self._address = address
+        self._messages: Optional[ctypes.Array] = None
+        self.sent = 0
+        self.errors = 0
+        self.syscalls = 0
+        if self.sendmmsg is not None:
+            self._prepare()
+    
+    @property
+    def address(self) -> Optional[Tuple[str, int]]:
+        return self._address
+    
+    @address.setter
+    def address(self, address: Optional[Tuple[str, int]]) -> None:
+        self._address = address
+        if self._messages is not None:
+            self._prepare()
+    
+    def _prepare(self) -> None:
+        base = ctypes.addressof(ctypes.c_char.from_buffer(self.buffer))
+        self._iovecs = (_IoVec * self.batch_size)()
+        self._messages = (_MMsgHdr * self.batch_size)()
+        self._sockaddr = None
+        if self._address is not None:
+            if self.sock.family != socket.AF_INET:
+                # 只为IPv4构造sockaddr，其余地址族退回逐个sendto
+                self._messages = None
+                return
+            host, port = self._address
+            self._sockaddr = _SockAddrIn(socket.AF_INET, socket.htons(port))
+            ctypes.memmove(self._sockaddr.sin_addr, socket.inet_aton(host), 4)
+        for i in range(self.batch_size):
+            self._iovecs[i].iov_base = base + i * self.record_size
+            self._iovecs[i].iov_len = self.record_size
+            header = self._messages[i].msg_hdr
+            header.msg_iov = ctypes.pointer(self._iovecs[i])
+            header.msg_iovlen = 1
+            if self._sockaddr is not None:
+                header.msg_name = ctypes.addressof(self._sockaddr)
+                header.msg_namelen = ctypes.sizeof(self._sockaddr)
+    
+    def slot(self, index: int) -> memoryview:
+        """第index个报文槽位的可写视图"""
+        start = index * self.record_size
+        return memoryview(self.buffer)[start:start + self.record_size]
+    
+    def flush(self, count: int) -> int:
+        """
+        发送缓冲区中的前count个报文
+        
+        Returns:
+            int: 成功交给内核的报文数，发送缓冲区满(ENOBUFS/EAGAIN)等错误丢弃的报文计入errors
+        """
+        if self._messages is not None:
+            sent = self._flush_mmsg(count)
+        else:
+            sent = self._flush_sendto(count)
+        self.sent += sent
+        self.errors += count - sent
+        return sent
+    
+    def _flush_mmsg(self, count: int) -> int:
+        fd = self.sock.fileno()
+        position = sent = 0
+        while position < count:
+            self.syscalls += 1
+            result = self.sendmmsg(fd, ctypes.byref(self._messages[position]), count - position, 0)
+            if result < 0:
+                error = ctypes.get_errno()
+                if error == errno.EINTR:
+                    continue
+                if error not in (errno.ENOBUFS, errno.EAGAIN, errno.EWOULDBLOCK):
+                    raise OSError(error, os.strerror(error))
+                # 丢弃发送失败的报文，继续发送后面的报文
+                position += 1
+                continue
+            position += result
+            sent += result
+        return sent
+    
+    def _flush_sendto(self, count: int) -> int:
+        view = memoryview(self.buffer)
+        size = self.record_size
+        sent = 0
+        for i in range(count):
+            self.syscalls += 1
+            try:
+                if self._address is None:
+                    self.sock.send(view[i * size:(i + 1) * size])
+                else:
+                    self.sock.sendto(view[i * size:(i + 1) * size], self._address)
+                sent += 1
+            except (BlockingIOError, InterruptedError):
+                continue
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    raise
+        return sent
+
+class SynLoadGenerator:
+    """SYN压力发生器
+    
+    按令牌桶限定的速率向 dst_ip:dst_port 发送SYN，源端口和ISN随机，
+    报文成批构造在发送器的缓冲区中，通过一个持续打开的原始套接字批量发出。
+    full_handshake 为True时还会对收到的SYN-ACK回复ACK完成三次握手；此时内核会对
+    SYN-ACK回复RST，需要先用防火墙丢弃本机发往目标端口的RST。
+    只用于测试自己的服务。
+    """
+    
+    def __init__(
+        self,
+        src_ip: str,
+        dst_ip: str,
+        dst_port: int,
+        rate: float,
+        burst: Optional[float] = None,
+        batch_size: int = 64,
+        full_handshake: bool = False,
+        ports: Tuple[int, int] = EPHEMERAL_PORTS,
+        interface: Optional[str] = None,
+        seed: Optional[int] = None,
+        report_interval: float = 1.0,
+        max_pending: int = 65536
+    ):
+        """
+        初始化压力发生器
+        
+        Args:
+            src_ip: 源IP地址
+            dst_ip: 目标IP地址
+            dst_port: 目标端口
+            rate: 目标发送速率(SYN/秒)
+            burst: 令牌桶容量，见 TokenBucket
+            batch_size: 每批最多发送的报文数
+            full_handshake: 是否回复ACK完成握手
+            ports: 随机源端口的范围(含两端)
+            interface: 绑定的网络接口，None表示不绑定
+            seed: 随机种子
+            report_interval: 速率报告的间隔(秒)
+            max_pending: full_handshake 时最多记录多少个等待SYN-ACK的SYN，超出时丢弃最早的
+        """
+        self.src_ip = src_ip
+        self.dst_ip = dst_ip
+        self.dst_port = dst_port
+        self.rate = rate
+        self.burst = burst if burst is not None else max(float(batch_size), rate / 100)
+        self.batch_size = batch_size
+        self.full_handshake = full_handshake
+        self.ports = ports
+        self.interface = interface
+        self.report_interval = report_interval
+        self.address: Tuple[str, int] = (dst_ip, 0)
+        self.rng = random.Random(seed)
+        self._np_rng = np.random.default_rng(seed) if np is not None else None
+        # 等待SYN-ACK的SYN，按发送顺序记录(源端口, ISN)，用于匹配SYN-ACK和RST；
+        # 以ISN区分随机到同一源端口的SYN，超过max_pending时丢弃最早的记录
+        self.max_pending = max_pending
+        self.pending: 'collections.OrderedDict[Tuple[int, int], None]' = collections.OrderedDict()
+        self._send_sock: Optional[socket.socket] = None
+        self._recv_sock: Optional[socket.socket] = None
+        self._syn_sender: Optional[BatchSender] = None
+        self._ack_sender: Optional[BatchSender] = None
+        
+        # 统计
+        self.generated = 0
+        self.sent = 0
+        self.synacks = 0
+        self.resets = 0
+        self.handshakes = 0
+        self.expired = 0
+    
+    def _open_sockets(self) -> Tuple[socket.socket, Optional[socket.socket]]:
+        """创建发送和接收套接字，只发SYN时不需要接收套接字"""
+        send_sock, recv_sock = open_raw_sockets(self.interface)
+        if not self.full_handshake:
+            recv_sock.close()
+            recv_sock = None
+        return send_sock, recv_sock
+    
+    def open(self) -> 'SynLoadGenerator':
+        """打开套接字并准备发送缓冲区，可以重复调用"""
+        if self._send_sock is None:
+            self._send_sock, self._recv_sock = self._open_sockets()
+            if self._recv_sock is not None:
+                self._recv_sock.setblocking(False)
+            self._syn_sender = BatchSender(self._send_sock, self.batch_size, self.address)
+            self._ack_sender = BatchSender(self._send_sock, self.batch_size, self.address)
+        return self
+    
+    def close(self) -> None:
+        """关闭套接字"""
+        for sock in (self._send_sock, self._recv_sock):
+            if sock is not None:
+                sock.close()
+        self._send_sock = self._recv_sock = None
+        self._syn_sender = self._ack_sender = None
+    
+    def __enter__(self) -> 'SynLoadGenerator':
+        return self.open()
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+    
+    def _fill_syns(self, count: int) -> None:
+        """在发送器缓冲区的前count个槽位中构造SYN"""
+        sender = self._syn_sender
+        low, high = self.ports
+        if self._np_rng is not None:
+            ports = self._np_rng.integers(low, high + 1, count, dtype=np.uint32)
+            seqs = self._np_rng.integers(0, 1 << 32, count, dtype=np.uint32)
+            rows = np.frombuffer(sender.buffer, dtype=np.uint8).reshape(-1, RECORD_SIZE)
+            PacketFactory.create_tcp_batch(self.src_ip, self.dst_ip, ports, self.dst_port,
+                                           seqs, 0, flags='S', out=rows[:count])
+            if self.full_handshake:
+                self._track(zip(ports.tolist(), seqs.tolist()))
+            return
+        rng = self.rng
+        sent = []
+        for i in range(count):
+            port = rng.randint(low, high)
+            seq = rng.getrandbits(32)
+            sender.slot(i)[:] = PacketFactory.create_tcp_bytes(self.src_ip, self.dst_ip, port,
+                                                               self.dst_port, 'S', seq, 0)
+            sent.append((port, seq))
+        if self.full_handshake:
+            self._track(sent)
+    
+    def _track(self, syns: Any) -> None:
+        """记录等待应答的(源端口, ISN)，超过max_pending时丢弃最早的记录"""
+        pending = self.pending
+        pending.update((syn, None) for syn in syns)
+        for _ in range(len(pending) - self.max_pending):
+            pending.popitem(last=False)
+            self.expired += 1
+    
+    def _drain(self) -> None:
+        """读取已到达的应答，对匹配的SYN-ACK批量回复ACK"""
+        recv = self._recv_sock.recv
+        sender = self._ack_sender
+        count = 0
+        while count < self.batch_size:
+            try:
+                data = recv(65535)
+            except (BlockingIOError, InterruptedError):
+                break
+            segment = parse_segment(data)
+            if (segment is None or segment.src_ip != self.dst_ip
+                    or segment.src_port != self.dst_port or segment.dst_ip != self.src_ip):
+                continue
+            # SYN-ACK和对SYN的RST都确认了ISN+1
+            key = (segment.dst_port, (segment.ack - 1) & 0xFFFFFFFF)
+            if key not in self.pending:
+                continue
+            if segment.flags & RST:
+                self.resets += 1
+                del self.pending[key]
+            elif segment.flags & (SYN | ACK) == SYN | ACK:
+                self.synacks += 1
+                del self.pending[key]
+                sender.slot(count)[:] = PacketFactory.create_tcp_bytes(
+                    self.src_ip, self.dst_ip, segment.dst_port, self.dst_port, 'A',
+                    segment.ack, (segment.seq + 1) & 0xFFFFFFFF)
+                count += 1
+        if count:
+            self.handshakes += sender.flush(count)
+    
+    def run(self, duration: Optional[float] = None, count: Optional[int] = None,
+            on_report: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        按目标速率发送，直到 duration 秒后、发满 count 个SYN或被 KeyboardInterrupt 中断
+        
+        Args:
+            duration: 运行时长(秒)，None表示不限
+            count: 本次要构造的SYN数(含发送失败的)，None表示不限
+            on_report: 每隔 report_interval 秒以当前统计调用一次，默认写日志
+        
+        Returns:
+            Dict[str, Any]: 统计信息，rate为整个运行期间的实际发送速率
+        """
+        self.open()
+        report = on_report or self._log_report
+        sender = self._syn_sender
+        perf_counter = time.perf_counter
+        start = perf_counter()
+        bucket = TokenBucket(self.rate, self.burst, now=start)
+        deadline = None if duration is None else start + duration
+        next_report = start + self.report_interval
+        last_sent, last_time = self.sent, start
+        limit = None if count is None else self.generated + count
+        try:
+            while limit is None or self.generated < limit:
+                now = perf_counter()
+                if deadline is not None and now >= deadline:
+                    break
+                if now >= next_report:
+                    stats = self._snapshot(now - start)
+                    stats['current_rate'] = (self.sent - last_sent) / (now - last_time)
+                    report(stats)
+                    last_sent, last_time = self.sent, now
+                    next_report = now + self.report_interval
+                wanted = self.batch_size if limit is None else min(self.batch_size, limit - self.generated)
+                taken = bucket.consume(wanted, now)
+                if self._recv_sock is not None:
+                    self._drain()
+                if not taken:
+                    time.sleep(min(bucket.delay(wanted, now), 0.01))
+                    continue
+                self._fill_syns(taken)
+                self.generated += taken
+                self.sent += sender.flush(taken)
+            if self._recv_sock is not None:
+                # 等待最后一批SYN的应答
+                linger = perf_counter() + min(1.0, self.report_interval)
+                while self.pending and perf_counter() < linger:
+                    self._drain()
+                    time.sleep(0.001)
+        except KeyboardInterrupt:
+            pass
+        return self._snapshot(perf_counter() - start)
+    
+    def _snapshot(self, elapsed: float) -> Dict[str, Any]:
+        sender = self._syn_sender
+        return {
+            'sent': self.sent,
+            'errors': sender.errors if sender is not None else 0,
+            'syscalls': sender.syscalls if sender is not None else 0,
+            'synacks': self.synacks,
+            'resets': self.resets,
+            'handshakes': self.handshakes,
+            'expired': self.expired,
+            'elapsed': elapsed,
+            'rate': self.sent / elapsed if elapsed else 0.0,
+        }
+    
+    @staticmethod
+    def _log_report(stats: Dict[str, Any]) -> None:
+        logger.info("已发送 %d 个SYN，当前速率 %.0f pps，SYN-ACK %d，握手 %d",
+                    stats['sent'], stats['current_rate'], stats['synacks'], stats['handshakes'])
\ No newline at end of file
@@ -2,9 +2,16 @@
 # -*- coding: utf-8 -*-
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
-from scapy.all import IP
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from scapy.all import IP, TCP
 import logging
+import threading
+import time
+import warnings
+from .dispatch import DispatchQueue, BLOCK
+from ..utils.headers import header_of
+from ..utils.packet_table import PacketTable, ip_to_int
+from ..utils.pcap import PcapWriter
 
 logger = logging.getLogger(__name__)
 
@@ -15,16 +22,77 @@ class PacketObserver(ABC):
     def update(self, packet: IP, event_type: str, **kwargs) -> None:
         """更新观察者状态"""
         pass
+    
+    def update_batch(self, packets: Sequence[IP], event_types: Sequence[str],
+                     timestamps: Optional[Sequence[Optional[float]]] = None) -> None:
+        """
+        批量更新观察者状态，默认逐个调用 update，子类可重写以整批处理
+        
+        Args:
+            packets: 数据包
+            event_types: 与数据包一一对应的事件类型
+            timestamps: 与数据包一一对应的时间戳(对应 update 的time参数)，None表示未提供
+        """
+        if timestamps is None:
+            for packet, event_type in zip(packets, event_types):
+                self.update(packet, event_type)
+            return
+        for packet, event_type, timestamp in zip(packets, event_types, timestamps):
+            if timestamp is None:
+                self.update(packet, event_type)
+            else:
+                self.update(packet, event_type, time=timestamp)
+
+class _PacketSummary:
+    """延迟到日志真正输出时才调用 packet.summary()"""
+    
+    __slots__ = ("packet", "extra")
+    
+    def __init__(self, packet: IP, extra: Dict[str, Any]):
+        self.packet = packet
+        self.extra = extra
+    
+    def __str__(self) -> str:
+        summary = self.packet.summary()
+        if self.extra:
+            summary += " " + " ".join(f"{key}={value}" for key, value in self.extra.items())
+        return summary
 
 class LoggingObserver(PacketObserver):
-    """日志观察者"""
+    """日志观察者
+    
+    每个数据包只产生一条日志记录，消息在输出时才格式化；
+    日志级别未启用时直接返回，不做任何处理。
+    """
+    
+    def __init__(self, level: int = logging.INFO, sample_rate: int = 1):
+        """
+        初始化日志观察者
+        
+        Args:
+            level: 日志级别
+            sample_rate: 采样率，每N个数据包记录一个
+        """
+        if sample_rate < 1:
+            raise ValueError(f"采样率必须为正整数: {sample_rate}")
+        self.level = level
+        self.sample_rate = sample_rate
+        self._count = 0
     
     def update(self, packet: IP, event_type: str, **kwargs) -> None:
         """记录数据包事件"""
-        logger.info(f"事件类型: {event_type}")
-        logger.info(f"数据包: {packet.summary()}")
-        for key, value in kwargs.items():
-            logger.info(f"{key}: {value}")
+        if not logger.isEnabledFor(self.level):
+            return
+        self._count += 1
+        if self.sample_rate > 1 and self._count % self.sample_rate != 1:
+            return
+        logger.log(self.level, "事件类型: %s 数据包: %s", event_type, _PacketSummary(packet, kwargs))
+    
+    def update_batch(self, packets: Sequence[IP], event_types: Sequence[str],
+                     timestamps: Optional[Sequence[Optional[float]]] = None) -> None:
+        """日志级别未启用时整批跳过"""
+        if logger.isEnabledFor(self.level):
+            super().update_batch(packets, event_types, timestamps)
 
 class PacketCaptureObserver(PacketObserver):
     """数据包捕获观察者"""
@@ -36,52 +104,305 @@ class PacketCaptureObserver(PacketObserver):
         """捕获数据包"""
         self.captured_packets.append(packet)
     
+    def update_batch(self, packets: Sequence[IP], event_types: Sequence[str],
+                     timestamps: Optional[Sequence[Optional[float]]] = None) -> None:
+        """批量捕获数据包"""
+        self.captured_packets.extend(packets)
+    
     def get_captured_packets(self) -> List[IP]:
         """获取捕获的数据包"""
         return self.captured_packets
 
+class PcapSinkObserver(PacketObserver):
+    """流式抓包观察者：逐个报文写入pcap/pcapng文件，不在内存中保留报文"""
+    
+    def __init__(self, filename: str, format: str = "pcap", max_bytes: Optional[int] = None,
+                 max_seconds: Optional[float] = None):
+        """
+        初始化流式抓包观察者
+        
+        Args:
+            filename: 输出文件名
+            format: 文件格式，pcap或pcapng
+            max_bytes: 按文件大小滚动的阈值(字节)
+            max_seconds: 按时长滚动的阈值(秒)
+        """
+        self.writer = PcapWriter(filename, format=format, max_bytes=max_bytes,
+                                 max_seconds=max_seconds)
+    
+    def update(self, packet: IP, event_type: str, **kwargs) -> None:
+        """写入数据包，带链路层头部的报文只保存IP层"""
+        if not isinstance(packet, IP) and packet.haslayer(IP):
+            packet = packet[IP]
+        self.writer.write(bytes(packet), kwargs.get('time', float(packet.time)))
+    
+    def update_batch(self, packets: Sequence[IP], event_types: Sequence[str],
+                     timestamps: Optional[Sequence[Optional[float]]] = None) -> None:
+        """整批序列化后一次写入"""
+        if timestamps is None:
+            timestamps = [None] * len(packets)
+        data, times = [], []
+        for packet, timestamp in zip(packets, timestamps):
+            if not isinstance(packet, IP) and packet.haslayer(IP):
+                packet = packet[IP]
+            data.append(bytes(packet))
+            times.append(float(packet.time) if timestamp is None else timestamp)
+        self.writer.write_many(data, times)
+    
+    def close(self) -> None:
+        """关闭输出文件"""
+        self.writer.close()
+
 class PacketAnalyzerObserver(PacketObserver):
-    """数据包分析观察者"""
+    """数据包分析观察者
+    
+    分析结果保存在列式报文表 table 中，可直接做向量化的过滤和聚合查询。
+    """
     
     def __init__(self):
-        self.analysis_results: List[Dict[str, Any]] = []
+        self.table = PacketTable()
+    
+    @staticmethod
+    def _fields(packet: IP) -> Optional[Tuple[int, ...]]:
+        """取出报文表一行中除时间戳和事件外的字段，不是TCP报文时返回None"""
+        # 收到的报文直接解析Scapy保存的原始字节，只有程序构造的报文才按层查找
+        header = header_of(packet)
+        if header is not None:
+            return (header.src_addr, header.dst_addr, header.sport, header.dport,
+                    header.seq, header.ack, header.flags, len(header.payload))
+        if not packet.haslayer(TCP):
+            return None
+        ip = packet[IP]
+        tcp = packet[TCP]
+        return (ip_to_int(ip.src), ip_to_int(ip.dst), tcp.sport, tcp.dport,
+                tcp.seq, tcp.ack, int(tcp.flags), len(tcp.payload))
     
     def update(self, packet: IP, event_type: str, **kwargs) -> None:
         """分析数据包"""
-        if packet.haslayer(TCP):
-            analysis = {
-                'event_type': event_type,
-                'src_ip': packet[IP].src,
-                'dst_ip': packet[IP].dst,
-                'sport': packet[TCP].sport,
-                'dport': packet[TCP].dport,
-                'seq': packet[TCP].seq,
-                'ack': packet[TCP].ack,
-                'flags': packet[TCP].flags
-            }
-            self.analysis_results.append(analysis)
+        fields = self._fields(packet)
+        if fields is not None:
+            self.table.append(kwargs.get('time', float(packet.time)), *fields, event_type)
+    
+    def update_batch(self, packets: Sequence[IP], event_types: Sequence[str],
+                     timestamps: Optional[Sequence[Optional[float]]] = None) -> None:
+        """逐列收集整批数据包的字段，再一次追加到报文表"""
+        if timestamps is None:
+            timestamps = [None] * len(packets)
+        names = ('timestamp', 'src_ip', 'dst_ip', 'sport', 'dport', 'seq', 'ack', 'flags',
+                 'payload_len')
+        columns: Dict[str, List[Any]] = {name: [] for name in names}
+        events = []
+        for packet, event_type, timestamp in zip(packets, event_types, timestamps):
+            fields = self._fields(packet)
+            if fields is None:
+                continue
+            row = (float(packet.time) if timestamp is None else timestamp,) + fields
+            for name, value in zip(names, row):
+                columns[name].append(value)
+            events.append(event_type)
+        self.table.extend(columns, events=events)
     
     def get_analysis_results(self) -> List[Dict[str, Any]]:
-        """获取分析结果"""
-        return self.analysis_results
+        """以字典列表的形式获取分析结果"""
+        results = []
+        for row in self.table:
+            row['event_type'] = row.pop('event')
+            results.append(row)
+        return results
+    
+    @property
+    def analysis_results(self) -> List[Dict[str, Any]]:
+        """已弃用：分析结果改存在报文表 table 中，这里按需由 get_analysis_results 生成，只读"""
+        warnings.warn("analysis_results 已弃用，请使用 table 或 get_analysis_results()",
+                      DeprecationWarning, stacklevel=2)
+        return self.get_analysis_results()
+
+class QueuedObserver(PacketObserver):
+    """异步观察者：把事件放入有界队列，由后台线程调用被包装观察者的 update"""
+    
+    def __init__(self, observer: PacketObserver, maxsize: int = 1024, policy: str = BLOCK,
+                 sample_rate: int = 10):
+        """
+        初始化异步观察者
+        
+        Args:
+            observer: 被包装的观察者
+            maxsize: 队列容量
+            policy: 队列已满时的策略，block、drop_oldest或sample
+            sample_rate: sample策略下队列过半后每N个事件接收一个
+        """
+        self.observer = observer
+        self.queue = DispatchQueue(observer.update, maxsize=maxsize, policy=policy,
+                                   sample_rate=sample_rate,
+                                   name=f"observer-{type(observer).__name__}")
+    
+    def update(self, packet: IP, event_type: str, **kwargs) -> None:
+        """把事件放入队列"""
+        self.queue.put(packet, event_type, **kwargs)
+    
+    def update_batch(self, packets: Sequence[IP], event_types: Sequence[str],
+                     timestamps: Optional[Sequence[Optional[float]]] = None) -> None:
+        """整批作为一个事件放入队列"""
+        self.queue.put_call(self.observer.update_batch, packets, event_types, timestamps)
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待队列中的事件全部处理完"""
+        return self.queue.flush(timeout)
+    
+    def close(self) -> None:
+        """处理完剩余事件后停止后台线程，并关闭被包装的观察者"""
+        self.queue.close()
+        close = getattr(self.observer, 'close', None)
+        if close is not None:
+            close()
+    
+    def metrics(self) -> Dict[str, Any]:
+        """获取队列深度、丢弃数和延迟等指标"""
+        return self.queue.metrics()
 
 class Subject:
     """主题类"""
     
     def __init__(self):
         self._observers: List[PacketObserver] = []
+        self.batch_size = 0
+        self.batch_interval: Optional[float] = None
+        self._batch_packets: List[IP] = []
+        self._batch_event_types: List[str] = []
+        self._batch_timestamps: List[Optional[float]] = []
+        self._batch_started = 0.0
+        # 设置了interval时由后台线程按时刷新，缓存的读写和整批通知都在该条件变量的锁内
+        self._batch_ready = threading.Condition(threading.RLock())
+        self._batch_flusher: Optional[threading.Thread] = None
+    
+    def enable_batching(self, size: int = 256, interval: Optional[float] = None) -> None:
+        """
+        开启批量通知：notify 先把数据包缓存起来，攒够size个或距第一个缓存的数据包
+        超过interval秒时，通过 update_batch 一次性通知所有观察者
+        
+        设置interval时启动一个后台线程，即使之后没有新的数据包，缓存的数据包最迟
+        在interval秒后也会被通知(此时 update_batch 在该线程中调用，与 notify
+        互斥)。收发结束时仍需调用 flush_batch(或 flush_observers)处理剩余的数据包。
+        批量模式下 notify 的关键字参数只保留time。
+        
+        Args:
+            size: 每批的数据包数
+            interval: 每批最长的缓存时间(秒)，None表示只按数量
+        """
+        if size < 1:
+            raise ValueError(f"批量大小必须为正整数: {size}")
+        with self._batch_ready:
+            self.batch_size = size
+            self.batch_interval = interval
+            self._batch_ready.notify()
+        if interval is not None and self._batch_flusher is None:
+            self._batch_flusher = threading.Thread(target=self._flush_periodically,
+                                                   name="observer-batch-flusher", daemon=True)
+            self._batch_flusher.start()
+    
+    def disable_batching(self) -> None:
+        """关闭批量通知，并通知已缓存的数据包"""
+        with self._batch_ready:
+            self.flush_batch()
+            self.batch_size = 0
+            self.batch_interval = None
+            self._batch_ready.notify()
+        if self._batch_flusher is not None:
+            self._batch_flusher.join()
+            self._batch_flusher = None
+    
+    def _flush_periodically(self) -> None:
+        """后台线程：第一个数据包缓存满interval秒时刷新，关闭按时刷新后退出"""
+        ready = self._batch_ready
+        with ready:
+            while self.batch_interval is not None:
+                if not self._batch_packets:
+                    ready.wait()
+                    continue
+                remaining = self._batch_started + self.batch_interval - time.monotonic()
+                if remaining > 0:
+                    ready.wait(remaining)
+                    continue
+                self.flush_batch()
+    
+    def flush_batch(self) -> None:
+        """把已缓存的数据包通知给所有观察者"""
+        with self._batch_ready:
+            if not self._batch_packets:
+                return
+            packets, event_types, timestamps = (self._batch_packets, self._batch_event_types,
+                                                self._batch_timestamps)
+            self._batch_packets, self._batch_event_types, self._batch_timestamps = [], [], []
+            self.notify_batch(packets, event_types, timestamps)
+    
+    def notify_batch(self, packets: Sequence[IP], event_types: Sequence[str],
+                     timestamps: Optional[Sequence[Optional[float]]] = None) -> None:
+        """把一批数据包通知给所有观察者"""
+        for observer in self._observers:
+            observer.update_batch(packets, event_types, timestamps)
     
     def attach(self, observer: PacketObserver) -> None:
         """添加观察者"""
         if observer not in self._observers:
             self._observers.append(observer)
     
+    def attach_queued(self, observer: PacketObserver, maxsize: int = 1024, policy: str = BLOCK,
+                      sample_rate: int = 10) -> QueuedObserver:
+        """
+        以异步方式添加观察者，notify 只把事件放入该观察者的队列
+        
+        Args:
+            observer: 观察者
+            maxsize: 队列容量
+            policy: 队列已满时的策略，block、drop_oldest或sample
+            sample_rate: sample策略下队列过半后每N个事件接收一个
+        
+        Returns:
+            QueuedObserver: 包装后的观察者，可用于查询指标
+        """
+        queued = QueuedObserver(observer, maxsize=maxsize, policy=policy, sample_rate=sample_rate)
+        self.attach(queued)
+        return queued
+    
     def detach(self, observer: PacketObserver) -> None:
-        """移除观察者"""
-        if observer in self._observers:
-            self._observers.remove(observer)
+        """移除观察者，异步添加的观察者可以传入包装前的对象"""
+        for attached in self._observers:
+            if attached is observer or getattr(attached, 'observer', None) is observer:
+                self._observers.remove(attached)
+                if isinstance(attached, QueuedObserver):
+                    attached.queue.close()
+                return
+    
+    def flush_observers(self, timeout: Optional[float] = None) -> None:
+        """通知已缓存的数据包，并等待所有异步观察者处理完已入队的事件"""
+        self.flush_batch()
+        for observer in self._observers:
+            if isinstance(observer, QueuedObserver):
+                observer.flush(timeout)
+    
+    def observer_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """获取各异步观察者的队列指标，键为被包装观察者的类名"""
+        return {
+            type(observer.observer).__name__: observer.metrics()
+            for observer in self._observers
+            if isinstance(observer, QueuedObserver)
+        }
     
     def notify(self, packet: IP, event_type: str, **kwargs) -> None:
         """通知所有观察者"""
+        if self.batch_size:
+            with self._batch_ready:
+                if not self._batch_packets:
+                    self._batch_started = time.monotonic()
+                    if self.batch_interval is not None:
+                        self._batch_ready.notify()
+                self._batch_packets.append(packet)
+                self._batch_event_types.append(event_type)
+                self._batch_timestamps.append(kwargs.get('time'))
+                if (len(self._batch_packets) >= self.batch_size
+                        or (self.batch_interval is not None
+                            and time.monotonic() - self._batch_started >= self.batch_interval)):
+                    self.flush_batch()
+            return
         for observer in self._observers:
             observer.update(packet, event_type, **kwargs) 
\ No newline at end of file
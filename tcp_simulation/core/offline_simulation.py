@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import ipaddress
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from .endpoint import VirtualEndpoint
+from .engine import EventScheduler, SimulatedLink
+from .flow_table import ConnectionManager, EPHEMERAL_PORTS
+from .observers import Subject
+from .responder import Responder
+from .segment import Segment
+from .transfer import open_payload
+from ..utils.pcap import PcapWriter
+
+logger = logging.getLogger(__name__)
+
+def client_address(src_ip: str, src_port: int, index: int) -> Tuple[str, int]:
+    """
+    返回第index条连接的客户端地址
+    
+    客户端端口从src_port开始递增，临时端口用完后客户端IP地址加一
+    
+    Returns:
+        Tuple[str, int]: (客户端IP, 客户端端口)
+    """
+    low, high = EPHEMERAL_PORTS
+    port_count = high - low + 1
+    offset = src_port - low + index
+    return str(ipaddress.ip_address(src_ip) + offset // port_count), low + offset % port_count
+
+class OfflineSimulation(Subject):
+    """离线TCP仿真
+    
+    用离散事件引擎代替 send()/sniff()/sleep()：通信双方各自运行一台TCP
+    状态机，报文经过带时延、带宽和丢包的仿真链路传递，时间由虚拟时钟推进，
+    不需要root权限和网络接口。客户端和服务端各由一个 ConnectionManager
+    表示，所有连接共用同一对链路，按四元组分流。
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        初始化离线仿真器
+        
+        Args:
+            config: 与 TCPSimulation 相同的配置字典，另外支持以下可选项：
+                latency(单向时延，秒)、bandwidth(bit/s)、loss_rate(丢包率)、
+                rto(初始重传超时，秒)、rto_min/rto_max(重传超时上下限，秒)、max_retries、msl(秒)、
+                hold_time(连接建立后保持多久再关闭，秒)、seed(随机种子)、
+                observer_batch_size/observer_batch_interval(观察者批量通知)、
+                transfer_bytes(每条连接建立后客户端发送的数据量，字节)、
+                transfer_file(改为发送该文件的内容，文件以内存映射方式读取)、mss、rcv_wnd(接收窗口，字节)、
+                congestion_control(reno、cubic或bbr)、
+                listen_backlog(设置后服务端改用带SYN队列和accept队列的 Responder，值为accept队列上限)、
+                syn_backlog(SYN队列上限)、syn_cookies(SYN队列满时使用SYN cookie)、
+                accept_rate(服务端每秒accept的连接数)
+        """
+        super().__init__()
+        self.config = config
+        self.src_ip = config['src_ip']
+        self.dst_ip = config['dst_ip']
+        self.src_port = config['src_port']
+        self.dst_port = config['dst_port']
+        self.seq = config['initial_seq']
+        
+        self.scheduler = EventScheduler()
+        self.rng = random.Random(config.get('seed'))
+        self.connections = 0
+        self.completed = 0
+        self.failed = 0
+        self.bytes_delivered = 0
+        self.retransmitted_segments = 0
+        self.transfer_time = 0.0
+        # 所有连接共用同一份负载，按需映射，不随数据量占用内存
+        self.payload = open_payload(config.get('transfer_file'), config.get('transfer_bytes', 0))
+        
+        # 每发送一个报文段调用一次，可用于不经过观察者直接收集报文
+        self.on_send: Optional[Callable[[VirtualEndpoint, Segment], None]] = None
+        # run 指定 pcap_filename 时，发送的报文段边仿真边写入pcap
+        self.pcap_writer: Optional[PcapWriter] = None
+        
+        # 客户端/服务端主机及其之间的双向链路
+        self.links = [self._create_link(), self._create_link()]
+        endpoint_options = {
+            'rto': config.get('rto', 1.0),
+            'min_rto': config.get('rto_min', 1.0),
+            'max_rto': config.get('rto_max', 60.0),
+            'max_retries': config.get('max_retries', 5),
+            'msl': config.get('msl', 30.0),
+            'mss': config.get('mss', 1460),
+            'rcv_wnd': config.get('rcv_wnd', 65535),
+            'congestion_control': config.get('congestion_control', 'reno'),
+        }
+        self.client = ConnectionManager(self.scheduler, self.src_ip, link=self.links[0],
+                                        rng=self.rng, **endpoint_options)
+        if config.get('listen_backlog'):
+            self.server: ConnectionManager = Responder(
+                self.scheduler, self.dst_ip, link=self.links[1], rng=self.rng,
+                backlog=config['listen_backlog'], syn_backlog=config.get('syn_backlog', 256),
+                syn_cookies=config.get('syn_cookies', False), accept_rate=config.get('accept_rate'),
+                synack_retries=endpoint_options['max_retries'], synack_timeout=endpoint_options['rto'],
+                secret=self.rng.getrandbits(128).to_bytes(16, 'big'), **endpoint_options
+            )
+        else:
+            self.server = ConnectionManager(self.scheduler, self.dst_ip, link=self.links[1],
+                                            rng=self.rng, **endpoint_options)
+        self.links[0].attach(self.server.receive)
+        self.links[1].attach(self.client.receive)
+        for manager in (self.client, self.server):
+            manager.on_send = self._on_send
+            manager.on_receive = self._on_receive
+        self.client.on_closed = self._on_client_closed
+        self.server.listen(self.dst_port)
+        if config.get('observer_batch_size'):
+            self.enable_batching(config['observer_batch_size'],
+                                 config.get('observer_batch_interval'))
+    
+    def _create_link(self) -> SimulatedLink:
+        return SimulatedLink(
+            self.scheduler,
+            latency=self.config.get('latency', 0.001),
+            bandwidth=self.config.get('bandwidth'),
+            loss_rate=self.config.get('loss_rate', 0.0),
+            rng=self.rng
+        )
+    
+    def add_connection(self, src_port: Optional[int] = None, start_time: float = 0.0,
+                       src_ip: Optional[str] = None) -> None:
+        """
+        添加一条连接：客户端在start_time主动打开，服务端在dst_port被动监听
+        
+        Args:
+            src_port: 客户端端口，默认使用配置中的src_port
+            start_time: 发起连接的虚拟时间(秒)
+            src_ip: 客户端IP地址，默认使用配置中的src_ip
+        """
+        if src_port is None:
+            src_port = self.src_port
+        # 第一条连接使用配置的初始序列号，其余随机生成
+        isn = self.seq if not self.connections else None
+        self.connections += 1
+        self.scheduler.schedule_at(start_time, self.client.connect, self.dst_ip, self.dst_port,
+                                   src_port, src_ip or self.src_ip, isn,
+                                   self.config.get('hold_time', 0.0), self.payload)
+    
+    def connection_address(self, index: int) -> Tuple[str, int]:
+        """返回 run 中第index条连接的客户端地址，见 client_address"""
+        return client_address(self.src_ip, self.src_port, index)
+    
+    def _on_send(self, endpoint: Optional[VirtualEndpoint], segment: Segment) -> None:
+        if self.pcap_writer is not None:
+            self.pcap_writer.write(segment.to_parts(), self.scheduler.now)
+        if self.on_send is not None:
+            self.on_send(endpoint, segment)
+        if self._observers:
+            # Responder 的SYN-ACK由监听队列发出，还没有对应的连接
+            state = endpoint.state.name if endpoint is not None else "SYN_RECEIVED"
+            self.notify(segment.to_packet(), f"SEND_{state}", time=self.scheduler.now)
+    
+    def _on_receive(self, endpoint: VirtualEndpoint, segment: Segment) -> None:
+        if self._observers:
+            self.notify(segment.to_packet(), f"RECEIVE_{endpoint.state.name}",
+                        time=self.scheduler.now)
+    
+    def _on_client_closed(self, endpoint: VirtualEndpoint) -> None:
+        if endpoint.failed or endpoint.established_at is None:
+            self.failed += 1
+        else:
+            self.completed += 1
+        sender = endpoint.sender
+        if sender is not None:
+            self.bytes_delivered += sender.acked
+            self.retransmitted_segments += sender.retransmits
+            if sender.started_at is not None and sender.completed_at is not None:
+                self.transfer_time += sender.completed_at - sender.started_at
+    
+    def run(self, connections: int = 1, interval: float = 0.0,
+            until: Optional[float] = None, pcap_filename: Optional[str] = None) -> Dict[str, Any]:
+        """
+        运行离线仿真
+        
+        Args:
+            connections: 要仿真的连接数，客户端端口从src_port开始递增，
+                端口用完后客户端IP地址依次加一
+            interval: 相邻连接发起的时间间隔(虚拟秒)
+            until: 虚拟时间上限，None表示运行到所有事件结束
+            pcap_filename: 写入所有发送报文的pcap文件名，None表示不保存
+        
+        Returns:
+            Dict[str, Any]: 仿真统计信息
+        """
+        logger.info("开始离线TCP仿真...")
+        if pcap_filename is not None:
+            self.pcap_writer = PcapWriter(pcap_filename,
+                                          format=self.config.get('pcap_format', 'pcap'),
+                                          max_bytes=self.config.get('pcap_max_bytes'),
+                                          max_seconds=self.config.get('pcap_rotate_seconds'))
+        for i in range(connections):
+            src_ip, src_port = self.connection_address(i)
+            self.add_connection(src_port=src_port, start_time=self.scheduler.now + i * interval,
+                                src_ip=src_ip)
+        
+        wall_start = time.perf_counter()
+        try:
+            events = self.scheduler.run(until=until)
+            self.flush_observers()
+        finally:
+            if self.pcap_writer is not None:
+                self.pcap_writer.close()
+                self.pcap_writer = None
+        wall_time = time.perf_counter() - wall_start
+        
+        stats = self.get_stats()
+        stats['events'] = events
+        stats['wall_time'] = wall_time
+        logger.info("离线TCP仿真完成: %d/%d 条连接正常关闭，虚拟时间 %.3f 秒，耗时 %.3f 秒",
+                    stats['completed'], stats['connections'], stats['virtual_time'], wall_time)
+        return stats
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取仿真统计信息"""
+        stats: Dict[str, Any] = {
+            'connections': self.connections,
+            'completed': self.completed,
+            'failed': self.failed,
+            'active_flows': len(self.client.flows) + len(self.server.flows),
+            'virtual_time': self.scheduler.now,
+            'packets_sent': sum(link.sent for link in self.links),
+            'packets_dropped': sum(link.dropped for link in self.links),
+            'bytes_delivered': self.bytes_delivered,
+            'retransmitted_segments': self.retransmitted_segments,
+            'transfer_time': self.transfer_time,
+            # 平均每条连接的有效吞吐量(bit/s)
+            'goodput': self.bytes_delivered * 8 / self.transfer_time if self.transfer_time else 0.0,
+        }
+        if isinstance(self.server, Responder):
+            stats['listener'] = self.server.get_listen_stats()
+        return stats
\ No newline at end of file
@@ -1,14 +1,186 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import socket
+import struct
+import sys
+from functools import lru_cache
 from scapy.all import IP, TCP, Raw
-from typing import Optional, Dict, Any
+from scapy.compat import bytes_encode
+from typing import Optional, Dict, Any, Sequence, Union
+from ..utils.error_handler import ConfigurationError
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖，用于批量构造和加速负载校验和
+    np = None
+
+# IPv4头部中总长度、校验和字段的偏移
+_IP_TOTAL_LEN_OFFSET = 2
+_IP_CHECKSUM_OFFSET = 10
+
+# IPv4头部(无选项)之后TCP各字段在报文中的偏移
+_TCP_PORTS_OFFSET = 20
+_TCP_SEQ_ACK_OFFSET = 24
+_TCP_WINDOW_OFFSET = 34
+_TCP_CHECKSUM_OFFSET = 36
+
+_PORTS_STRUCT = struct.Struct("!HH")
+_SEQ_ACK_STRUCT = struct.Struct("!II")
+_CHECKSUM_STRUCT = struct.Struct("!H")
+_IP_HEADER_WORDS = struct.Struct("!10H")
+
+# 负载类型：str按Scapy的方式编码，bytes/bytearray/memoryview(包括映射文件的视图)原样使用
+Payload = Union[str, bytes, bytearray, memoryview]
+
+# 与Scapy默认值保持一致的IPv4/TCP头部字段
+_IP_ID = 1
+_IP_TTL = 64
+_TCP_WINDOW = 8192
+_HEADER_LEN = 40
+
+_TCP_FLAG_BITS = {
+    'F': 0x01, 'S': 0x02, 'R': 0x04, 'P': 0x08,
+    'A': 0x10, 'U': 0x20, 'E': 0x40, 'C': 0x80
+}
+
+def _fold_checksum(total: Any) -> Any:
+    """对反码和做进位回卷并取反，得到16位校验和"""
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+class PacketTemplate:
+    """预编译的TCP数据包模板"""
+    
+    __slots__ = ("raw", "base_sum")
+    
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        # 校验和字段取反即为模板中其余各字段的反码和
+        checksum = _CHECKSUM_STRUCT.unpack_from(raw, _TCP_CHECKSUM_OFFSET)[0]
+        self.base_sum = ~checksum & 0xFFFF
+    
+    def render(self, src_port: int, dst_port: int, seq: int, ack: int,
+               window: int = _TCP_WINDOW) -> bytes:
+        """在模板上写入端口、序列号、确认号和窗口，返回序列化后的数据包"""
+        buf = bytearray(self.raw)
+        _PORTS_STRUCT.pack_into(buf, _TCP_PORTS_OFFSET, src_port, dst_port)
+        _SEQ_ACK_STRUCT.pack_into(buf, _TCP_SEQ_ACK_OFFSET, seq, ack)
+        _CHECKSUM_STRUCT.pack_into(buf, _TCP_WINDOW_OFFSET, window)
+        
+        # 模板中这些字段均为0，按RFC 1624把新值直接累加到反码和上
+        total = (self.base_sum + src_port + dst_port + window
+                 + (seq >> 16) + (seq & 0xFFFF)
+                 + (ack >> 16) + (ack & 0xFFFF))
+        total = (total >> 16) + (total & 0xFFFF)
+        total += total >> 16
+        _CHECKSUM_STRUCT.pack_into(buf, _TCP_CHECKSUM_OFFSET, ~total & 0xFFFF)
+        return bytes(buf)
+    
+    def render_header(self, src_port: int, dst_port: int, seq: int, ack: int,
+                      payload: memoryview, window: int = _TCP_WINDOW) -> bytes:
+        """
+        生成携带payload时的IPv4+TCP头部
+        
+        总长度和两个校验和都已计入负载，负载本身不被复制，
+        头部与负载依次写出即为完整报文。
+        """
+        length = len(payload)
+        buf = bytearray(self.raw)
+        _CHECKSUM_STRUCT.pack_into(buf, _IP_TOTAL_LEN_OFFSET, _HEADER_LEN + length)
+        _CHECKSUM_STRUCT.pack_into(buf, _IP_CHECKSUM_OFFSET, 0)
+        _CHECKSUM_STRUCT.pack_into(buf, _IP_CHECKSUM_OFFSET,
+                                   _fold_checksum(sum(_IP_HEADER_WORDS.unpack_from(buf))))
+        _PORTS_STRUCT.pack_into(buf, _TCP_PORTS_OFFSET, src_port, dst_port)
+        _SEQ_ACK_STRUCT.pack_into(buf, _TCP_SEQ_ACK_OFFSET, seq, ack)
+        _CHECKSUM_STRUCT.pack_into(buf, _TCP_WINDOW_OFFSET, window)
+        
+        # 伪首部中的TCP长度增加length，再加上负载各16位字之和
+        total = (self.base_sum + src_port + dst_port + window
+                 + (seq >> 16) + (seq & 0xFFFF)
+                 + (ack >> 16) + (ack & 0xFFFF)
+                 + length + _payload_sum(payload))
+        _CHECKSUM_STRUCT.pack_into(buf, _TCP_CHECKSUM_OFFSET, _fold_checksum(total))
+        return bytes(buf)
+
+@lru_cache(maxsize=4096)
+def _get_template(src_ip: str, dst_ip: str, flags: Union[str, int]) -> PacketTemplate:
+    """构造并缓存(源IP, 目标IP, 标志位)对应的数据包模板"""
+    packet = IP(src=src_ip, dst=dst_ip)/TCP(
+        sport=0,
+        dport=0,
+        flags=flags,
+        seq=0,
+        ack=0,
+        window=0
+    )
+    return PacketTemplate(bytes(packet))
+
+@lru_cache(maxsize=4096)
+def _get_template_packet(src_ip: str, dst_ip: str, flags: Union[str, int]) -> IP:
+    """构造并缓存(源IP, 目标IP, 标志位)对应的Scapy数据包，调用方只能使用其副本"""
+    return IP(src=src_ip, dst=dst_ip)/TCP(flags=flags)
+
+def as_payload(payload: Payload) -> memoryview:
+    """
+    把负载统一为按字节寻址的 memoryview，bytes/bytearray/memoryview/mmap 均不复制
+    
+    str 按 UTF-8 编码(与Scapy的Raw一致)，这一种情况会产生一次复制。
+    """
+    if isinstance(payload, str):
+        payload = bytes_encode(payload)
+    view = payload if isinstance(payload, memoryview) else memoryview(payload)
+    if view.format != "B" or view.ndim != 1:
+        view = view.cast("B")
+    return view
+
+def _payload_sum(view: memoryview) -> int:
+    """负载按大端16位字求和(未回卷)，奇数长度时末尾补零"""
+    length = len(view)
+    even = length & ~1
+    if np is not None:
+        total = int(np.frombuffer(view, dtype=">u2", count=even >> 1).sum(dtype=np.uint64))
+    else:
+        # 按本机字节序求和后回卷，小端机器上再交换两个字节(RFC 1071 §2(B))
+        total = sum(view[:even].cast("H"))
+        if sys.byteorder == "little":
+            total = (total >> 16) + (total & 0xFFFF)
+            total += total >> 16
+            total = ((total & 0xFF) << 8) | ((total >> 8) & 0xFF)
+    if length & 1:
+        total += view[-1] << 8
+    return total
+
+def _parse_flags(flags: Union[str, int]) -> int:
+    """将标志位字符串(如'SA')转换为整数"""
+    if isinstance(flags, str):
+        value = 0
+        for char in flags:
+            value |= _TCP_FLAG_BITS[char]
+        return value
+    return int(flags)
+
+def _ip_to_uint32(ips: Any) -> Any:
+    """将IP地址字符串(或已是整数的数组)转换为uint32数组"""
+    if isinstance(ips, str):
+        return np.uint32(struct.unpack("!I", socket.inet_aton(ips))[0])
+    array = np.asarray(ips)
+    if array.dtype.kind in "OUS":
+        packed = b"".join(socket.inet_aton(ip) for ip in array.ravel())
+        return np.frombuffer(packed, dtype=">u4").astype(np.uint32).reshape(array.shape)
+    return array.astype(np.uint32)
 
 class PacketFactory:
     """TCP数据包工厂类"""
     
-    @staticmethod
+    # 模板模式：无负载、无选项的数据包复制缓存的Scapy数据包后只改端口、序列号和确认号，
+    # 不再逐层构造；只需要字节时应使用更快的 create_tcp_bytes
+    template_mode: bool = False
+    
+    @classmethod
     def create_tcp_packet(
+        cls,
         src_ip: str,
         dst_ip: str,
         src_port: int,
@@ -16,8 +188,9 @@ class PacketFactory:
         flags: str,
         seq: int,
         ack: int,
-        payload: Optional[str] = None,
-        options: Optional[Dict[str, Any]] = None
+        payload: Optional[Payload] = None,
+        options: Optional[Dict[str, Any]] = None,
+        window: int = _TCP_WINDOW
     ) -> IP:
         """
         创建TCP数据包
@@ -30,19 +203,31 @@ class PacketFactory:
             flags: TCP标志位
             seq: 序列号
             ack: 确认号
-            payload: 数据包负载
+            payload: 数据包负载，str、bytes或memoryview
             options: TCP选项
-            
+            window: 通告窗口，默认与Scapy一致为8192
+        
         Returns:
             IP: 构造的IP数据包
         """
+        if cls.template_mode and not payload and not options:
+            packet = _get_template_packet(src_ip, dst_ip, flags).copy()
+            tcp_layer = packet.payload
+            tcp_layer.sport = src_port
+            tcp_layer.dport = dst_port
+            tcp_layer.seq = seq
+            tcp_layer.ack = ack
+            tcp_layer.window = window
+            return packet
+        
         # 创建TCP层
         tcp_layer = TCP(
             sport=src_port,
             dport=dst_port,
             flags=flags,
             seq=seq,
-            ack=ack
+            ack=ack,
+            window=window
         )
         
         # 添加TCP选项
@@ -55,6 +240,161 @@ class PacketFactory:
         
         # 添加负载
         if payload:
-            packet = packet/Raw(load=payload)
-            
-        return packet 
\ No newline at end of file
+            # Scapy只接受str/bytes，memoryview在这里复制一次
+            packet = packet/Raw(load=bytes(payload) if isinstance(payload, memoryview) else payload)
+        
+        return packet 
+    
+    @classmethod
+    def create_tcp_bytes(
+        cls,
+        src_ip: str,
+        dst_ip: str,
+        src_port: int,
+        dst_port: int,
+        flags: str,
+        seq: int,
+        ack: int,
+        payload: Optional[Payload] = None,
+        options: Optional[Dict[str, Any]] = None,
+        window: int = _TCP_WINDOW
+    ) -> bytes:
+        """
+        创建序列化后的TCP数据包
+        
+        输出与 bytes(create_tcp_packet(...)) 逐字节一致。没有TCP选项时
+        直接在缓存的模板上修改字段，不再构造Scapy层。
+        
+        Args:
+            参数同 create_tcp_packet
+        
+        Returns:
+            bytes: 序列化后的IP数据包
+        """
+        if options:
+            packet = cls.create_tcp_packet(
+                src_ip, dst_ip, src_port, dst_port, flags, seq, ack,
+                payload=payload, options=options, window=window
+            )
+            return bytes(packet)
+        
+        template = _get_template(src_ip, dst_ip, flags)
+        if payload:
+            view = as_payload(payload)
+            return b"".join((template.render_header(src_port, dst_port, seq, ack, view, window), view))
+        return template.render(src_port, dst_port, seq, ack, window)
+    
+    @staticmethod
+    def create_tcp_header(
+        src_ip: str,
+        dst_ip: str,
+        src_port: int,
+        dst_port: int,
+        flags: Union[str, int],
+        seq: int,
+        ack: int,
+        payload: Payload = b"",
+        window: int = _TCP_WINDOW
+    ) -> bytes:
+        """
+        只创建携带payload的数据包的头部
+        
+        头部之后紧接负载即为 create_tcp_bytes 的输出；调用方可以把头部和负载
+        分别交给 sendmsg 或 pcap 写入器，负载不需要先拼接成一整块。
+        
+        Args:
+            参数同 create_tcp_packet，payload 只用于计算长度和校验和
+        
+        Returns:
+            bytes: 40字节的IPv4+TCP头部
+        """
+        template = _get_template(src_ip, dst_ip, flags)
+        return template.render_header(src_port, dst_port, seq, ack, as_payload(payload), window)
+    
+    @staticmethod
+    def clear_templates() -> None:
+        """清空数据包模板缓存"""
+        _get_template.cache_clear()
+        _get_template_packet.cache_clear()
+    
+    @staticmethod
+    def create_tcp_batch(
+        src_ips: Any,
+        dst_ips: Any,
+        src_ports: Any,
+        dst_ports: Any,
+        seqs: Any,
+        acks: Any,
+        flags: Union[str, int, Sequence[int]] = 'S',
+        out: Optional[Any] = None
+    ) -> Any:
+        """
+        批量创建IPv4+TCP头部
+        
+        所有参数都可以是数组或标量(标量会广播到整个批次)，IP和TCP校验和
+        以向量方式计算。结果中每一行与对应的 create_tcp_bytes 输出一致，
+        可以直接交给 utils.pcap.write_pcap 写盘或逐行通过原始套接字发送。
+        
+        Args:
+            src_ips: 源IP地址，字符串或uint32
+            dst_ips: 目标IP地址，字符串或uint32
+            src_ports: 源端口
+            dst_ports: 目标端口
+            seqs: 序列号
+            acks: 确认号
+            flags: TCP标志位，字符串、整数或整数数组
+            out: 可选的预分配 N×40 uint8数组
+        
+        Returns:
+            numpy.ndarray: 形状为 N×40 的连续uint8数组
+        """
+        if np is None:
+            raise ConfigurationError("批量构造数据包需要安装numpy: pip install tcp-simulation[fast]")
+        
+        if isinstance(flags, (str, int)):
+            flags = _parse_flags(flags)
+        src, dst, sport, dport, seq, ack, flag = np.broadcast_arrays(
+            _ip_to_uint32(src_ips), _ip_to_uint32(dst_ips),
+            np.asarray(src_ports, dtype=np.uint32), np.asarray(dst_ports, dtype=np.uint32),
+            np.asarray(seqs, dtype=np.uint32), np.asarray(acks, dtype=np.uint32),
+            np.asarray(flags, dtype=np.uint32)
+        )
+        count = src.size
+        
+        if out is None:
+            out = np.empty((count, _HEADER_LEN), dtype=np.uint8)
+        elif out.shape != (count, _HEADER_LEN) or out.dtype != np.uint8 or not out.flags.c_contiguous:
+            raise ValueError(f"out必须是形状为({count}, {_HEADER_LEN})的连续uint8数组")
+        
+        # 按网络字节序的16位字视图逐列填写
+        words = out.view(">u2")
+        words[:, 0] = 0x4500
+        words[:, 1] = _HEADER_LEN
+        words[:, 2] = _IP_ID
+        words[:, 3] = 0
+        words[:, 4] = (_IP_TTL << 8) | socket.IPPROTO_TCP
+        words[:, 5] = 0
+        words[:, 6] = src.ravel() >> 16
+        words[:, 7] = src.ravel() & 0xFFFF
+        words[:, 8] = dst.ravel() >> 16
+        words[:, 9] = dst.ravel() & 0xFFFF
+        words[:, 10] = sport.ravel()
+        words[:, 11] = dport.ravel()
+        words[:, 12] = seq.ravel() >> 16
+        words[:, 13] = seq.ravel() & 0xFFFF
+        words[:, 14] = ack.ravel() >> 16
+        words[:, 15] = ack.ravel() & 0xFFFF
+        words[:, 16] = (5 << 12) | flag.ravel()
+        words[:, 17] = _TCP_WINDOW
+        words[:, 18] = 0
+        words[:, 19] = 0
+        
+        # IP头部校验和
+        words[:, 5] = _fold_checksum(words[:, 0:10].sum(axis=1, dtype=np.uint32))
+        
+        # TCP校验和：伪头部(源/目标地址、协议号、TCP长度) + TCP头部
+        pseudo = (words[:, 6:10].sum(axis=1, dtype=np.uint32)
+                  + socket.IPPROTO_TCP + (_HEADER_LEN - 20))
+        words[:, 18] = _fold_checksum(pseudo + words[:, 10:20].sum(axis=1, dtype=np.uint32))
+        
+        return out
\ No newline at end of file
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import errno
+import logging
+import socket
+from typing import Any, Optional, Sequence, Tuple, Union
+from scapy.all import IP
+from ..utils.error_handler import NetworkError, PermissionError
+
+logger = logging.getLogger(__name__)
+
+def open_raw_socket(protocol: int = socket.IPPROTO_RAW,
+                    interface: Optional[str] = None) -> socket.socket:
+    """
+    创建IPv4原始套接字
+    
+    Args:
+        protocol: IPPROTO_RAW用于发送(自带IP头部)，IPPROTO_TCP用于接收TCP报文
+        interface: 绑定的网络接口，None表示不绑定
+    
+    Raises:
+        PermissionError: 没有root权限
+        NetworkError: 创建套接字失败
+    """
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, protocol)
+    except OSError as e:
+        if e.errno in (errno.EPERM, errno.EACCES):
+            raise PermissionError("创建原始套接字需要管理员/root权限") from e
+        raise NetworkError(f"创建原始套接字失败: {e}") from e
+    if protocol == socket.IPPROTO_RAW:
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_HDRINCL, 1)
+    if interface and hasattr(socket, "SO_BINDTODEVICE"):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, interface.encode())
+    return sock
+
+class RawSocket:
+    """持久的L3原始套接字
+    
+    代替每次调用都要新建L3套接字、查路由再关闭的 scapy.send：套接字在第一次
+    发送时打开，之后一直复用，直到 close。报文以序列化后的字节发送，目标地址
+    直接取自IP头部。
+    """
+    
+    def __init__(self, interface: Optional[str] = None, opened_socket: Optional[socket.socket] = None):
+        """
+        初始化原始套接字
+        
+        Args:
+            interface: 绑定的网络接口，None表示不绑定
+            opened_socket: 已打开的套接字，默认用 open_raw_socket 创建
+        """
+        self.interface = interface
+        self._sock = opened_socket
+        self._owns_socket = opened_socket is None
+        
+        # 统计
+        self.sent = 0
+        self.bytes_sent = 0
+    
+    @property
+    def is_open(self) -> bool:
+        """套接字是否已打开"""
+        return self._sock is not None
+    
+    def _open_socket(self) -> socket.socket:
+        return open_raw_socket(socket.IPPROTO_RAW, self.interface)
+    
+    def open(self) -> 'RawSocket':
+        """打开套接字，已打开时不做任何事"""
+        if self._sock is None:
+            self._sock = self._open_socket()
+            self._owns_socket = True
+            logger.debug("原始套接字已打开: %s", self.interface or "默认接口")
+        return self
+    
+    def close(self) -> None:
+        """关闭套接字，之后再发送会重新打开"""
+        if self._sock is not None and self._owns_socket:
+            self._sock.close()
+        self._sock = None
+    
+    def __enter__(self) -> 'RawSocket':
+        return self.open()
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+    
+    def _address(self, dst_ip: str) -> Tuple[str, int]:
+        # 原始套接字不使用端口
+        return (dst_ip, 0)
+    
+    def send(self, packet: Union[bytes, bytearray, memoryview, IP, Sequence[Any]],
+             dst_ip: Optional[str] = None) -> int:
+        """
+        发送一个IPv4报文
+        
+        Args:
+            packet: 序列化后的报文；Scapy的IP报文会先序列化；
+                (头部, 负载)等多段缓冲区以 sendmsg 分散发送，不先拼接
+            dst_ip: 目标地址，默认取自IP头部
+        
+        Returns:
+            int: 发送的字节数
+        """
+        sock = self._sock if self._sock is not None else self.open()._sock
+        if isinstance(packet, IP):
+            packet = bytes(packet)
+        if isinstance(packet, (bytes, bytearray, memoryview)):
+            if dst_ip is None:
+                dst_ip = socket.inet_ntoa(bytes(packet[16:20]))
+            sent = sock.sendto(packet, self._address(dst_ip))
+        else:
+            if dst_ip is None:
+                dst_ip = socket.inet_ntoa(bytes(packet[0][16:20]))
+            sent = sock.sendmsg(packet, (), 0, self._address(dst_ip))
+        self.sent += 1
+        self.bytes_sent += sent
+        return sent
\ No newline at end of file
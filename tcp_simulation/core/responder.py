@@ -0,0 +1,633 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import collections
+import hashlib
+import heapq
+import itertools
+import logging
+import os
+import select
+import socket
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .async_simulation import open_raw_sockets, segment_from_header
+from .endpoint import VirtualEndpoint
+from .engine import EventScheduler, SimulatedLink
+from .flow_table import ConnectionManager, FlowKey
+from .packet_factory import PacketFactory
+from .segment import Segment, SYN, ACK, FIN, RST
+from ..utils.headers import parse_tcp_header
+
+logger = logging.getLogger(__name__)
+
+SEQ_MOD = 1 << 32
+
+class IsnGenerator:
+    """RFC 6528 初始序列号：ISN = M + F(四元组, 密钥)
+    
+    M是每4微秒加一的计时器，F取带密钥的BLAKE2s摘要的前32位；
+    不同四元组的ISN互不相关且无法预测，同一四元组的ISN随时间递增。
+    """
+    
+    __slots__ = ("secret",)
+    
+    def __init__(self, secret: Optional[bytes] = None):
+        self.secret = secret or os.urandom(16)
+    
+    def __call__(self, key: FlowKey, now: float) -> int:
+        """为四元组 key 在时刻 now(秒)生成ISN"""
+        digest = hashlib.blake2s(_key_bytes(key), key=self.secret, digest_size=4).digest()
+        return (int(now * 250000) + int.from_bytes(digest, "big")) % SEQ_MOD
+
+def _key_bytes(key: FlowKey) -> bytes:
+    return f"{key[0]}:{key[1]}>{key[2]}:{key[3]}".encode()
+
+class SynCookies:
+    """无状态SYN cookie(D. J. Bernstein的方案)
+    
+    cookie = H1(四元组) + 对端ISN + (t << 24) + ((H2(四元组, t) + MSS编号) mod 2^24)，
+    t是每64秒加一的计数器(模256)。第三次握手的ACK号减一即为cookie，
+    从中还原t和MSS编号并校验，服务端不需要为半连接保存任何状态。
+    """
+    
+    __slots__ = ("secret",)
+    
+    MSS_TABLE = (536, 1300, 1440, 1460)
+    PERIOD = 64.0
+    MAX_AGE = 2  # 接受最近几个周期内发出的cookie
+    
+    def __init__(self, secret: Optional[bytes] = None):
+        self.secret = secret or os.urandom(16)
+    
+    def _hash(self, key: FlowKey, salt: bytes) -> int:
+        digest = hashlib.blake2s(salt + _key_bytes(key), key=self.secret, digest_size=4).digest()
+        return int.from_bytes(digest, "big")
+    
+    def make(self, key: FlowKey, peer_isn: int, mss: int, now: float) -> int:
+        """
+        生成cookie，作为SYN-ACK的序列号
+        
+        Args:
+            key: (本端IP, 本端端口, 对端IP, 对端端口)
+            peer_isn: SYN中的序列号
+            mss: 对端通告的MSS，向下取到表中最接近的值
+            now: 当前时间(秒)
+        """
+        index = 0
+        for i, value in enumerate(self.MSS_TABLE):
+            if value <= mss:
+                index = i
+        counter = int(now / self.PERIOD) & 0xFF
+        low = (self._hash(key, bytes((2, counter))) + index) & 0xFFFFFF
+        return (self._hash(key, b"\x01") + peer_isn + (counter << 24) + low) % SEQ_MOD
+    
+    def check(self, key: FlowKey, peer_isn: int, cookie: int, now: float) -> Optional[int]:
+        """
+        校验第三次握手ACK中的cookie
+        
+        Args:
+            peer_isn: ACK的序列号减一
+            cookie: ACK的确认号减一
+        
+        Returns:
+            Optional[int]: 有效时返回编码在cookie中的MSS，否则为None
+        """
+        value = (cookie - self._hash(key, b"\x01") - peer_isn) % SEQ_MOD
+        counter = value >> 24
+        age = (int(now / self.PERIOD) - counter) & 0xFF
+        if age > self.MAX_AGE:
+            return None
+        index = ((value & 0xFFFFFF) - self._hash(key, bytes((2, counter)))) & 0xFFFFFF
+        if index >= len(self.MSS_TABLE):
+            return None
+        return self.MSS_TABLE[index]
+
+class HalfOpen:
+    """SYN队列中的半连接"""
+    
+    __slots__ = ("key", "isn", "rcv_nxt", "mss", "created_at", "retries", "cookie", "timer")
+    
+    def __init__(self, key: FlowKey, isn: int, rcv_nxt: int, mss: int, created_at: float,
+                 cookie: bool = False):
+        self.key = key
+        self.isn = isn
+        self.rcv_nxt = rcv_nxt
+        self.mss = mss
+        self.created_at = created_at
+        self.retries = 0
+        self.cookie = cookie
+        self.timer: Any = None
+
+class ListenQueue:
+    """一个监听端口的SYN队列和全连接(accept)队列
+    
+    与传输方式无关，仿真链路和原始套接字上的监听方共用。队列长度限制与Linux一致：
+    accept队列满时丢弃新的SYN，也丢弃完成握手的ACK(让对端重传)；SYN队列满时
+    启用了SYN cookie就改发cookie，否则丢弃SYN。
+    """
+    
+    def __init__(self, backlog: int = 128, syn_backlog: int = 256, syn_cookies: bool = False,
+                 mss: int = 1460, secret: Optional[bytes] = None):
+        """
+        初始化监听队列
+        
+        Args:
+            backlog: accept队列上限(已完成握手、等待应用accept的连接数)
+            syn_backlog: SYN队列上限(半连接数)
+            syn_cookies: SYN队列满时是否使用SYN cookie
+            mss: 本端MSS
+            secret: ISN和cookie使用的密钥，默认随机生成
+        """
+        self.backlog = backlog
+        self.syn_backlog = syn_backlog
+        self.mss = mss
+        self.isn = IsnGenerator(secret)
+        self.cookies = SynCookies(secret) if syn_cookies else None
+        self.syn_queue: Dict[FlowKey, HalfOpen] = {}
+        self.accept_queue: Deque[Any] = collections.deque()
+        
+        # 统计
+        self.syn_received = 0
+        self.syn_dropped = 0
+        self.listen_overflows = 0
+        self.cookies_sent = 0
+        self.cookies_accepted = 0
+        self.cookies_rejected = 0
+        self.accept_overflows = 0
+        self.established = 0
+        self.accepted = 0
+        self.synack_retransmits = 0
+        self.synack_timeouts = 0
+        self.max_syn_queue = 0
+        self.max_accept_queue = 0
+    
+    def on_syn(self, key: FlowKey, seq: int, now: float, mss: Optional[int] = None) -> Optional[HalfOpen]:
+        """
+        处理SYN
+        
+        Returns:
+            Optional[HalfOpen]: 需要回复SYN-ACK的半连接(重复的SYN返回已有的半连接)，
+                丢弃时为None
+        """
+        self.syn_received += 1
+        entry = self.syn_queue.get(key)
+        if entry is not None:
+            return entry
+        if len(self.accept_queue) >= self.backlog:
+            self.listen_overflows += 1
+            return None
+        rcv_nxt = (seq + 1) % SEQ_MOD
+        mss = min(mss or self.mss, self.mss)
+        if len(self.syn_queue) >= self.syn_backlog:
+            if self.cookies is None:
+                self.syn_dropped += 1
+                return None
+            self.cookies_sent += 1
+            return HalfOpen(key, self.cookies.make(key, seq, mss, now), rcv_nxt, mss, now, cookie=True)
+        entry = HalfOpen(key, self.isn(key, now), rcv_nxt, mss, now)
+        self.syn_queue[key] = entry
+        if len(self.syn_queue) > self.max_syn_queue:
+            self.max_syn_queue = len(self.syn_queue)
+        return entry
+    
+    def on_ack(self, key: FlowKey, seq: int, ack: int, now: float) -> Optional[HalfOpen]:
+        """
+        处理第三次握手的ACK
+        
+        Returns:
+            Optional[HalfOpen]: 握手完成的半连接，由调用方建立连接后放入 accept_queue；
+                ACK无效或accept队列已满时为None
+        """
+        entry = self.syn_queue.get(key)
+        if entry is not None:
+            if ack != (entry.isn + 1) % SEQ_MOD or seq != entry.rcv_nxt:
+                return None
+        elif self.cookies is not None:
+            peer_isn = (seq - 1) % SEQ_MOD
+            mss = self.cookies.check(key, peer_isn, (ack - 1) % SEQ_MOD, now)
+            if mss is None:
+                self.cookies_rejected += 1
+                return None
+            entry = HalfOpen(key, (ack - 1) % SEQ_MOD, seq, mss, now, cookie=True)
+        else:
+            return None
+        if len(self.accept_queue) >= self.backlog:
+            # 半连接保留在SYN队列中，等待SYN-ACK重传后对端再次确认
+            self.accept_overflows += 1
+            return None
+        if entry.cookie:
+            self.cookies_accepted += 1
+        else:
+            del self.syn_queue[key]
+        self.established += 1
+        return entry
+    
+    def push(self, connection: Any) -> None:
+        """把已建立的连接放入accept队列"""
+        self.accept_queue.append(connection)
+        if len(self.accept_queue) > self.max_accept_queue:
+            self.max_accept_queue = len(self.accept_queue)
+    
+    def accept(self) -> Optional[Any]:
+        """取出一个已建立的连接，队列为空时返回None"""
+        if not self.accept_queue:
+            return None
+        self.accepted += 1
+        return self.accept_queue.popleft()
+    
+    def remove(self, key: FlowKey) -> Optional[HalfOpen]:
+        """移除半连接(收到RST或SYN-ACK重传超限)"""
+        return self.syn_queue.pop(key, None)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """获取队列统计"""
+        return {
+            'syn_received': self.syn_received,
+            'syn_dropped': self.syn_dropped,
+            'listen_overflows': self.listen_overflows,
+            'cookies_sent': self.cookies_sent,
+            'cookies_accepted': self.cookies_accepted,
+            'cookies_rejected': self.cookies_rejected,
+            'accept_overflows': self.accept_overflows,
+            'established': self.established,
+            'accepted': self.accepted,
+            'synack_retransmits': self.synack_retransmits,
+            'synack_timeouts': self.synack_timeouts,
+            'syn_queue': len(self.syn_queue),
+            'accept_queue': len(self.accept_queue),
+            'max_syn_queue': self.max_syn_queue,
+            'max_accept_queue': self.max_accept_queue,
+        }
+
+class Responder(ConnectionManager):
+    """仿真链路上的被动监听方
+    
+    与 ConnectionManager 不同，监听端口上的SYN不会立即创建连接：半连接放在
+    ListenQueue 的SYN队列(或编码进SYN cookie)中，由监听方回复SYN-ACK并按指数退避重传；
+    第三次握手完成后才创建处于ESTABLISHED的 VirtualEndpoint 并放入accept队列。
+    应用按 accept_rate 从accept队列中取走连接，取得慢时队列逐渐填满，可以观察到
+    SYN丢弃、cookie和握手时延增大等饱和现象。
+    """
+    
+    def __init__(
+        self,
+        scheduler: EventScheduler,
+        local_ip: str,
+        link: Optional[SimulatedLink] = None,
+        rng: Any = None,
+        backlog: int = 128,
+        syn_backlog: int = 256,
+        syn_cookies: bool = False,
+        accept_rate: Optional[float] = None,
+        synack_retries: int = 5,
+        synack_timeout: float = 1.0,
+        secret: Optional[bytes] = None,
+        **endpoint_options: Any
+    ):
+        """
+        初始化监听方
+        
+        Args:
+            scheduler: 事件调度器
+            local_ip: 本机默认IP地址
+            link: 出方向链路
+            rng: 随机数发生器(用于主动连接的ISN，被动连接的ISN按RFC 6528计算)
+            backlog: accept队列上限
+            syn_backlog: SYN队列上限
+            syn_cookies: SYN队列满时是否使用SYN cookie
+            accept_rate: 应用每秒accept的连接数，None表示握手完成后立即accept
+            synack_retries: SYN-ACK最大重传次数，超过后丢弃半连接
+            synack_timeout: SYN-ACK的初始重传超时(秒)，每次重传后翻倍
+            secret: ISN和cookie使用的密钥，默认随机生成
+            endpoint_options: 传给 VirtualEndpoint 的参数
+        """
+        super().__init__(scheduler, local_ip, link=link, rng=rng, **endpoint_options)
+        self.backlog = backlog
+        self.syn_backlog = syn_backlog
+        self.syn_cookies = syn_cookies
+        self.accept_rate = accept_rate
+        self.synack_retries = synack_retries
+        self.synack_timeout = synack_timeout
+        self.secret = secret or os.urandom(16)
+        self.queues: Dict[Tuple[str, int], ListenQueue] = {}
+        self._accepting = False
+        
+        # 应用accept连接时的回调
+        self.on_accept: Optional[Callable[[VirtualEndpoint], None]] = None
+    
+    def listen(self, port: int, local_ip: Optional[str] = None) -> None:
+        """在指定端口上被动监听"""
+        address = (local_ip or self.local_ip, port)
+        self.listeners.add(address)
+        self.queues[address] = ListenQueue(
+            backlog=self.backlog, syn_backlog=self.syn_backlog, syn_cookies=self.syn_cookies,
+            mss=self.endpoint_options.get('mss', 1460), secret=self.secret
+        )
+    
+    def receive(self, segment: Segment) -> None:
+        """链路接收回调：已建立的连接按四元组分流，监听端口上的握手报文交给监听队列"""
+        flow = self.flows.lookup(segment)
+        if flow is not None:
+            flow.receive(segment)
+            return
+        queue = self.queues.get((segment.dst_ip, segment.dst_port))
+        if queue is None:
+            self.unmatched += 1
+            return
+        key = (segment.dst_ip, segment.dst_port, segment.src_ip, segment.src_port)
+        flags = segment.flags
+        now = self.scheduler.now
+        if flags & RST:
+            self._drop(queue, key)
+        elif flags & SYN:
+            if flags & ACK:
+                self.unmatched += 1
+                return
+            entry = queue.on_syn(key, segment.seq, now)
+            if entry is None:
+                return
+            self._send_syn_ack(entry)
+            if not entry.cookie and entry.timer is None:
+                entry.timer = self.scheduler.schedule(self.synack_timeout, self._on_synack_timeout,
+                                                      queue, entry)
+        elif flags & ACK:
+            entry = queue.on_ack(key, segment.seq, segment.ack, now)
+            if entry is None:
+                self.unmatched += 1
+                return
+            if entry.timer is not None:
+                entry.timer.cancel()
+            flow = self._create_flow(key[0], key[1], key[2], key[3], entry.isn)
+            flow.mss = min(flow.mss, entry.mss)
+            self.accepted += 1
+            flow.establish(entry.rcv_nxt)
+            queue.push(flow)
+            self._schedule_accept()
+            # 第三次握手的ACK可能携带数据或FIN
+            if segment.payload or flags & FIN:
+                flow.receive(segment)
+        else:
+            self.unmatched += 1
+    
+    def _send_syn_ack(self, entry: HalfOpen) -> None:
+        local_ip, local_port, remote_ip, remote_port = entry.key
+        segment = Segment(local_ip, remote_ip, local_port, remote_port, SYN | ACK, entry.isn,
+                          entry.rcv_nxt, window=self.endpoint_options.get('rcv_wnd', 65535))
+        if self.on_send is not None:
+            self.on_send(None, segment)
+        if self.link is not None:
+            self.link.transmit(segment)
+    
+    def _on_synack_timeout(self, queue: ListenQueue, entry: HalfOpen) -> None:
+        if queue.syn_queue.get(entry.key) is not entry:
+            return
+        if entry.retries >= self.synack_retries:
+            queue.synack_timeouts += 1
+            self._drop(queue, entry.key)
+            return
+        entry.retries += 1
+        queue.synack_retransmits += 1
+        self._send_syn_ack(entry)
+        entry.timer = self.scheduler.schedule(self.synack_timeout * (2 ** entry.retries),
+                                              self._on_synack_timeout, queue, entry)
+    
+    def _drop(self, queue: ListenQueue, key: FlowKey) -> None:
+        entry = queue.remove(key)
+        if entry is not None and entry.timer is not None:
+            entry.timer.cancel()
+    
+    def _schedule_accept(self) -> None:
+        if self.accept_rate is None:
+            self._accept_all()
+        elif not self._accepting:
+            self._accepting = True
+            self.scheduler.schedule(1.0 / self.accept_rate, self._accept_one)
+    
+    def _accept_all(self) -> None:
+        for queue in self.queues.values():
+            while True:
+                flow = queue.accept()
+                if flow is None:
+                    break
+                if self.on_accept is not None:
+                    self.on_accept(flow)
+    
+    def _accept_one(self) -> None:
+        """模拟应用以固定速率调用accept"""
+        for queue in self.queues.values():
+            flow = queue.accept()
+            if flow is not None:
+                if self.on_accept is not None:
+                    self.on_accept(flow)
+                break
+        if any(queue.accept_queue for queue in self.queues.values()):
+            self.scheduler.schedule(1.0 / self.accept_rate, self._accept_one)
+        else:
+            self._accepting = False
+    
+    def get_listen_stats(self) -> Dict[str, int]:
+        """获取所有监听端口的队列统计之和(队列长度取最大值)"""
+        stats: Dict[str, int] = {}
+        for queue in self.queues.values():
+            for name, value in queue.get_stats().items():
+                if name.startswith('max_'):
+                    stats[name] = max(stats.get(name, 0), value)
+                else:
+                    stats[name] = stats.get(name, 0) + value
+        return stats
+
+class RawResponder:
+    """原始套接字上的被动监听方
+    
+    在本机地址 local_ip:port 上接收SYN，以 local_ip 为源地址回复SYN-ACK，
+    用 ListenQueue 维护SYN队列和accept队列；对已完成握手的连接只应答对端的FIN。
+    内核对没有监听套接字的端口会回复RST，运行前需要用防火墙丢弃这些RST，例如
+    iptables -A OUTPUT -p tcp --sport PORT --tcp-flags RST RST -j DROP。
+    """
+    
+    def __init__(
+        self,
+        local_ip: str,
+        port: int,
+        interface: Optional[str] = None,
+        backlog: int = 128,
+        syn_backlog: int = 256,
+        syn_cookies: bool = False,
+        synack_retries: int = 5,
+        synack_timeout: float = 1.0,
+        batch_size: int = 64
+    ):
+        """
+        初始化监听方
+        
+        Args:
+            local_ip: 监听的本机IP地址
+            port: 监听端口
+            interface: 绑定的网络接口，None表示不绑定
+            backlog/syn_backlog/syn_cookies: 见 ListenQueue
+            synack_retries: SYN-ACK最大重传次数
+            synack_timeout: SYN-ACK的初始重传超时(秒)，每次重传后翻倍
+            batch_size: 每次套接字可读时最多连续读取的报文数
+        """
+        self.local_ip = local_ip
+        self.port = port
+        self.interface = interface
+        self.synack_retries = synack_retries
+        self.synack_timeout = synack_timeout
+        self.batch_size = batch_size
+        self.queue = ListenQueue(backlog=backlog, syn_backlog=syn_backlog, syn_cookies=syn_cookies)
+        # 已建立的连接：四元组 -> (本端下一个序列号, 期望的对端序列号)
+        self.connections: Dict[FlowKey, Tuple[int, int]] = {}
+        # SYN-ACK重传定时器：(到期时间, 序号, 半连接)的最小堆；握手完成或被移除的
+        # 半连接不从堆中删除，到期弹出时再丢弃
+        self._timers: List[Tuple[float, int, HalfOpen]] = []
+        self._timer_ids = itertools.count()
+        self._send_sock: Optional[socket.socket] = None
+        self._recv_sock: Optional[socket.socket] = None
+        
+        # 统计
+        self.received = 0
+        self.sent = 0
+        self.closed = 0
+    
+    def open(self) -> 'RawResponder':
+        """打开原始套接字"""
+        if self._recv_sock is None:
+            self._send_sock, self._recv_sock = open_raw_sockets(self.interface)
+        return self
+    
+    def close(self) -> None:
+        """关闭原始套接字"""
+        for sock in (self._send_sock, self._recv_sock):
+            if sock is not None:
+                sock.close()
+        self._send_sock = self._recv_sock = None
+    
+    def __enter__(self) -> 'RawResponder':
+        return self.open()
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+    
+    def serve(self, duration: Optional[float] = None,
+              on_accept: Optional[Callable[[FlowKey], None]] = None) -> Dict[str, Any]:
+        """
+        处理到达的报文，直到 duration 秒后或被 KeyboardInterrupt 中断
+        
+        Args:
+            duration: 运行时长(秒)，None表示一直运行
+            on_accept: 握手完成后以四元组调用，默认立即accept
+        
+        Returns:
+            Dict[str, Any]: 统计信息，其中handshakes_per_second为运行期间的平均握手速率
+        """
+        self.open()
+        recv = self._recv_sock.recv
+        start = time.monotonic()
+        deadline = None if duration is None else start + duration
+        try:
+            while True:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                timeout = self._retransmit(now)
+                if deadline is not None:
+                    timeout = min(timeout, deadline - now)
+                readable, _, _ = select.select([self._recv_sock], [], [], max(timeout, 0.0))
+                if not readable:
+                    continue
+                for _ in range(self.batch_size):
+                    try:
+                        data = recv(65535, socket.MSG_DONTWAIT)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    header = parse_tcp_header(data)
+                    if header is not None and header.dport == self.port \
+                            and header.dst_ip == self.local_ip:
+                        self.received += 1
+                        # 只有SYN才需要解析选项，取对端通告的MSS
+                        mss = header.mss if header.flags & SYN else None
+                        self.handle(segment_from_header(header), time.monotonic(), mss)
+                while True:
+                    key = self.queue.accept()
+                    if key is None:
+                        break
+                    if on_accept is not None:
+                        on_accept(key)
+        except KeyboardInterrupt:
+            pass
+        elapsed = time.monotonic() - start
+        stats: Dict[str, Any] = self.queue.get_stats()
+        stats.update(received=self.received, sent=self.sent, closed=self.closed, elapsed=elapsed,
+                     handshakes_per_second=self.queue.established / elapsed if elapsed else 0.0)
+        return stats
+    
+    def handle(self, segment: Segment, now: float, mss: Optional[int] = None) -> None:
+        """处理一个发往监听端口的报文，mss为SYN中通告的MSS"""
+        key = (segment.dst_ip, segment.dst_port, segment.src_ip, segment.src_port)
+        flags = segment.flags
+        queue = self.queue
+        if flags & RST:
+            queue.remove(key)
+            self.connections.pop(key, None)
+            return
+        connection = self.connections.get(key)
+        if connection is not None:
+            snd_nxt, rcv_nxt = connection
+            if flags & FIN:
+                # 对端关闭：一并确认FIN并发出本端的FIN，对端的最后一个ACK不再等待
+                rcv_nxt = (segment.seq + len(segment.payload) + 1) % SEQ_MOD
+                self._transmit(key, "FA", snd_nxt, rcv_nxt)
+                del self.connections[key]
+                self.closed += 1
+            return
+        if flags & SYN:
+            if flags & ACK:
+                return
+            entry = queue.on_syn(key, segment.seq, now, mss)
+            if entry is not None:
+                if not entry.cookie and entry.timer is None:
+                    self._schedule(entry)
+                self._transmit(key, "SA", entry.isn, entry.rcv_nxt)
+        elif flags & ACK:
+            entry = queue.on_ack(key, segment.seq, segment.ack, now)
+            if entry is not None:
+                self.connections[key] = ((entry.isn + 1) % SEQ_MOD, entry.rcv_nxt)
+                queue.push(key)
+    
+    def _schedule(self, entry: HalfOpen) -> None:
+        """按已重传次数设置半连接的下一次SYN-ACK重传时间"""
+        entry.timer = entry.created_at + self.synack_timeout * ((2 << entry.retries) - 1)
+        heapq.heappush(self._timers, (entry.timer, next(self._timer_ids), entry))
+    
+    def _retransmit(self, now: float) -> float:
+        """重传到期的SYN-ACK，返回距下一次重传的时间(秒)；只处理到期的半连接"""
+        queue = self.queue
+        timers = self._timers
+        while timers and timers[0][0] <= now:
+            _, _, entry = heapq.heappop(timers)
+            if queue.syn_queue.get(entry.key) is not entry:
+                continue
+            if entry.retries >= self.synack_retries:
+                queue.synack_timeouts += 1
+                queue.remove(entry.key)
+                continue
+            entry.retries += 1
+            queue.synack_retransmits += 1
+            self._transmit(entry.key, "SA", entry.isn, entry.rcv_nxt)
+            self._schedule(entry)
+        if not timers:
+            return self.synack_timeout
+        return min(self.synack_timeout, timers[0][0] - now)
+    
+    def _transmit(self, key: FlowKey, flags: str, seq: int, ack: int) -> None:
+        local_ip, local_port, remote_ip, remote_port = key
+        data = PacketFactory.create_tcp_bytes(local_ip, remote_ip, local_port, remote_port,
+                                              flags, seq, ack)
+        try:
+            self._send_sock.sendto(data, (remote_ip, 0))
+            self.sent += 1
+        except OSError as e:
+            logger.warning("发送到 %s 失败: %s", remote_ip, e)
\ No newline at end of file
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# RFC 6298 中的平滑系数
+ALPHA = 1 / 8
+BETA = 1 / 4
+K = 4
+
+class RTTEstimator:
+    """RFC 6298 往返时延与重传超时估计
+    
+    每条连接一个实例：收到对未重传报文的确认时调用 sample 更新SRTT/RTTVAR并重新计算RTO，
+    超时重传时调用 backoff 把RTO翻倍。重传过的报文不应取样(Karn算法)，由调用方保证。
+    """
+    
+    __slots__ = ("initial_rto", "min_rto", "max_rto", "granularity", "srtt", "rttvar", "rto")
+    
+    def __init__(self, initial_rto: float = 1.0, min_rto: float = 1.0, max_rto: float = 60.0,
+                 granularity: float = 0.001):
+        """
+        初始化估计器
+        
+        Args:
+            initial_rto: 取得第一个样本之前的RTO(秒)
+            min_rto: RTO下限(秒)，RFC 6298建议1秒
+            max_rto: RTO上限(秒)，退避也不超过该值
+            granularity: 时钟粒度G(秒)
+        """
+        self.initial_rto = initial_rto
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.granularity = granularity
+        self.reset()
+    
+    def reset(self) -> None:
+        """丢弃已有的样本，RTO恢复为初始值"""
+        self.srtt = None
+        self.rttvar = None
+        self.rto = min(self.initial_rto, self.max_rto)
+    
+    def sample(self, rtt: float) -> float:
+        """
+        用一个RTT样本更新估计
+        
+        Args:
+            rtt: 测得的往返时延(秒)
+        
+        Returns:
+            float: 更新后的RTO(秒)
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - BETA) * self.rttvar + BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - ALPHA) * self.srtt + ALPHA * rtt
+        rto = self.srtt + max(self.granularity, K * self.rttvar)
+        self.rto = min(max(rto, self.min_rto), self.max_rto)
+        return self.rto
+    
+    def backoff(self) -> float:
+        """超时重传后把RTO翻倍，返回新的RTO(秒)"""
+        self.rto = min(self.rto * 2, self.max_rto)
+        return self.rto
\ No newline at end of file
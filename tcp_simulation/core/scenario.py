@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import collections
+import json
+import logging
+import os
+import random
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from .endpoint import VirtualEndpoint
+from .engine import EventScheduler, SimulatedLink, Timer
+from .segment import Segment, ACK, FIN, SYN, flags_from_str, flags_to_str
+from ..utils.error_handler import ConfigurationError
+
+try:
+    import yaml
+except ImportError:  # PyYAML为可选依赖，只有YAML格式的场景文件需要
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+SEQ_MOD = 1 << 32
+
+# 动作表的操作码
+OP_SEND = 0
+OP_EXPECT = 1
+OP_DELAY = 2
+OP_QUIET = 3
+
+# 每种步骤允许的键，第一个键决定步骤类型
+_STEP_KEYS = {
+    'send': {'send', 'seq', 'ack', 'data', 'len', 'window', 'drop', 'extra_delay'},
+    'expect': {'expect', 'seq', 'ack', 'len', 'timeout', 'lost'},
+    'delay': {'delay'},
+    'quiet': {'quiet'},
+}
+
+# 可以通过场景中的server传给对端 VirtualEndpoint 的参数
+_PEER_OPTIONS = ('rto', 'min_rto', 'max_rto', 'max_retries', 'msl', 'mss', 'rcv_wnd')
+
+@dataclass
+class ScenarioResult:
+    """一次场景运行的结果"""
+    
+    name: str
+    passed: bool
+    error: Optional[str] = None
+    step: Optional[int] = None  # 失败的步骤序号，从1开始
+    virtual_time: float = 0.0
+    sent: int = 0
+    received: int = 0
+
+@dataclass
+class CompiledScenario:
+    """编译后的场景：扁平的动作表及运行所需的链路和对端参数
+    
+    动作表中每一项是以操作码开头的元组，报文段、绝对序列号和超时都已算好：
+    (OP_SEND, 报文段, 到达时延或None表示丢弃)、
+    (OP_EXPECT, 标志位, 序列号, 确认号, 负载长度, 超时)，不检查的字段为-1、
+    (OP_DELAY, 秒)、(OP_QUIET, 秒)。
+    """
+    
+    name: str
+    actions: Tuple[Tuple[Any, ...], ...]
+    step_numbers: Tuple[int, ...]
+    client: Tuple[str, int]
+    server: Tuple[str, int]
+    server_isn: int
+    latency: float
+    bandwidth: Optional[float]
+    loss_rate: float
+    seed: Optional[int]
+    max_time: float
+    peer_options: Dict[str, Any]
+    
+    def run(self, seed: Optional[int] = None, pcap_writer: Any = None) -> ScenarioResult:
+        """
+        运行一次场景
+        
+        Args:
+            seed: 随机丢包的种子，默认使用场景中的seed
+            pcap_writer: 可选的 PcapWriter，记录双向报文
+        
+        Returns:
+            ScenarioResult: 运行结果
+        """
+        return ScenarioRun(self, seed, pcap_writer).run()
+
+def _seq_len(flags: int, length: int) -> int:
+    """报文段占用的序列号数：负载长度，SYN和FIN各占一个"""
+    return length + (1 if flags & SYN else 0) + (1 if flags & FIN else 0)
+
+def _step_kind(step: Any, name: str, number: int) -> str:
+    if not isinstance(step, dict):
+        raise ConfigurationError(f"场景 {name} 第{number}步必须是字典: {step!r}")
+    for kind, keys in _STEP_KEYS.items():
+        if kind in step:
+            unknown = set(step) - keys
+            if unknown:
+                raise ConfigurationError(
+                    f"场景 {name} 第{number}步包含未知的键: {', '.join(sorted(unknown))}"
+                )
+            return kind
+    raise ConfigurationError(f"场景 {name} 第{number}步缺少动作(send、expect、delay或quiet)")
+
+def _parse_flags(value: Any, name: str, number: int) -> int:
+    try:
+        return flags_from_str(value)
+    except (TypeError, ValueError) as e:
+        raise ConfigurationError(f"场景 {name} 第{number}步的标志位无效: {value!r}") from e
+
+# 步骤中必须是数值的键：True表示只能是整数
+_NUMERIC_KEYS = {'seq': True, 'ack': True, 'len': True, 'window': True,
+                 'timeout': False, 'extra_delay': False}
+
+def _check_numbers(step: Dict[str, Any], name: str, number: int) -> None:
+    for key, integer in _NUMERIC_KEYS.items():
+        if key not in step:
+            continue
+        value = step[key]
+        types = (int,) if integer else (int, float)
+        if isinstance(value, bool) or not isinstance(value, types):
+            kind = "整数" if integer else "数值"
+            raise ConfigurationError(f"场景 {name} 第{number}步的 {key} 必须是{kind}: {value!r}")
+        if key in ('len', 'window', 'timeout', 'extra_delay') and value < 0:
+            raise ConfigurationError(f"场景 {name} 第{number}步的 {key} 不能为负: {value!r}")
+
+def compile_scenario(spec: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None) -> CompiledScenario:
+    """
+    把场景描述编译为动作表
+    
+    发送步骤的序列号默认接着本端上一个报文段，确认号默认为已期望收到的对端数据末尾，
+    都在编译时按双方的初始序列号换算成绝对值并预先构造好报文段；
+    场景中显式给出的seq/ack是相对初始序列号的偏移。
+    
+    Args:
+        spec: 场景描述，包括name、client/server(ip、port、isn)、link(latency、bandwidth、
+            loss_rate)、seed、timeout、max_time和steps
+        defaults: 缺省的地址、端口和本端初始序列号，键与 DEFAULT_CONFIG 相同
+            (src_ip、dst_ip、src_port、dst_port、initial_seq)
+    
+    Returns:
+        CompiledScenario: 编译后的场景
+    
+    Raises:
+        ConfigurationError: 场景描述无效
+    """
+    defaults = defaults or {}
+    name = str(spec.get('name', 'scenario'))
+    client = spec.get('client', {})
+    server = spec.get('server', {})
+    link = spec.get('link', {})
+    steps = spec.get('steps')
+    if not isinstance(steps, list) or not steps:
+        raise ConfigurationError(f"场景 {name} 没有步骤")
+    
+    client_ip = client.get('ip', defaults.get('src_ip', '192.168.1.100'))
+    client_port = client.get('port', defaults.get('src_port', 12345))
+    server_ip = server.get('ip', defaults.get('dst_ip', '192.168.1.101'))
+    server_port = server.get('port', defaults.get('dst_port', 80))
+    client_isn = client.get('isn', defaults.get('initial_seq', 0)) % SEQ_MOD
+    server_isn = server.get('isn', 0) % SEQ_MOD
+    latency = float(link.get('latency', 0.001))
+    default_timeout = float(spec.get('timeout', 3.0))
+    
+    # 均为相对初始序列号的偏移：本端下一个序列号、对端下一个序列号、本端已收到的对端数据末尾
+    snd_nxt = 0
+    peer_nxt = 0
+    rcv_nxt = 0
+    actions: List[Tuple[Any, ...]] = []
+    numbers: List[int] = []
+    for number, step in enumerate(steps, 1):
+        kind = _step_kind(step, name, number)
+        _check_numbers(step, name, number)
+        if kind == 'send':
+            flags = _parse_flags(step['send'], name, number)
+            data = step.get('data')
+            payload = data.encode() if isinstance(data, str) else bytes(step.get('len', 0))
+            seq = step.get('seq', snd_nxt)
+            if 'ack' in step:
+                ack = (server_isn + step['ack']) % SEQ_MOD
+            else:
+                ack = (server_isn + rcv_nxt) % SEQ_MOD if flags & ACK else 0
+            segment = Segment(client_ip, server_ip, client_port, server_port, flags,
+                              (client_isn + seq) % SEQ_MOD, ack, payload,
+                              step.get('window', 65535))
+            delay = None if step.get('drop') else latency + float(step.get('extra_delay', 0.0))
+            actions.append((OP_SEND, segment, delay))
+            snd_nxt = max(snd_nxt, seq + _seq_len(flags, len(payload)))
+        elif kind == 'expect':
+            flags = _parse_flags(step['expect'], name, number)
+            length = step.get('len', -1)
+            seq = step.get('seq', peer_nxt)
+            actions.append((
+                OP_EXPECT, flags,
+                (server_isn + step['seq']) % SEQ_MOD if 'seq' in step else -1,
+                (client_isn + step['ack']) % SEQ_MOD if 'ack' in step else -1,
+                length,
+                float(step.get('timeout', default_timeout)),
+            ))
+            end = seq + _seq_len(flags, max(length, 0))
+            peer_nxt = max(peer_nxt, end)
+            # lost表示收到了但按丢失处理，之后的确认号不包含这个报文段
+            if not step.get('lost'):
+                rcv_nxt = max(rcv_nxt, end)
+        else:
+            seconds = float(step[kind])
+            if seconds < 0:
+                raise ConfigurationError(f"场景 {name} 第{number}步的时间不能为负: {seconds}")
+            actions.append((OP_DELAY if kind == 'delay' else OP_QUIET, seconds))
+        numbers.append(number)
+    
+    return CompiledScenario(
+        name=name,
+        actions=tuple(actions),
+        step_numbers=tuple(numbers),
+        client=(client_ip, client_port),
+        server=(server_ip, server_port),
+        server_isn=server_isn,
+        latency=latency,
+        bandwidth=link.get('bandwidth'),
+        loss_rate=float(link.get('loss_rate', 0.0)),
+        seed=spec.get('seed'),
+        max_time=float(spec.get('max_time', 300.0)),
+        peer_options={key: server[key] for key in _PEER_OPTIONS if key in server},
+    )
+
+class ScenarioRun:
+    """按动作表驱动一次场景
+    
+    脚本一侧直接把预先构造的报文段调度到对端，对端是一台处于LISTEN的
+    VirtualEndpoint，它的回复经 SimulatedLink 返回并放入收件队列，由expect动作依次核对。
+    """
+    
+    def __init__(self, scenario: CompiledScenario, seed: Optional[int] = None,
+                 pcap_writer: Any = None):
+        self.scenario = scenario
+        self.scheduler = EventScheduler()
+        self.rng = random.Random(scenario.seed if seed is None else seed)
+        self.pcap_writer = pcap_writer
+        
+        link = SimulatedLink(self.scheduler, latency=scenario.latency, bandwidth=scenario.bandwidth,
+                             loss_rate=scenario.loss_rate, rng=self.rng)
+        link.attach(self._on_reply)
+        (server_ip, server_port), (client_ip, client_port) = scenario.server, scenario.client
+        self.peer = VirtualEndpoint(self.scheduler, server_ip, server_port, client_ip, client_port,
+                                    scenario.server_isn, link=link, **scenario.peer_options)
+        
+        self.pc = 0
+        self.inbox: Deque[Segment] = collections.deque()
+        self.waiting: Optional[Timer] = None
+        self.quiet = False
+        self.finished = False
+        self.error: Optional[str] = None
+        self.sent = 0
+        self.received = 0
+    
+    def run(self) -> ScenarioResult:
+        """运行到动作表执行完、出错或超过最长运行时间"""
+        scheduler = self.scheduler
+        self.peer.listen()
+        scheduler.schedule(0.0, self._step)
+        max_time = self.scenario.max_time
+        # 逐个事件运行，动作表执行完后不再等待对端剩余的定时器(如重传、TIME_WAIT)
+        run = scheduler.run
+        while not self.finished and run(until=max_time, max_events=1):
+            pass
+        if not self.finished:
+            self._fail(f"超过最长运行时间 {max_time} 秒")
+        
+        passed = self.error is None
+        return ScenarioResult(
+            name=self.scenario.name,
+            passed=passed,
+            error=self.error,
+            step=None if passed else self.scenario.step_numbers[self.pc],
+            virtual_time=scheduler.now,
+            sent=self.sent,
+            received=self.received,
+        )
+    
+    def _step(self) -> None:
+        actions = self.scenario.actions
+        count = len(actions)
+        scheduler = self.scheduler
+        inbox = self.inbox
+        while self.pc < count:
+            action = actions[self.pc]
+            op = action[0]
+            if op == OP_SEND:
+                self._send(action[1], action[2])
+            elif op == OP_EXPECT:
+                if not inbox:
+                    self.waiting = scheduler.schedule(action[5], self._on_timeout)
+                    return
+                if not self._check(action, inbox.popleft()):
+                    return
+            elif op == OP_DELAY:
+                # 等待结束后才前进，超时失败时报告的仍是这一步
+                scheduler.schedule(action[1], self._end_delay)
+                return
+            else:
+                if inbox:
+                    self._fail(f"期望静默，但已收到 {inbox[0]!r}")
+                    return
+                self.quiet = True
+                scheduler.schedule(action[1], self._end_quiet)
+                return
+            self.pc += 1
+        self.finished = True
+    
+    def _send(self, segment: Segment, delay: Optional[float]) -> None:
+        self.sent += 1
+        scheduler = self.scheduler
+        if self.pcap_writer is not None:
+            self.pcap_writer.write(segment.to_parts(), scheduler.now)
+        if delay is None:
+            return
+        loss_rate = self.scenario.loss_rate
+        if loss_rate and self.rng.random() < loss_rate:
+            return
+        scheduler.schedule(delay, self.peer.receive, segment)
+    
+    def _check(self, action: Tuple[Any, ...], segment: Segment) -> bool:
+        _, flags, seq, ack, length, _ = action
+        if (segment.flags != flags or (seq >= 0 and segment.seq != seq)
+                or (ack >= 0 and segment.ack != ack)
+                or (length >= 0 and len(segment.payload) != length)):
+            expected = flags_to_str(flags)
+            if seq >= 0:
+                expected += f" seq={seq}"
+            if ack >= 0:
+                expected += f" ack={ack}"
+            if length >= 0:
+                expected += f" len={length}"
+            self._fail(f"期望 {expected}，收到 {segment!r}")
+            return False
+        return True
+    
+    def _on_reply(self, segment: Segment) -> None:
+        self.received += 1
+        if self.pcap_writer is not None:
+            self.pcap_writer.write(segment.to_parts(), self.scheduler.now)
+        if self.finished:
+            return
+        if self.quiet:
+            self._fail(f"期望静默，但收到 {segment!r}")
+            return
+        self.inbox.append(segment)
+        if self.waiting is not None:
+            self.waiting.cancel()
+            self.waiting = None
+            self._step()
+    
+    def _on_timeout(self) -> None:
+        self.waiting = None
+        action = self.scenario.actions[self.pc]
+        self._fail(f"等待 {flags_to_str(action[1])} 超时({action[5]}秒)")
+    
+    def _end_delay(self) -> None:
+        if self.finished:
+            return
+        self.pc += 1
+        self._step()
+    
+    def _end_quiet(self) -> None:
+        if self.finished:
+            return
+        self.quiet = False
+        self.pc += 1
+        self._step()
+    
+    def _fail(self, message: str) -> None:
+        self.error = message
+        self.finished = True
+
+def load_scenarios(filename: str) -> List[Dict[str, Any]]:
+    """
+    读取场景文件
+    
+    按扩展名解析JSON或YAML(.yaml/.yml，需要PyYAML)；文件内容可以是单个场景，
+    也可以是场景列表。
+    
+    Returns:
+        List[Dict[str, Any]]: 场景描述列表
+    """
+    with open(filename, "r", encoding="utf-8") as f:
+        if os.path.splitext(filename)[1].lower() in (".yaml", ".yml"):
+            if yaml is None:
+                raise ConfigurationError("读取YAML场景文件需要安装PyYAML")
+            content = yaml.safe_load(f)
+        else:
+            content = json.load(f)
+    scenarios = content if isinstance(content, list) else [content]
+    for index, scenario in enumerate(scenarios):
+        if not isinstance(scenario, dict):
+            raise ConfigurationError(f"{filename} 中第{index + 1}个场景不是字典")
+        scenario.setdefault('name', f"{os.path.basename(filename)}#{index + 1}")
+    return scenarios
+
+def run_scenarios(sources: Iterable[Union[str, Dict[str, Any]]],
+                  defaults: Optional[Dict[str, Any]] = None,
+                  pcap_writer: Any = None) -> List[ScenarioResult]:
+    """
+    编译并依次运行多个场景
+    
+    Args:
+        sources: 场景文件名或场景描述
+        defaults: 缺省的地址、端口和初始序列号，见 compile_scenario
+        pcap_writer: 可选的 PcapWriter，所有场景的报文写入同一个文件
+    
+    Returns:
+        List[ScenarioResult]: 各场景的运行结果，顺序与输入一致
+    """
+    specs: List[Dict[str, Any]] = []
+    for source in sources:
+        specs.extend(load_scenarios(source) if isinstance(source, str) else [source])
+    results = []
+    for spec in specs:
+        result = compile_scenario(spec, defaults).run(pcap_writer=pcap_writer)
+        if not result.passed:
+            logger.warning("场景 %s 失败(第%s步): %s", result.name, result.step, result.error)
+        results.append(result)
+    return results
\ No newline at end of file
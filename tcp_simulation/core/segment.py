@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from scapy.all import IP
+from typing import Tuple
+from .packet_factory import PacketFactory, Payload
+
+# TCP标志位
+FIN = 0x01
+SYN = 0x02
+RST = 0x04
+PSH = 0x08
+ACK = 0x10
+URG = 0x20
+
+# 无选项的IPv4+TCP头部长度
+HEADER_LEN = 40
+
+_FLAG_NAMES = ((FIN, 'F'), (SYN, 'S'), (RST, 'R'), (PSH, 'P'), (ACK, 'A'), (URG, 'U'))
+
+def flags_to_str(flags: int) -> str:
+    """将标志位整数转换为Scapy风格的字符串(如'SA')"""
+    return ''.join(char for bit, char in _FLAG_NAMES if flags & bit)
+
+def flags_from_str(flags: str) -> int:
+    """将Scapy风格的标志位字符串(如'SA')转换为整数，遇到未知字符抛出ValueError"""
+    value = 0
+    for char in flags:
+        for bit, name in _FLAG_NAMES:
+            if char == name:
+                value |= bit
+                break
+        else:
+            raise ValueError(f"未知的TCP标志位: {char}")
+    return value
+
+class Segment:
+    """仿真链路上传输的轻量TCP报文段"""
+    
+    __slots__ = ("src_ip", "dst_ip", "src_port", "dst_port", "flags", "seq", "ack", "payload", "window")
+    
+    def __init__(self, src_ip: str, dst_ip: str, src_port: int, dst_port: int,
+                 flags: int, seq: int, ack: int, payload: Payload = b"", window: int = 65535):
+        self.src_ip = src_ip
+        self.dst_ip = dst_ip
+        self.src_port = src_port
+        self.dst_port = dst_port
+        self.flags = flags
+        self.seq = seq
+        self.ack = ack
+        self.payload = payload
+        # 通告窗口，序列化时写入TCP头部
+        self.window = window
+    
+    @property
+    def wire_len(self) -> int:
+        """报文在链路上的长度(字节)"""
+        return HEADER_LEN + len(self.payload)
+    
+    def to_bytes(self) -> bytes:
+        """序列化为原始IP报文"""
+        return PacketFactory.create_tcp_bytes(
+            self.src_ip, self.dst_ip, self.src_port, self.dst_port,
+            self.flags, self.seq, self.ack, payload=self.payload or None, window=self.window
+        )
+    
+    def to_parts(self) -> Tuple[bytes, Payload]:
+        """
+        序列化为(头部, 负载)两部分
+        
+        负载通常是发送缓冲区的 memoryview 切片，原样返回不复制；
+        可以直接交给 write_packet 或 socket.sendmsg。
+        """
+        if not self.payload:
+            return self.to_bytes(), b""
+        header = PacketFactory.create_tcp_header(
+            self.src_ip, self.dst_ip, self.src_port, self.dst_port,
+            self.flags, self.seq, self.ack, self.payload, self.window
+        )
+        return header, self.payload
+    
+    def to_packet(self) -> IP:
+        """转换为Scapy数据包，供观察者使用"""
+        return PacketFactory.create_tcp_packet(
+            self.src_ip, self.dst_ip, self.src_port, self.dst_port,
+            flags_to_str(self.flags), self.seq, self.ack, payload=self.payload or None,
+            window=self.window
+        )
+    
+    def __repr__(self) -> str:
+        return (f"Segment({self.src_ip}:{self.src_port} > {self.dst_ip}:{self.dst_port} "
+                f"{flags_to_str(self.flags)} seq={self.seq} ack={self.ack} len={len(self.payload)})")
\ No newline at end of file
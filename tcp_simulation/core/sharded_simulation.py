@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import heapq
+import logging
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .offline_simulation import OfflineSimulation, client_address
+from .segment import FIN, SYN, RST, PSH, ACK, URG
+from ..utils.pcap import PcapWriter
+
+logger = logging.getLogger(__name__)
+
+# 各分片统计中需要求和的字段
+_SUM_FIELDS = ('connections', 'completed', 'failed', 'active_flows', 'packets_sent',
+               'packets_dropped', 'events', 'bytes_delivered', 'retransmitted_segments',
+               'transfer_time')
+_FLAG_NAMES = ((FIN, 'FIN'), (SYN, 'SYN'), (RST, 'RST'), (PSH, 'PSH'), (ACK, 'ACK'), (URG, 'URG'))
+
+# 整条链路/整个服务端共享的容量，分片时按各分片的连接数比例分配
+_SHARED_RATES = ('bandwidth', 'accept_rate')
+_SHARED_QUEUES = ('listen_backlog', 'syn_backlog')
+
+def shard_of(src_ip: str, src_port: int, dst_ip: str, dst_port: int, shards: int) -> int:
+    """按四元组的CRC32把连接分配到分片，结果在各进程中一致"""
+    key = f"{src_ip}:{src_port}-{dst_ip}:{dst_port}".encode()
+    return zlib.crc32(key) % shards
+
+def _apportion(total: int, weights: List[int], minimum: int = 0) -> List[int]:
+    """按权重把整数total分成若干份(最大余数法)，权重为0的份额为0，其余至少为minimum"""
+    weight_sum = sum(weights)
+    shares = [total * weight // weight_sum for weight in weights]
+    remainders = sorted(range(len(weights)), key=lambda i: total * weights[i] % weight_sum,
+                        reverse=True)
+    for i in remainders[:total - sum(shares)]:
+        shares[i] += 1
+    return [max(share, minimum) if weight else 0 for share, weight in zip(shares, weights)]
+
+def shard_configs(config: Dict[str, Any], counts: List[int]) -> List[Dict[str, Any]]:
+    """
+    为各分片生成配置，把链路带宽、accept速率和监听队列按各分片的连接数比例分配
+    
+    各分片的容量之和等于配置值(监听队列不足以每个分片分到一个时，每个有连接的
+    分片至少分到一个)，使分片运行与单进程运行的总体容量一致。分片之间不共享
+    队列，链路排队和队列溢出只在分片内部发生，结果是单进程运行的近似。
+    
+    Args:
+        config: 与 OfflineSimulation 相同的配置字典
+        counts: 各分片的连接数
+    """
+    configs = [dict(config) for _ in counts]
+    total = sum(counts)
+    if not total:
+        return configs
+    for key in _SHARED_RATES:
+        if config.get(key):
+            for shard_config, count in zip(configs, counts):
+                shard_config[key] = config[key] * count / total
+    if config.get('listen_backlog'):
+        # 与 OfflineSimulation 的默认值一致
+        queues = dict(config, syn_backlog=config.get('syn_backlog', 256))
+        for key in _SHARED_QUEUES:
+            minimum = 1 if key == 'listen_backlog' else 0
+            for shard_config, share in zip(configs, _apportion(queues[key], counts, minimum)):
+                shard_config[key] = share
+        active = sum(1 for count in counts if count)
+        if config['listen_backlog'] < active:
+            logger.warning("listen_backlog(%d)小于有连接的分片数(%d)，分片运行的总队列容量大于配置值",
+                           config['listen_backlog'], active)
+    return configs
+
+# 共享内存中每条报文的记录头：float64时间戳、uint32报文长度
+_RECORD = struct.Struct("<dI")
+_INITIAL_CAPTURE_SIZE = 1 << 20
+
+class _CaptureBuffer:
+    """工作进程中直接写入共享内存的报文缓冲区，空间不够时换一块两倍大的共享内存"""
+    
+    def __init__(self, size: int = _INITIAL_CAPTURE_SIZE):
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.used = 0
+        self.count = 0
+    
+    def append(self, timestamp: float, header: bytes, payload: Any) -> None:
+        length = len(header) + len(payload)
+        end = self.used + _RECORD.size + length
+        if end > self.shm.size:
+            self._grow(end)
+        buf = self.shm.buf
+        offset = self.used
+        _RECORD.pack_into(buf, offset, timestamp, length)
+        offset += _RECORD.size
+        buf[offset:offset + len(header)] = header
+        offset += len(header)
+        buf[offset:end] = payload
+        del buf
+        self.used = end
+        self.count += 1
+    
+    def _grow(self, needed: int) -> None:
+        old = self.shm
+        self.shm = shared_memory.SharedMemory(create=True, size=max(needed, 2 * old.size))
+        self.shm.buf[:self.used] = old.buf[:self.used]
+        old.close()
+        old.unlink()
+    
+    def detach(self) -> Optional[Tuple[str, int]]:
+        """关闭本进程的映射，返回(共享内存名称, 已用字节数)，由主进程读取后unlink"""
+        name = self.shm.name
+        self.shm.close()
+        if not self.count:
+            self.shm.unlink()
+            return None
+        # 工作进程与主进程共用同一个resource_tracker，主进程unlink时一并注销
+        return name, self.used
+
+def _run_shard(config: Dict[str, Any], addresses: List[Tuple[int, str, int]], interval: float,
+               until: Optional[float], shard: int, shards: int,
+               capture: bool) -> Dict[str, Any]:
+    """
+    工作进程入口：只仿真主进程分配给本分片的连接
+    
+    addresses 为本分片各连接的(全局序号, 客户端IP, 客户端端口)。报文在发送时直接
+    写入共享内存，每条为 [float64时间戳][uint32长度][报文数据]，返回共享内存的
+    名称和已用大小。
+    """
+    config = dict(config)
+    if config.get('seed') is not None:
+        config['seed'] = config['seed'] * shards + shard
+    simulation = OfflineSimulation(config)
+    
+    buffer = _CaptureBuffer() if capture else None
+    flag_counts = [0] * 256
+    scheduler = simulation.scheduler
+    
+    def record(endpoint: Any, segment: Any) -> None:
+        flag_counts[segment.flags] += 1
+        if buffer is not None:
+            # 负载是发送缓冲区的切片，头部和负载分别写入共享内存，不先拼成完整报文
+            header, payload = segment.to_parts()
+            buffer.append(scheduler.now, header, payload)
+    
+    simulation.on_send = record
+    
+    for i, src_ip, src_port in addresses:
+        if i:
+            # 与单进程运行一致，只有第0条连接使用配置的初始序列号，其余由各分片的随机数生成
+            simulation.seq = None
+        simulation.add_connection(src_port=src_port, start_time=i * interval, src_ip=src_ip)
+    stats = simulation.run(connections=0, until=until)
+    stats['flags'] = {name: sum(count for flags, count in enumerate(flag_counts) if flags & bit)
+                      for bit, name in _FLAG_NAMES}
+    
+    stats['packets_captured'] = buffer.count if buffer is not None else 0
+    stats['shared_memory'] = buffer.detach() if buffer is not None else None
+    return stats
+
+def _iter_shard(shm: shared_memory.SharedMemory, size: int) -> Iterator[Tuple[float, memoryview]]:
+    """逐条返回一个分片的(时间戳, 报文数据)，报文数据是共享内存的切片，不复制"""
+    buf = shm.buf
+    offset = 0
+    while offset < size:
+        timestamp, length = _RECORD.unpack_from(buf, offset)
+        offset += _RECORD.size
+        yield timestamp, buf[offset:offset + length]
+        offset += length
+
+class ShardedSimulation:
+    """多进程分片的离线仿真
+    
+    主进程按连接四元组的哈希把连接分配到多个工作进程，每个进程运行独立的
+    OfflineSimulation；报文通过共享内存传回主进程，按时间戳归并后写入pcap，
+    各分片的统计信息合并为一份。链路带宽、accept速率和监听队列按连接数
+    比例分给各分片(见 shard_configs)，各分片之间不共享队列。
+    """
+    
+    def __init__(self, config: Dict[str, Any], workers: Optional[int] = None):
+        """
+        初始化分片仿真
+        
+        Args:
+            config: 与 OfflineSimulation 相同的配置字典
+            workers: 工作进程数，默认为CPU核数
+        """
+        self.config = config
+        self.workers = workers or os.cpu_count() or 1
+    
+    def run(self, connections: int = 1, interval: float = 0.0, until: Optional[float] = None,
+            pcap_filename: Optional[str] = None) -> Dict[str, Any]:
+        """
+        运行分片仿真
+        
+        Args:
+            connections: 连接总数，客户端地址的分配方式与 OfflineSimulation.run 相同
+            interval: 相邻连接发起的时间间隔(虚拟秒)
+            until: 虚拟时间上限
+            pcap_filename: 合并后的pcap文件名，None表示不收集报文
+        
+        Returns:
+            Dict[str, Any]: 合并后的统计信息，shards中为各分片的统计
+        """
+        logger.info("开始分片离线仿真: %d 条连接，%d 个进程", connections, self.workers)
+        wall_start = time.perf_counter()
+        capture = pcap_filename is not None
+        config = self.config
+        assignments: List[List[Tuple[int, str, int]]] = [[] for _ in range(self.workers)]
+        for i in range(connections):
+            src_ip, src_port = client_address(config['src_ip'], config['src_port'], i)
+            shard = shard_of(src_ip, src_port, config['dst_ip'], config['dst_port'], self.workers)
+            assignments[shard].append((i, src_ip, src_port))
+        configs = shard_configs(config, [len(addresses) for addresses in assignments])
+        if capture:
+            # 先在主进程启动resource_tracker，工作进程(包括fork出的)与主进程共用它，
+            # 工作进程退出时不会回收交给主进程的共享内存
+            resource_tracker.ensure_running()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(_run_shard, configs[shard], assignments[shard], interval, until,
+                                shard, self.workers, capture)
+                for shard in range(self.workers)
+            ]
+            shards = [future.result() for future in futures]
+        
+        segments = []
+        try:
+            for stats in shards:
+                location = stats.pop('shared_memory')
+                if location is not None:
+                    segments.append((shared_memory.SharedMemory(name=location[0]), location[1]))
+            if capture:
+                self._write_pcap(pcap_filename, segments)
+        finally:
+            for shm, _ in segments:
+                shm.close()
+                shm.unlink()
+        
+        result = self.merge_stats(shards)
+        result['wall_time'] = time.perf_counter() - wall_start
+        logger.info("分片离线仿真完成: %d/%d 条连接正常关闭，耗时 %.3f 秒",
+                    result['completed'], result['connections'], result['wall_time'])
+        return result
+    
+    def _write_pcap(self, pcap_filename: str,
+                    segments: List[Tuple[shared_memory.SharedMemory, int]]) -> None:
+        """直接从各分片的共享内存归并报文写入pcap，不复制到本进程"""
+        with PcapWriter(pcap_filename,
+                        format=self.config.get('pcap_format', 'pcap'),
+                        max_bytes=self.config.get('pcap_max_bytes'),
+                        max_seconds=self.config.get('pcap_rotate_seconds')) as writer:
+            streams = [_iter_shard(shm, size) for shm, size in segments]
+            try:
+                # 每个分片内的报文已按时间排序，k路归并即可
+                for timestamp, packet in heapq.merge(*streams, key=lambda item: item[0]):
+                    writer.write(packet, timestamp)
+                    # 切片引用着共享内存，关闭共享内存前必须全部释放
+                    packet.release()
+            finally:
+                for stream in streams:
+                    stream.close()
+    
+    @staticmethod
+    def merge_stats(shards: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """合并各分片的统计信息"""
+        result: Dict[str, Any] = {field: sum(stats[field] for stats in shards)
+                                  for field in _SUM_FIELDS}
+        result['virtual_time'] = max((stats['virtual_time'] for stats in shards), default=0.0)
+        result['goodput'] = (result['bytes_delivered'] * 8 / result['transfer_time']
+                             if result['transfer_time'] else 0.0)
+        result['packets_captured'] = sum(stats['packets_captured'] for stats in shards)
+        result['flags'] = {name: sum(stats['flags'][name] for stats in shards)
+                           for _, name in _FLAG_NAMES}
+        listeners = [stats['listener'] for stats in shards if 'listener' in stats]
+        if listeners:
+            result['listener'] = {name: (max if name.startswith('max_') else sum)(
+                                      stats[name] for stats in listeners)
+                                  for name in listeners[0]}
+        result['shards'] = shards
+        return result
\ No newline at end of file
@@ -2,12 +2,16 @@
 # -*- coding: utf-8 -*-
 
 from typing import Optional, Dict, Any
-from scapy.all import IP, send, sniff
+from scapy.all import IP, TCP
 import time
 import logging
+from .capture import CaptureSession, reply_filter
 from .packet_factory import PacketFactory
+from .raw_socket import RawSocket
 from .tcp_state import TCPState, ClosedState
-from .observers import Subject, LoggingObserver, PacketCaptureObserver, PacketAnalyzerObserver
+from .observers import Subject, LoggingObserver, PcapSinkObserver, PacketAnalyzerObserver
+from .rtt import RTTEstimator
+from ..utils.metrics import PhaseMetrics
 
 logger = logging.getLogger(__name__)
 
@@ -24,17 +28,49 @@ class TCPSimulation(Subject):
         self.dst_port = config['dst_port']
         self.seq = config['initial_seq']
         self.ack = 0
-        self.current_state: TCPState = ClosedState(self)
+        self.current_state: TCPState = ClosedState()
+        # 各阶段(构造、发送、等待应答、观察者分发、状态转换)的耗时直方图
+        self.metrics = PhaseMetrics(enabled=config.get('metrics_enabled', True))
+        # 等待应答的超时由测得的RTT按RFC 6298计算
+        self.rtt = RTTEstimator(
+            initial_rto=config.get('rto', 1.0),
+            min_rto=config.get('rto_min', 1.0),
+            max_rto=config.get('rto_max', 60.0)
+        )
+        self.reply_retries = config.get('reply_retries', 0)
+        self.capture = CaptureSession(
+            interface=config['interface'],
+            bpf_filter=reply_filter(self.src_ip, self.dst_ip, self.src_port, self.dst_port)
+        )
+        # 整个仿真期间复用同一个原始套接字发送
+        self.socket = RawSocket(interface=config['interface'])
         
         # 初始化观察者
-        self.logging_observer = LoggingObserver()
-        self.capture_observer = PacketCaptureObserver()
+        self.logging_observer = LoggingObserver(sample_rate=config.get('log_sample_rate', 1))
+        self.capture_observer: Optional[PcapSinkObserver] = None
+        if config['save_pcap']:
+            self.capture_observer = PcapSinkObserver(
+                config['pcap_filename'],
+                format=config.get('pcap_format', 'pcap'),
+                max_bytes=config.get('pcap_max_bytes'),
+                max_seconds=config.get('pcap_rotate_seconds')
+            )
         self.analyzer_observer = PacketAnalyzerObserver()
         
-        # 注册观察者
+        # 注册观察者；配置了observer_policy时写盘和分析改在后台线程中进行
         self.attach(self.logging_observer)
-        self.attach(self.capture_observer)
-        self.attach(self.analyzer_observer)
+        policy = config.get('observer_policy')
+        for observer in (self.capture_observer, self.analyzer_observer):
+            if observer is None:
+                continue
+            if policy:
+                self.attach_queued(observer, maxsize=config.get('observer_queue_size', 1024),
+                                   policy=policy)
+            else:
+                self.attach(observer)
+        if config.get('observer_batch_size'):
+            self.enable_batching(config['observer_batch_size'],
+                                 config.get('observer_batch_interval'))
     
     def create_syn_packet(self) -> IP:
         """创建SYN包"""
@@ -69,50 +105,116 @@ class TCPSimulation(Subject):
         )
     
     def send_and_capture(self, packet: IP, description: str) -> None:
-        """发送数据包并捕获响应"""
-        # 发送数据包
-        send(packet, verbose=0)
-        self.notify(packet, f"SEND_{description}")
+        """
+        发送数据包并捕获响应
         
-        # 捕获响应
-        response = sniff(
-            iface=self.config['interface'],
-            count=1,
-            timeout=2,
-            filter=f"host {self.src_ip} and host {self.dst_ip}"
-        )
+        SYN/FIN等待应答的超时为当前RTO，未收到应答时按指数退避重传，最多reply_retries次；
+        纯ACK不等待，只取出缓冲区中已经到达的报文。只有未重传过的SYN/FIN的应答
+        用于更新RTT估计(Karn算法)。
+        """
+        metrics = self.metrics
+        clock = time.perf_counter_ns
+        expects_reply = bool(int(packet[TCP].flags) & 0x03) if packet.haslayer(TCP) else False
+        retries = 0
+        # 只序列化一次，重传时直接发送同样的字节
+        data = bytes(packet)
         
-        if response:
-            self.notify(response[0], f"RECEIVE_{description}")
+        while True:
+            # 发送数据包
+            start = clock()
+            self.socket.send(data, self.dst_ip)
+            sent = clock()
+            self.notify(packet, f"SEND_{description}")
+            notified = clock()
+            metrics.record("send", sent - start)
+            metrics.record("dispatch", notified - sent)
+            
+            # 从持久抓包会话的缓冲区中读取响应
+            if not self.capture.is_open:
+                self.capture.open()
+            response = self.capture.get(timeout=self.rtt.rto if expects_reply else 0)
+            received = clock()
+            metrics.record("wait", received - notified)
+            
+            if response is not None:
+                if expects_reply and not retries:
+                    self.rtt.sample((received - sent) / 1e9)
+                self.notify(response, f"RECEIVE_{description}")
+                metrics.record("dispatch", clock() - received)
+                break
+            if not expects_reply or retries >= self.reply_retries:
+                break
+            retries += 1
+            self.rtt.backoff()
+            logger.debug("%s 未收到应答，第 %d 次重传，RTO %.3f 秒", description, retries, self.rtt.rto)
         
-        time.sleep(self.config['packet_delay'])
+        # packet_delay为固定的步间间隔，未设置时收到应答(或超时)后立即进行下一步
+        delay = self.config.get('packet_delay')
+        if delay:
+            time.sleep(delay)
     
     def run(self) -> None:
         """运行TCP仿真"""
         try:
             logger.info("开始TCP仿真...")
+            self.capture.open()
+            
+            metrics = self.metrics
+            clock = time.perf_counter_ns
             
             # 执行状态转换
             while True:
                 # 处理当前状态
-                packet = self.current_state.handle_packet(None)
+                start = clock()
+                packet = self.current_state.handle_packet(self, None)
+                metrics.record("build", clock() - start)
                 if packet:
                     self.send_and_capture(packet, self.current_state.__class__.__name__)
                 
                 # 转换到下一个状态
+                start = clock()
                 self.current_state = self.current_state.get_next_state()
+                metrics.record("transition", clock() - start)
                 
                 # 如果回到初始状态，结束仿真
                 if isinstance(self.current_state, ClosedState):
                     break
             
-            # 保存捕获的数据包
-            if self.config['save_pcap']:
-                from scapy.all import wrpcap
-                wrpcap(self.config['pcap_filename'], self.capture_observer.get_captured_packets())
-            
             logger.info("TCP仿真完成")
-            
+        
         except Exception as e:
             logger.error(f"仿真过程中发生错误: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+        finally:
+            self.close()
+            self.flush_observers()
+            for name, metrics in self.observer_metrics().items():
+                logger.debug("观察者 %s 队列指标: %s", name, metrics)
+            if self.capture_observer is not None:
+                self.capture_observer.close()
+            if self.metrics.enabled:
+                for phase, summary in self.get_metrics().items():
+                    logger.debug("阶段 %s 耗时: %s", phase, summary)
+                if self.config.get('metrics_file'):
+                    self.metrics.dump(self.config['metrics_file'], self.config.get('metrics_format'))
+    
+    def close(self) -> None:
+        """关闭抓包会话和原始套接字"""
+        self.capture.close()
+        self.socket.close()
+    
+    def __enter__(self) -> 'TCPSimulation':
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+    
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各阶段的耗时统计
+        
+        Returns:
+            Dict[str, Dict[str, Any]]: 阶段名(build/send/wait/dispatch/transition)到
+                count/sum/min/max/mean/p50/p90/p99/p999(秒)的映射
+        """
+        return self.metrics.to_dict() 
\ No newline at end of file
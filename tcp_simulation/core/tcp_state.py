@@ -1,94 +1,205 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from abc import ABC, abstractmethod
-from typing import Optional, List
+from typing import Any, Dict, Optional, Tuple
 from scapy.all import IP
-from ..utils.packet_analyzer import PacketAnalyzer
 
-class TCPState(ABC):
-    """TCP状态基类"""
+class TCPState:
+    """TCP状态基类
+    
+    状态对象是无状态的单例(享元)：ClosedState() 每次返回同一个实例，
+    连接相关的数据(序列号、定时器等)全部保存在上下文即连接记录中，
+    状态转换只是查表，不分配新对象。
+    
+    handle_packet/get_next_state 供 TCPSimulation.run 按固定脚本推进；
+    on_event 供离线仿真中通信双方各自的状态机按事件推进，
+    此时上下文需提供 send 及 create_*_packet 方法。
+    """
+    
+    __slots__ = ()
+    
+    name = "UNKNOWN"
+    
+    # 由模块末尾的 TRANSITIONS/SCRIPT 填充：
+    # _table: 事件 -> (下一状态, 需要发送的报文对应的上下文方法名)
+    _table: Dict[str, Tuple['TCPState', Optional[str]]] = {}
+    _script_action: Optional[str] = None
+    _script_next: Optional['TCPState'] = None
+    
+    def __new__(cls):
+        instance = cls.__dict__.get("_instance")
+        if instance is None:
+            instance = super().__new__(cls)
+            cls._instance = instance
+        return instance
+    
+    def handle_packet(self, context: Any, packet: Optional[IP] = None) -> Optional[IP]:
+        """处理数据包，返回脚本中本步要发送的数据包"""
+        action = self._script_action
+        if action is None:
+            return None
+        return getattr(context, action)()
     
-    def __init__(self, context):
-        self.context = context
-        self.packet_analyzer = PacketAnalyzer()
-    
-    @abstractmethod
-    def handle_packet(self, packet: IP) -> Optional[IP]:
-        """处理数据包"""
-        pass
-    
-    @abstractmethod
     def get_next_state(self) -> 'TCPState':
-        """获取下一个状态"""
-        pass
+        """获取脚本中的下一个状态"""
+        return self._script_next
+    
+    def on_event(self, context: Any, event: str) -> 'TCPState':
+        """
+        处理事件并返回下一个状态，未定义的事件保持当前状态
+        
+        Args:
+            context: 连接记录，提供 send 及 create_*_packet 方法
+            event: OPEN/LISTEN/CLOSE(本地操作)，SYN/SYN_ACK/ACK/FIN/RST(收到的报文)，
+                   TIMEOUT(TIME_WAIT超时)
+        """
+        entry = self._table.get(event)
+        if entry is None:
+            return self
+        next_state, action = entry
+        if action is not None:
+            context.send(getattr(context, action)())
+        return next_state
+    
+    def __repr__(self) -> str:
+        return f"<{self.name}>"
 
 class ClosedState(TCPState):
     """关闭状态"""
     
-    def handle_packet(self, packet: IP) -> Optional[IP]:
-        # 发送SYN包
-        return self.context.create_syn_packet()
-    
-    def get_next_state(self) -> 'TCPState':
-        return ListenState(self.context)
+    __slots__ = ()
+    name = "CLOSED"
 
 class ListenState(TCPState):
     """监听状态"""
     
-    def handle_packet(self, packet: IP) -> Optional[IP]:
-        # 发送SYN-ACK包
-        return self.context.create_syn_ack_packet()
+    __slots__ = ()
+    name = "LISTEN"
+
+class SynSentState(TCPState):
+    """SYN已发送状态"""
     
-    def get_next_state(self) -> 'TCPState':
-        return SynReceivedState(self.context)
+    __slots__ = ()
+    name = "SYN_SENT"
 
 class SynReceivedState(TCPState):
     """SYN已接收状态"""
     
-    def handle_packet(self, packet: IP) -> Optional[IP]:
-        # 发送ACK包
-        return self.context.create_ack_packet()
-    
-    def get_next_state(self) -> 'TCPState':
-        return EstablishedState(self.context)
+    __slots__ = ()
+    name = "SYN_RECEIVED"
 
 class EstablishedState(TCPState):
     """已建立连接状态"""
     
-    def handle_packet(self, packet: IP) -> Optional[IP]:
-        # 发送FIN包
-        return self.context.create_fin_packet()
-    
-    def get_next_state(self) -> 'TCPState':
-        return FinWait1State(self.context)
+    __slots__ = ()
+    name = "ESTABLISHED"
 
 class FinWait1State(TCPState):
     """等待FIN-1状态"""
     
-    def handle_packet(self, packet: IP) -> Optional[IP]:
-        # 发送ACK包
-        return self.context.create_ack_packet()
-    
-    def get_next_state(self) -> 'TCPState':
-        return FinWait2State(self.context)
+    __slots__ = ()
+    name = "FIN_WAIT_1"
 
 class FinWait2State(TCPState):
     """等待FIN-2状态"""
     
-    def handle_packet(self, packet: IP) -> Optional[IP]:
-        # 发送FIN包
-        return self.context.create_fin_packet()
+    __slots__ = ()
+    name = "FIN_WAIT_2"
+
+class ClosingState(TCPState):
+    """同时关闭状态"""
     
-    def get_next_state(self) -> 'TCPState':
-        return TimeWaitState(self.context)
+    __slots__ = ()
+    name = "CLOSING"
 
 class TimeWaitState(TCPState):
     """等待时间状态"""
     
-    def handle_packet(self, packet: IP) -> Optional[IP]:
-        # 发送ACK包
-        return self.context.create_ack_packet()
+    __slots__ = ()
+    name = "TIME_WAIT"
+
+class CloseWaitState(TCPState):
+    """等待关闭状态(被动关闭方已确认对端FIN)"""
+    
+    __slots__ = ()
+    name = "CLOSE_WAIT"
+
+class LastAckState(TCPState):
+    """最后确认状态"""
     
-    def get_next_state(self) -> 'TCPState':
-        return ClosedState(self.context) 
\ No newline at end of file
+    __slots__ = ()
+    name = "LAST_ACK"
+
+CLOSED = ClosedState()
+LISTEN = ListenState()
+SYN_SENT = SynSentState()
+SYN_RECEIVED = SynReceivedState()
+ESTABLISHED = EstablishedState()
+FIN_WAIT_1 = FinWait1State()
+FIN_WAIT_2 = FinWait2State()
+CLOSING = ClosingState()
+TIME_WAIT = TimeWaitState()
+CLOSE_WAIT = CloseWaitState()
+LAST_ACK = LastAckState()
+
+# 事件驱动的状态转换表：(状态, 事件) -> (下一状态, 需要发送的报文)
+TRANSITIONS: Dict[Tuple[TCPState, str], Tuple[TCPState, Optional[str]]] = {
+    (CLOSED, "OPEN"): (SYN_SENT, "create_syn_packet"),
+    (CLOSED, "LISTEN"): (LISTEN, None),
+    (LISTEN, "SYN"): (SYN_RECEIVED, "create_syn_ack_packet"),
+    (LISTEN, "CLOSE"): (CLOSED, None),
+    (SYN_SENT, "SYN_ACK"): (ESTABLISHED, "create_ack_packet"),
+    (SYN_SENT, "CLOSE"): (CLOSED, None),
+    (SYN_RECEIVED, "ACK"): (ESTABLISHED, None),
+    # 重复的SYN，重发SYN-ACK
+    (SYN_RECEIVED, "SYN"): (SYN_RECEIVED, "create_syn_ack_packet"),
+    (ESTABLISHED, "CLOSE"): (FIN_WAIT_1, "create_fin_packet"),
+    (ESTABLISHED, "FIN"): (CLOSE_WAIT, "create_ack_packet"),
+    # 对端未收到握手的ACK而重传了SYN-ACK
+    (ESTABLISHED, "SYN_ACK"): (ESTABLISHED, "create_ack_packet"),
+    (FIN_WAIT_1, "ACK"): (FIN_WAIT_2, None),
+    # 双方同时关闭
+    (FIN_WAIT_1, "FIN"): (CLOSING, "create_ack_packet"),
+    (FIN_WAIT_2, "FIN"): (TIME_WAIT, "create_ack_packet"),
+    (CLOSING, "ACK"): (TIME_WAIT, None),
+    (CLOSING, "FIN"): (CLOSING, "create_ack_packet"),
+    (TIME_WAIT, "TIMEOUT"): (CLOSED, None),
+    # 对端未收到最后的ACK而重传了FIN
+    (TIME_WAIT, "FIN"): (TIME_WAIT, "create_ack_packet"),
+    (CLOSE_WAIT, "CLOSE"): (LAST_ACK, "create_fin_packet"),
+    (CLOSE_WAIT, "FIN"): (CLOSE_WAIT, "create_ack_packet"),
+    (LAST_ACK, "ACK"): (CLOSED, None),
+    (LAST_ACK, "FIN"): (LAST_ACK, "create_ack_packet"),
+}
+
+# 除CLOSED外，收到RST一律回到CLOSED
+for _state in (LISTEN, SYN_SENT, SYN_RECEIVED, ESTABLISHED, FIN_WAIT_1, FIN_WAIT_2,
+               CLOSING, TIME_WAIT, CLOSE_WAIT, LAST_ACK):
+    TRANSITIONS[(_state, "RST")] = (CLOSED, None)
+
+# TCPSimulation.run 使用的固定脚本：状态 -> (要发送的报文, 下一状态)
+SCRIPT: Dict[TCPState, Tuple[Optional[str], TCPState]] = {
+    CLOSED: ("create_syn_packet", LISTEN),
+    LISTEN: ("create_syn_ack_packet", SYN_RECEIVED),
+    SYN_RECEIVED: ("create_ack_packet", ESTABLISHED),
+    ESTABLISHED: ("create_fin_packet", FIN_WAIT_1),
+    FIN_WAIT_1: ("create_ack_packet", FIN_WAIT_2),
+    FIN_WAIT_2: ("create_fin_packet", TIME_WAIT),
+    TIME_WAIT: ("create_ack_packet", CLOSED),
+    SYN_SENT: (None, ESTABLISHED),
+    CLOSING: (None, TIME_WAIT),
+    CLOSE_WAIT: ("create_fin_packet", LAST_ACK),
+    LAST_ACK: (None, CLOSED),
+}
+
+def _build_tables() -> None:
+    """把转换表和脚本展开到各状态类上，运行时只需一次字典查找"""
+    for state, (action, next_state) in SCRIPT.items():
+        cls = type(state)
+        cls._table = {}
+        cls._script_action = action
+        cls._script_next = next_state
+    for (state, event), entry in TRANSITIONS.items():
+        type(state)._table[event] = entry
+
+_build_tables()
\ No newline at end of file
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import collections
+import mmap
+import os
+from typing import TYPE_CHECKING, Any, Deque, Dict, Optional, Tuple, Union
+
+from .congestion import CongestionControl
+from .packet_factory import Payload, as_payload
+from .segment import Segment, ACK, PSH
+
+if TYPE_CHECKING:
+    from .endpoint import VirtualEndpoint
+
+SEQ_MOD = 1 << 32
+_HALF_SEQ = 1 << 31
+
+def open_payload(source: Union[Payload, str, 'os.PathLike[str]', None] = None,
+                 size: int = 0) -> memoryview:
+    """
+    准备要发送的数据，返回只读的字节 memoryview
+    
+    Args:
+        source: bytes/bytearray/memoryview/mmap 直接包装，不复制；
+            字符串或路径表示文件，以只读方式映射到内存；None表示发送size个零字节
+        size: source为文件时最多取前size字节(0表示整个文件)；source为None时的数据量
+    
+    Returns:
+        memoryview: 数据视图。文件映射和匿名映射的页面按需载入，
+            发送几GB的数据也不会占用同样多的内存
+    """
+    if source is None:
+        if size <= 0:
+            return memoryview(b"")
+        # 匿名映射在写入前都指向同一个零页
+        return memoryview(mmap.mmap(-1, size)).toreadonly()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return memoryview(b"")
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return view[:size] if size > 0 else view
+    return as_payload(source)
+
+class DataSender:
+    """ESTABLISHED阶段的数据发送方
+    
+    把应用写入的字节流按MSS切分成报文段，在途数据不超过 min(cwnd, 对端窗口)。
+    报文段的负载是发送缓冲区的 memoryview 切片，分段和重传都不复制数据。
+    收到三个重复ACK时快速重传并进入NewReno恢复，重传定时器超时时回退N步重传。
+    序列号和定时器沿用所属端点的 snd_una/snd_nxt 与重传定时器。
+    """
+    
+    __slots__ = (
+        "endpoint", "cc", "mss", "data", "start_seq",
+        "acked", "sent", "high", "peer_window", "dupacks", "recover",
+        "delivered", "delivered_time", "_records",
+        "started_at", "completed_at", "retransmits", "timeouts", "fast_retransmits", "max_cwnd",
+    )
+    
+    def __init__(self, endpoint: 'VirtualEndpoint', cc: CongestionControl, mss: int):
+        self.endpoint = endpoint
+        self.cc = cc
+        self.mss = mss
+        self.data = memoryview(b"")
+        # 数据从SYN之后的第一个序列号开始
+        self.start_seq = (endpoint.iss + 1) % SEQ_MOD
+        
+        # 均为相对start_seq的偏移：已确认、下一个要发送、曾经发送过的最高位置
+        self.acked = 0
+        self.sent = 0
+        self.high = 0
+        self.peer_window = 65535
+        self.dupacks = 0
+        self.recover: Optional[int] = None
+        
+        # 交付速率估计：累计确认的字节数及最近一次确认的时间
+        self.delivered = 0
+        self.delivered_time: Optional[float] = None
+        # 在途报文段：(结束偏移, 发送时间, 发送时的delivered, 发送时的delivered_time, 是否重传)
+        self._records: Deque[Tuple[int, float, int, float, bool]] = collections.deque()
+        
+        # 统计
+        self.started_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+        self.retransmits = 0
+        self.timeouts = 0
+        self.fast_retransmits = 0
+        self.max_cwnd = cc.cwnd
+    
+    @property
+    def cwnd(self) -> float:
+        return self.cc.cwnd
+    
+    @property
+    def ssthresh(self) -> float:
+        return self.cc.ssthresh
+    
+    @property
+    def inflight(self) -> int:
+        """已发送未确认的字节数"""
+        return self.sent - self.acked
+    
+    @property
+    def done(self) -> bool:
+        """已写入的数据是否全部被确认"""
+        return self.acked >= len(self.data)
+    
+    def write(self, data: Payload) -> None:
+        """追加要发送的数据，第一次写入时直接引用调用方的缓冲区"""
+        view = as_payload(data)
+        if self.data:
+            # 多次写入时合并成一块连续的缓冲区，这里会复制已写入的数据
+            view = memoryview(b"".join((self.data, view)))
+        self.data = view
+        self.pump()
+    
+    def pump(self) -> None:
+        """在窗口允许的范围内发送尚未发送的数据"""
+        endpoint = self.endpoint
+        if not endpoint.can_send_data:
+            return
+        total = len(self.data)
+        limit = self.acked + min(int(self.cc.cwnd), self.peer_window)
+        mss = self.mss
+        while self.sent < total and self.sent < limit:
+            length = min(mss, total - self.sent, limit - self.sent)
+            # 避免糊涂窗口：还有数据在途时不发送被窗口截短的小报文段
+            if length < mss and self.sent + length < total and self.sent > self.acked:
+                break
+            self._send(self.sent, length)
+            self.sent += length
+        endpoint.snd_nxt = (self.start_seq + self.sent) % SEQ_MOD
+        if self.sent > self.acked and endpoint._retransmit_timer is None:
+            self._arm_timer()
+    
+    def _send(self, offset: int, length: int) -> None:
+        endpoint = self.endpoint
+        now = endpoint.scheduler.now
+        if self.started_at is None:
+            self.started_at = now
+        if self.delivered_time is None:
+            self.delivered_time = now
+        end = offset + length
+        retransmitted = offset < self.high
+        if retransmitted:
+            self.retransmits += 1
+        if end > self.high:
+            self.high = end
+        self._records.append((end, now, self.delivered, self.delivered_time, retransmitted))
+        segment = Segment(endpoint.local_ip, endpoint.remote_ip, endpoint.local_port,
+                          endpoint.remote_port, ACK | PSH, (self.start_seq + offset) % SEQ_MOD,
+                          endpoint.rcv_nxt, self.data[offset:end], endpoint.rcv_wnd)
+        endpoint._transmit(segment)
+    
+    def _arm_timer(self) -> None:
+        endpoint = self.endpoint
+        endpoint._retransmit_timer = endpoint.scheduler.schedule(endpoint.rtt.rto, self._on_timeout)
+    
+    def _restart_timer(self) -> None:
+        endpoint = self.endpoint
+        if endpoint._retransmit_timer is not None:
+            endpoint._retransmit_timer.cancel()
+            endpoint._retransmit_timer = None
+        if self.sent > self.acked:
+            self._arm_timer()
+    
+    def on_ack(self, segment: Segment) -> bool:
+        """
+        处理对端的ACK
+        
+        Returns:
+            bool: ACK是否确认了数据或被计为重复ACK；确认号超出已发送数据范围
+                (例如对FIN的确认)时返回False，由端点按原有逻辑处理
+        """
+        offset = (segment.ack - self.start_seq) % SEQ_MOD
+        if offset >= _HALF_SEQ or offset > self.high:
+            return False
+        self.peer_window = segment.window
+        endpoint = self.endpoint
+        now = endpoint.scheduler.now
+        
+        if offset > self.acked:
+            acked = offset - self.acked
+            self.acked = offset
+            if self.sent < offset:
+                self.sent = offset
+            endpoint.snd_una = segment.ack
+            endpoint.snd_nxt = (self.start_seq + self.sent) % SEQ_MOD
+            endpoint._retries = 0
+            self.dupacks = 0
+            
+            # 取RTT样本和交付速率样本，重传过的报文段不取RTT样本(Karn算法)
+            self.delivered += acked
+            rtt = rate = None
+            records = self._records
+            while records and records[0][0] <= offset:
+                end, sent_at, delivered, delivered_time, retransmitted = records.popleft()
+                if end == offset and not retransmitted:
+                    rtt = now - sent_at
+                if now > delivered_time:
+                    rate = (self.delivered - delivered) / (now - delivered_time)
+            self.delivered_time = now
+            if rtt is not None:
+                endpoint.rtt.sample(rtt)
+            
+            if self.recover is not None:
+                if offset >= self.recover:
+                    self.recover = None
+                else:
+                    # 部分确认：立即重传下一个丢失的报文段
+                    self._send(self.acked, min(self.mss, self.high - self.acked))
+            else:
+                self.cc.on_ack(acked, rtt, rate, now, self.inflight)
+                if self.cc.cwnd > self.max_cwnd:
+                    self.max_cwnd = self.cc.cwnd
+            
+            self._restart_timer()
+            self.pump()
+            if self.done:
+                self.completed_at = now
+                # 可能立即发送FIN，必须在 pump 更新 snd_nxt 之后
+                endpoint._on_data_acked()
+            return True
+        
+        if offset == self.acked and self.sent > self.acked and not segment.payload:
+            self.dupacks += 1
+            if self.dupacks == 3 and self.recover is None:
+                self.recover = self.high
+                self.fast_retransmits += 1
+                self.cc.on_loss(now, self.inflight)
+                self._send(self.acked, min(self.mss, self.high - self.acked))
+                self._restart_timer()
+            return True
+        return False
+    
+    def _on_timeout(self) -> None:
+        endpoint = self.endpoint
+        endpoint._retransmit_timer = None
+        if self.sent <= self.acked:
+            return
+        if endpoint._retries >= endpoint.max_retries:
+            endpoint.abort()
+            return
+        endpoint._retries += 1
+        self.timeouts += 1
+        self.cc.on_timeout(endpoint.scheduler.now, self.inflight)
+        self.recover = None
+        self.dupacks = 0
+        self._records.clear()
+        # 回退N步：从第一个未确认的字节重新发送
+        self.sent = self.acked
+        endpoint.rtt.backoff()
+        self.pump()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取传输统计"""
+        duration = None
+        if self.started_at is not None and self.completed_at is not None:
+            duration = self.completed_at - self.started_at
+        return {
+            'bytes': len(self.data),
+            'acked': self.acked,
+            'duration': duration,
+            'goodput': self.acked * 8 / duration if duration else None,
+            'retransmits': self.retransmits,
+            'fast_retransmits': self.fast_retransmits,
+            'timeouts': self.timeouts,
+            'cwnd': self.cc.cwnd,
+            'ssthresh': self.cc.ssthresh,
+            'max_cwnd': self.max_cwnd,
+            'inflight': self.inflight,
+        }
+
+class DataReceiver:
+    """数据接收方：按序交付，暂存窗口内的乱序报文段"""
+    
+    __slots__ = ("window", "received", "_out_of_order")
+    
+    def __init__(self, window: int):
+        self.window = window
+        self.received = 0
+        # 乱序报文段：起始序列号 -> 结束序列号
+        self._out_of_order: Dict[int, int] = {}
+    
+    def accept(self, seq: int, length: int, rcv_nxt: int) -> int:
+        """
+        接收一个报文段
+        
+        Args:
+            seq: 报文段的起始序列号
+            length: 负载长度
+            rcv_nxt: 当前期望的下一个序列号
+        
+        Returns:
+            int: 更新后的rcv_nxt
+        """
+        end = (seq + length) % SEQ_MOD
+        offset = (seq - rcv_nxt) % SEQ_MOD
+        if offset and offset < _HALF_SEQ:
+            if offset + length <= self.window:
+                pending = self._out_of_order.get(seq)
+                if pending is None or (end - pending) % SEQ_MOD < _HALF_SEQ:
+                    self._out_of_order[seq] = end
+            return rcv_nxt
+        rcv_nxt = self._advance(rcv_nxt, end)
+        
+        # 交付与已到达数据衔接上的乱序报文段
+        pending = self._out_of_order
+        while pending:
+            progressed = False
+            for start in list(pending):
+                if (start - rcv_nxt) % SEQ_MOD < _HALF_SEQ and start != rcv_nxt:
+                    continue
+                before = rcv_nxt
+                rcv_nxt = self._advance(rcv_nxt, pending.pop(start))
+                progressed = progressed or rcv_nxt != before
+            if not progressed:
+                break
+        return rcv_nxt
+    
+    def _advance(self, rcv_nxt: int, end: int) -> int:
+        """交付到end为止的数据(已交付的部分不重复计数)"""
+        ahead = (end - rcv_nxt) % SEQ_MOD
+        if not ahead or ahead >= _HALF_SEQ:
+            return rcv_nxt
+        self.received += ahead
+        return end
\ No newline at end of file
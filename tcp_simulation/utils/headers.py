@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import socket
+import struct
+from typing import Any, Dict, List, Optional, Tuple, Union
+from scapy.packet import NoPayload
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# 版本/头部长度、服务类型、总长度、标识、标志/片偏移、TTL、协议、校验和、源地址、目的地址
+_IP_STRUCT = struct.Struct("!BBHHHBBHII")
+# 源端口、目的端口、序列号、确认号、数据偏移、标志位、窗口、校验和
+_TCP_STRUCT = struct.Struct("!HHIIBBHH")
+# 没有IP选项时两个头部一次解出
+_IP_TCP_STRUCT = struct.Struct("!BBHHHBBHII" + "HHIIBBHH")
+_U16 = struct.Struct("!H")
+_U32 = struct.Struct("!I")
+_TIMESTAMP_STRUCT = struct.Struct("!II")
+
+# TCP选项类型
+TCPOPT_EOL = 0
+TCPOPT_NOP = 1
+TCPOPT_MSS = 2
+TCPOPT_WSCALE = 3
+TCPOPT_SACK_PERMITTED = 4
+TCPOPT_SACK = 5
+TCPOPT_TIMESTAMP = 8
+
+FLAG_NAMES = ((0x01, "FIN"), (0x02, "SYN"), (0x04, "RST"), (0x08, "PSH"), (0x10, "ACK"), (0x20, "URG"))
+_FLAG_NAMES_TABLE = tuple(tuple(name for bit, name in FLAG_NAMES if flags & bit) for flags in range(64))
+
+# Scapy报文的第一层到IP头部的偏移
+_LINK_OFFSETS = {"IP": 0, "Ether": 14, "CookedLinux": 16}
+
+class TCPHeader:
+    """IPv4+TCP头部记录，选项和负载是指向原始报文的memoryview，不复制数据"""
+    
+    __slots__ = ("src_addr", "dst_addr", "ttl", "ip_len", "ihl", "sport", "dport", "seq", "ack",
+                 "data_offset", "flags", "window", "checksum", "options", "payload")
+    
+    @property
+    def src_ip(self) -> str:
+        return socket.inet_ntoa(_U32.pack(self.src_addr))
+    
+    @property
+    def dst_ip(self) -> str:
+        return socket.inet_ntoa(_U32.pack(self.dst_addr))
+    
+    @property
+    def flag_names(self) -> List[str]:
+        """标志位名称列表，如 ['SYN', 'ACK']"""
+        return list(_FLAG_NAMES_TABLE[self.flags & 0x3F])
+    
+    @property
+    def mss(self) -> Optional[int]:
+        """MSS选项的值，没有该选项时为None"""
+        return parse_tcp_options(self.options).get('mss')
+    
+    def parse_options(self) -> Dict[str, Any]:
+        """解析TCP选项"""
+        return parse_tcp_options(self.options)
+    
+    def __repr__(self) -> str:
+        return (f"TCPHeader({self.src_ip}:{self.sport} -> {self.dst_ip}:{self.dport} "
+                f"seq={self.seq} ack={self.ack} flags={' '.join(self.flag_names)} "
+                f"len={len(self.payload)})")
+
+def parse_tcp_header(data: Buffer, offset: int = 0) -> Optional[TCPHeader]:
+    """
+    解析IPv4+TCP报文头部，不构造Scapy对象
+    
+    Args:
+        data: 报文
+        offset: IP头部在报文中的偏移，以太网帧为14
+    
+    Returns:
+        Optional[TCPHeader]: 头部记录；不是完整的IPv4 TCP报文或是后续分片时返回None
+    """
+    if len(data) < offset + 40:
+        return None
+    if data[offset] == 0x45:
+        (_, _, ip_len, _, fragment, ttl, protocol, _, src_addr, dst_addr, sport, dport,
+         seq, ack, data_offset, flags, window, checksum) = _IP_TCP_STRUCT.unpack_from(data, offset)
+        ihl = 20
+    else:
+        (version_ihl, _, ip_len, _, fragment, ttl, protocol, _,
+         src_addr, dst_addr) = _IP_STRUCT.unpack_from(data, offset)
+        ihl = (version_ihl & 0x0F) * 4
+        if version_ihl >> 4 != 4 or ihl < 20 or len(data) < offset + ihl + 20:
+            return None
+        (sport, dport, seq, ack, data_offset, flags, window,
+         checksum) = _TCP_STRUCT.unpack_from(data, offset + ihl)
+    if protocol != socket.IPPROTO_TCP or fragment & 0x1FFF:
+        return None
+    tcp_start = offset + ihl
+    data_offset = (data_offset >> 4) * 4
+    payload_start = tcp_start + data_offset
+    # 以太网帧可能有填充，负载以IP总长度为准
+    end = min(offset + ip_len, len(data))
+    if data_offset < 20 or payload_start > end:
+        return None
+    view = data if isinstance(data, memoryview) else memoryview(data)
+    header = TCPHeader()
+    header.src_addr = src_addr
+    header.dst_addr = dst_addr
+    header.ttl = ttl
+    header.ip_len = ip_len
+    header.ihl = ihl
+    header.sport = sport
+    header.dport = dport
+    header.seq = seq
+    header.ack = ack
+    header.data_offset = data_offset
+    header.flags = flags
+    header.window = window
+    header.checksum = checksum
+    header.options = view[tcp_start + 20:payload_start]
+    header.payload = view[payload_start:end]
+    return header
+
+def parse_tcp_options(options: Buffer) -> Dict[str, Any]:
+    """
+    解析TCP选项
+    
+    Returns:
+        Dict[str, Any]: 可能包含 mss、wscale、sack_permitted、sack((左边界, 右边界)列表)、
+            timestamp((TSval, TSecr))；未知选项以类型号为键保存原始字节
+    """
+    result: Dict[str, Any] = {}
+    i = 0
+    end = len(options)
+    while i < end:
+        kind = options[i]
+        if kind == TCPOPT_EOL:
+            break
+        if kind == TCPOPT_NOP:
+            i += 1
+            continue
+        if i + 1 >= end:
+            break
+        length = options[i + 1]
+        if length < 2 or i + length > end:
+            # 长度非法，其余选项无法解析
+            break
+        if kind == TCPOPT_MSS and length == 4:
+            result['mss'] = _U16.unpack_from(options, i + 2)[0]
+        elif kind == TCPOPT_WSCALE and length == 3:
+            result['wscale'] = options[i + 2]
+        elif kind == TCPOPT_SACK_PERMITTED and length == 2:
+            result['sack_permitted'] = True
+        elif kind == TCPOPT_SACK and (length - 2) % 8 == 0:
+            blocks: List[Tuple[int, int]] = []
+            for start in range(i + 2, i + length, 8):
+                blocks.append(_TIMESTAMP_STRUCT.unpack_from(options, start))
+            result['sack'] = blocks
+        elif kind == TCPOPT_TIMESTAMP and length == 10:
+            result['timestamp'] = _TIMESTAMP_STRUCT.unpack_from(options, i + 2)
+        else:
+            result[kind] = bytes(options[i + 2:i + length])
+        i += length
+    return result
+
+def _unmodified(packet: Any) -> bool:
+    """Scapy报文解析后是否没有被修改过：修改字段只清除所在层的原始字节缓存"""
+    layer = packet
+    while type(layer) is not NoPayload:
+        if layer.raw_packet_cache is None:
+            return False
+        layer = layer.payload
+    return True
+
+def header_of(packet: Any) -> Optional[TCPHeader]:
+    """
+    从原始报文或抓包得到的Scapy报文中解析头部
+    
+    Scapy解析收到的报文时会在 original 中保存原始字节，这里直接解析这些字节，
+    不做逐层查找。程序构造的报文没有原始字节，解析后又修改过的报文原始字节已经
+    过时，这两种情况返回None，由调用方使用Scapy。
+    """
+    data = getattr(packet, 'original', None)
+    if data is None:
+        if isinstance(packet, (bytes, bytearray, memoryview)):
+            return parse_tcp_header(packet)
+        return None
+    offset = _LINK_OFFSETS.get(type(packet).__name__)
+    if offset is None or not _unmodified(packet):
+        return None
+    return parse_tcp_header(data, offset)
\ No newline at end of file
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, List, Optional
+
+class DeferredQueueHandler(QueueHandler):
+    """把日志记录原样放入队列的处理器
+    
+    标准 QueueHandler 会在调用线程中先格式化消息；这里保留消息模板和参数，
+    格式化和I/O都推迟到后台监听线程中完成。队列满时丢弃记录而不是阻塞。
+    """
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class QueueLogging:
+    """后台日志
+    
+    把指定日志记录器上已有的处理器移到后台 QueueListener 线程中，
+    记录器上只保留一个 DeferredQueueHandler，产生日志的线程不再等待I/O。
+    """
+    
+    def __init__(self, logger: Optional[logging.Logger] = None, queue_size: int = 10000):
+        """
+        初始化后台日志
+        
+        Args:
+            logger: 要接管的日志记录器，默认为根记录器
+            queue_size: 队列容量，超出的记录被丢弃
+        """
+        self.logger = logger or logging.getLogger()
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.handler = DeferredQueueHandler(self.queue)
+        self._handlers: List[logging.Handler] = []
+        self._listener: Optional[QueueListener] = None
+    
+    @property
+    def dropped(self) -> int:
+        """因队列已满而丢弃的记录数"""
+        return self.handler.dropped
+    
+    def start(self) -> 'QueueLogging':
+        """启动后台线程并替换记录器上的处理器"""
+        if self._listener is not None:
+            return self
+        self._handlers = list(self.logger.handlers)
+        for handler in self._handlers:
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(self.handler)
+        self._listener = QueueListener(self.queue, *self._handlers, respect_handler_level=True)
+        self._listener.start()
+        return self
+    
+    def stop(self) -> None:
+        """处理完队列中剩余的记录后停止后台线程，并恢复原来的处理器"""
+        if self._listener is None:
+            return
+        self.logger.removeHandler(self.handler)
+        # 等待队列清空，保证结束标记能放入有界队列
+        self.queue.join()
+        self._listener.stop()
+        self._listener = None
+        for handler in self._handlers:
+            self.logger.addHandler(handler)
+        self._handlers = []
+    
+    def __enter__(self) -> 'QueueLogging':
+        return self.start()
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
\ No newline at end of file
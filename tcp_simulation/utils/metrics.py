@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from .error_handler import ConfigurationError
+
+# 默认汇报的分位点
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+class LatencyHistogram:
+    """HDR风格的延迟直方图
+    
+    按2的幂划分数量级，每个数量级内再等分为固定数目的子桶，相对误差
+    不超过 1/2^sub_bucket_bits；记录一个样本只需几次整数运算和一次列表自增，
+    内存占用与样本数无关。数值单位为纳秒。
+    """
+    
+    def __init__(self, sub_bucket_bits: int = 7, max_magnitude: int = 48):
+        """
+        初始化直方图
+        
+        Args:
+            sub_bucket_bits: 每个数量级的子桶数为 2^sub_bucket_bits，默认相对误差小于2%
+            max_magnitude: 可记录的最大值约为 2^(sub_bucket_bits + max_magnitude)，超出的值计入最后一个桶
+        """
+        if sub_bucket_bits < 1 or max_magnitude < 0:
+            raise ConfigurationError("直方图精度参数必须为正")
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_count = 1 << sub_bucket_bits
+        self._half = self._sub_count >> 1
+        self._counts: List[int] = [0] * ((max_magnitude + 2) * self._half)
+        self._last = len(self._counts) - 1
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max = 0
+    
+    def _index(self, value: int) -> int:
+        magnitude = value.bit_length() - self.sub_bucket_bits
+        if magnitude <= 0:
+            return value
+        index = magnitude * self._half + (value >> magnitude)
+        return index if index < self._last else self._last
+    
+    def _value(self, index: int) -> int:
+        """桶中数值的上界"""
+        if index < self._sub_count:
+            return index
+        magnitude = index // self._half - 1
+        return ((index - magnitude * self._half + 1) << magnitude) - 1
+    
+    def record(self, value: int) -> None:
+        """记录一个样本(纳秒，负值按0处理)"""
+        if value < 0:
+            value = 0
+        # 内联 _index，热路径上少一次方法调用
+        magnitude = value.bit_length() - self.sub_bucket_bits
+        if magnitude <= 0:
+            self._counts[value] += 1
+        else:
+            index = magnitude * self._half + (value >> magnitude)
+            self._counts[index if index < self._last else self._last] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+    
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """把另一个相同精度的直方图合并进来"""
+        if other.sub_bucket_bits != self.sub_bucket_bits or len(other._counts) != len(self._counts):
+            raise ConfigurationError("只能合并精度相同的直方图")
+        counts = self._counts
+        for index, count in enumerate(other._counts):
+            if count:
+                counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+    
+    def reset(self) -> None:
+        """清空所有样本"""
+        self._counts = [0] * len(self._counts)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+    
+    def percentile(self, quantile: float) -> int:
+        """
+        计算分位数
+        
+        Args:
+            quantile: 分位点，取值0~1
+        
+        Returns:
+            int: 至少quantile比例的样本不超过的值(纳秒)，没有样本时为0
+        """
+        if not self.count:
+            return 0
+        rank = max(1, int(quantile * self.count + 0.5))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            if count:
+                seen += count
+                if seen >= rank:
+                    return min(self._value(index), self.max)
+        return self.max
+    
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+    
+    def summary(self, quantiles=QUANTILES) -> Dict[str, Any]:
+        """返回样本数、总和、最值、均值和各分位数，时间单位为秒"""
+        result = {
+            'count': self.count,
+            'sum': self.total / 1e9,
+            'min': (self.min or 0) / 1e9,
+            'max': self.max / 1e9,
+            'mean': self.mean / 1e9,
+        }
+        for quantile in quantiles:
+            result[f"p{_quantile_label(quantile)}"] = self.percentile(quantile) / 1e9
+        return result
+
+def _quantile_label(quantile: float) -> str:
+    """0.5 -> '50'，0.999 -> '999'"""
+    return f"{quantile * 100:g}".replace(".", "")
+
+class PhaseMetrics:
+    """按阶段统计耗时
+    
+    每个阶段一个 LatencyHistogram。热路径上用 time.perf_counter_ns 取差值后调用 record，
+    不需要构造上下文管理器；enabled为False时 record 直接返回。
+    """
+    
+    def __init__(self, enabled: bool = True, sub_bucket_bits: int = 7):
+        self.enabled = enabled
+        self.sub_bucket_bits = sub_bucket_bits
+        self.phases: Dict[str, LatencyHistogram] = {}
+    
+    def histogram(self, phase: str) -> LatencyHistogram:
+        """获取(必要时创建)某个阶段的直方图"""
+        histogram = self.phases.get(phase)
+        if histogram is None:
+            histogram = self.phases[phase] = LatencyHistogram(self.sub_bucket_bits)
+        return histogram
+    
+    def record(self, phase: str, elapsed_ns: int) -> None:
+        """记录某个阶段的一次耗时(纳秒)"""
+        if self.enabled:
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.histogram(phase)
+            histogram.record(elapsed_ns)
+    
+    @contextmanager
+    def time(self, phase: str) -> Iterator[None]:
+        """计时一段代码，用于不在热路径上的阶段"""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter_ns() - start)
+    
+    def reset(self) -> None:
+        """清空所有阶段"""
+        self.phases.clear()
+    
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """各阶段的统计摘要，见 LatencyHistogram.summary"""
+        return {phase: histogram.summary() for phase, histogram in self.phases.items()}
+    
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2, ensure_ascii=False)
+    
+    def to_prometheus(self, name: str = "tcp_simulation_phase_seconds") -> str:
+        """导出为Prometheus文本格式的summary指标，阶段名作为phase标签"""
+        lines = [f"# HELP {name} Time spent in each simulation phase.", f"# TYPE {name} summary"]
+        for phase, histogram in self.phases.items():
+            for quantile in QUANTILES:
+                lines.append(f'{name}{{phase="{phase}",quantile="{quantile:g}"}} '
+                             f'{histogram.percentile(quantile) / 1e9:.9g}')
+            lines.append(f'{name}_sum{{phase="{phase}"}} {histogram.total / 1e9:.9g}')
+            lines.append(f'{name}_count{{phase="{phase}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+    
+    def dump(self, filename: str, format: Optional[str] = None) -> None:
+        """
+        把统计结果写入文件
+        
+        Args:
+            filename: 输出文件名
+            format: json或prometheus，默认按扩展名判断(.json为JSON，其余为Prometheus文本)
+        """
+        if format is None:
+            format = "json" if filename.endswith(".json") else "prometheus"
+        if format == "json":
+            content = self.to_json()
+        elif format == "prometheus":
+            content = self.to_prometheus()
+        else:
+            raise ConfigurationError(f"不支持的指标格式: {format}")
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(content)
\ No newline at end of file
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from scapy.all import *
+import logging
+from .headers import header_of
+from .pcap_reader import np, read_tcp_columns
+
+logger = logging.getLogger(__name__)
+
+class PacketAnalyzer:
+    @staticmethod
+    def analyze_tcp_packet(packet, full=False):
+        """
+        分析TCP数据包
+        
+        Args:
+            packet: 原始IPv4报文或Scapy报文
+            full: 是否用Scapy完整解析；默认直接解析原始字节，只在没有原始字节时使用Scapy
+        """
+        header = None if full else header_of(packet)
+        if header is not None:
+            flags = header.flag_names
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("TCP数据包分析: %s:%d -> %s:%d 序列号=%d 确认号=%d 标志=%s",
+                            header.src_ip, header.sport, header.dst_ip, header.dport,
+                            header.seq, header.ack, ' '.join(flags))
+            return {
+                'src_ip': header.src_ip,
+                'dst_ip': header.dst_ip,
+                'sport': header.sport,
+                'dport': header.dport,
+                'seq': header.seq,
+                'ack': header.ack,
+                'flags': flags
+            }
+        if isinstance(packet, (bytes, bytearray, memoryview)):
+            packet = IP(bytes(packet))
+        if packet.haslayer(TCP):
+            # 获取TCP层信息
+            tcp = packet[TCP]
+            
+            # 分析TCP标志
+            flags = []
+            if tcp.flags & 0x01:  # FIN
+                flags.append("FIN")
+            if tcp.flags & 0x02:  # SYN
+                flags.append("SYN")
+            if tcp.flags & 0x04:  # RST
+                flags.append("RST")
+            if tcp.flags & 0x08:  # PSH
+                flags.append("PSH")
+            if tcp.flags & 0x10:  # ACK
+                flags.append("ACK")
+            if tcp.flags & 0x20:  # URG
+                flags.append("URG")
+            
+            # 打印数据包信息
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("TCP数据包分析: %s:%d -> %s:%d 序列号=%d 确认号=%d 标志=%s",
+                            packet[IP].src, tcp.sport, packet[IP].dst, tcp.dport,
+                            tcp.seq, tcp.ack, ' '.join(flags))
+            
+            return {
+                'src_ip': packet[IP].src,
+                'dst_ip': packet[IP].dst,
+                'sport': tcp.sport,
+                'dport': tcp.dport,
+                'seq': tcp.seq,
+                'ack': tcp.ack,
+                'flags': flags
+            }
+        return None
+    
+    @staticmethod
+    def analyze_pcap(filename):
+        """统计pcap文件中的TCP报文，直接从内存映射的文件解码，不构造Scapy对象"""
+        columns = read_tcp_columns(filename)
+        count = len(columns['index'])
+        flags = columns['flags']
+        flag_counts = {
+            name: int(((flags & bit) != 0).sum())
+            for bit, name in ((0x01, "FIN"), (0x02, "SYN"), (0x04, "RST"),
+                              (0x08, "PSH"), (0x10, "ACK"), (0x20, "URG"))
+        }
+        
+        # 不区分方向的连接数：两个端点按(IP, 端口)排序后去重
+        local = (columns['src_ip'].astype('u8') << 16) | columns['sport']
+        remote = (columns['dst_ip'].astype('u8') << 16) | columns['dport']
+        endpoints = np.stack([np.minimum(local, remote), np.maximum(local, remote)], axis=1)
+        connections = len(np.unique(endpoints, axis=0)) if count else 0
+        
+        timestamps = columns['timestamp']
+        return {
+            'packets': count,
+            'connections': connections,
+            'flags': flag_counts,
+            'payload_bytes': int(columns['payload_len'].sum()),
+            'duration': float(timestamps.max() - timestamps.min()) if count else 0.0,
+            'columns': columns
+        }
+    
+    @staticmethod
+    def capture_packets(interface=None, count=0, timeout=None):
+        """捕获数据包"""
+        try:
+            packets = sniff(iface=interface, count=count, timeout=timeout)
+            return packets
+        except Exception as e:
+            logger.error(f"捕获数据包时发生错误: {str(e)}")
+            return []
+    
+    @staticmethod
+    def save_pcap(packets, filename):
+        """保存数据包到pcap文件"""
+        try:
+            wrpcap(filename, packets)
+            logger.info(f"数据包已保存到 {filename}")
+        except Exception as e:
+            logger.error(f"保存数据包时发生错误: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import socket
+import struct
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .error_handler import ConfigurationError
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖，仅导出和查询需要
+    np = None
+
+# 列名 -> array类型码，与numpy的dtype一一对应
+COLUMNS = (
+    ("timestamp", "d"),
+    ("src_ip", "I"),
+    ("dst_ip", "I"),
+    ("sport", "H"),
+    ("dport", "H"),
+    ("seq", "I"),
+    ("ack", "I"),
+    ("flags", "B"),
+    ("payload_len", "I"),
+    ("event", "H"),
+)
+
+_DTYPES = {"d": "<f8", "I": "<u4", "H": "<u2", "B": "u1"}
+_IP_STRUCT = struct.Struct("!I")
+
+@lru_cache(maxsize=4096)
+def ip_to_int(ip: str) -> int:
+    """将点分十进制IPv4地址转换为整数"""
+    return _IP_STRUCT.unpack(socket.inet_aton(ip))[0]
+
+def int_to_ip(value: int) -> str:
+    """将整数转换为点分十进制IPv4地址"""
+    return socket.inet_ntoa(_IP_STRUCT.pack(int(value)))
+
+class PacketTable:
+    """列式报文表
+    
+    每列是一个定长类型的 array.array，追加时按倍数扩容(均摊O(1))，
+    每个报文只占约40字节；查询和导出时整块转换为numpy数组。
+    事件类型按出现顺序编码为整数，字符串保存在 event_types 中。
+    """
+    
+    def __init__(self):
+        self._columns: Dict[str, array] = {name: array(code) for name, code in COLUMNS}
+        self.event_types: List[str] = []
+        self._event_codes: Dict[str, int] = {}
+    
+    def __len__(self) -> int:
+        return len(self._columns["timestamp"])
+    
+    def _event_code(self, event: str) -> int:
+        code = self._event_codes.get(event)
+        if code is None:
+            code = self._event_codes[event] = len(self.event_types)
+            self.event_types.append(event)
+        return code
+    
+    def append(self, timestamp: float, src_ip: int, dst_ip: int, sport: int, dport: int,
+               seq: int, ack: int, flags: int, payload_len: int = 0, event: str = "") -> None:
+        """追加一行，IP地址为整数形式(见 ip_to_int)"""
+        columns = self._columns
+        columns["timestamp"].append(timestamp)
+        columns["src_ip"].append(src_ip)
+        columns["dst_ip"].append(dst_ip)
+        columns["sport"].append(sport)
+        columns["dport"].append(dport)
+        columns["seq"].append(seq)
+        columns["ack"].append(ack)
+        columns["flags"].append(flags)
+        columns["payload_len"].append(payload_len)
+        columns["event"].append(self._event_code(event))
+    
+    def extend(self, columns: Dict[str, Any], event: str = "",
+               events: Optional[Sequence[str]] = None) -> None:
+        """
+        批量追加多行
+        
+        Args:
+            columns: 列名到等长序列的映射，例如 PcapReader.tcp_columns 的结果；
+                缺少的payload_len列按0填充
+            event: 这些行的事件类型
+            events: 每一行的事件类型，给出时忽略event
+        """
+        count = len(columns["timestamp"])
+        for name, code in COLUMNS:
+            if name == "event":
+                if events is None:
+                    self._columns[name].extend([self._event_code(event)] * count)
+                else:
+                    self._columns[name].extend([self._event_code(e) for e in events])
+            elif name in columns:
+                values = columns[name]
+                if np is not None and isinstance(values, np.ndarray):
+                    values = values.astype(_DTYPES[code], copy=False).tobytes()
+                    self._columns[name].frombytes(values)
+                else:
+                    self._columns[name].extend(values)
+            else:
+                self._columns[name].extend([0] * count)
+    
+    def row(self, index: int) -> Dict[str, Any]:
+        """以字典形式返回一行，IP地址转换为字符串，事件类型转换为名称"""
+        result = {name: self._columns[name][index] for name, _ in COLUMNS}
+        result["src_ip"] = int_to_ip(result["src_ip"])
+        result["dst_ip"] = int_to_ip(result["dst_ip"])
+        result["event"] = self.event_types[result["event"]]
+        return result
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(len(self)):
+            yield self.row(index)
+    
+    def column(self, name: str) -> Any:
+        """
+        返回某一列的numpy数组
+        
+        数据整块复制出来：array.array 在有缓冲区视图存在时不能扩容，
+        返回视图会导致之后的追加失败。
+        """
+        if np is None:
+            raise ConfigurationError("导出列式数据需要安装numpy")
+        values = self._columns[name]
+        return np.frombuffer(values, dtype=_DTYPES[values.typecode]).copy()
+    
+    def to_numpy(self) -> Dict[str, Any]:
+        """导出为列名到numpy数组的字典"""
+        return {name: self.column(name) for name, _ in COLUMNS}
+    
+    def to_structured(self) -> Any:
+        """导出为numpy结构化数组，每个报文一条记录"""
+        if np is None:
+            raise ConfigurationError("导出列式数据需要安装numpy")
+        records = np.empty(len(self), dtype=[(name, _DTYPES[code]) for name, code in COLUMNS])
+        for name, _ in COLUMNS:
+            records[name] = self.column(name)
+        return records
+    
+    def mask(
+        self,
+        src_ip: Optional[str] = None,
+        dst_ip: Optional[str] = None,
+        sport: Optional[int] = None,
+        dport: Optional[int] = None,
+        flags: Optional[int] = None,
+        event: Optional[str] = None,
+        start: Optional[float] = None,
+        end: Optional[float] = None
+    ) -> Any:
+        """
+        按条件生成布尔掩码，各条件之间为"与"关系
+        
+        Args:
+            src_ip: 源IP地址
+            dst_ip: 目标IP地址
+            sport: 源端口
+            dport: 目标端口
+            flags: 标志位，所有给定的位都置位才匹配
+            event: 事件类型
+            start: 时间下限(含)
+            end: 时间上限(不含)
+        
+        Returns:
+            numpy.ndarray: 长度与表相同的布尔数组
+        """
+        if np is None:
+            raise ConfigurationError("查询列式数据需要安装numpy")
+        result = np.ones(len(self), dtype=bool)
+        if src_ip is not None:
+            result &= self.column("src_ip") == ip_to_int(src_ip)
+        if dst_ip is not None:
+            result &= self.column("dst_ip") == ip_to_int(dst_ip)
+        if sport is not None:
+            result &= self.column("sport") == sport
+        if dport is not None:
+            result &= self.column("dport") == dport
+        if flags is not None:
+            result &= (self.column("flags") & flags) == flags
+        if event is not None:
+            code = self._event_codes.get(event)
+            if code is None:
+                result[:] = False
+            else:
+                result &= self.column("event") == code
+        if start is not None:
+            result &= self.column("timestamp") >= start
+        if end is not None:
+            result &= self.column("timestamp") < end
+        return result
+    
+    def select(self, **conditions: Any) -> Dict[str, Any]:
+        """返回满足条件(同 mask)的行，格式同 to_numpy"""
+        selected = self.mask(**conditions)
+        return {name: values[selected] for name, values in self.to_numpy().items()}
+    
+    def count(self, **conditions: Any) -> int:
+        """统计满足条件(同 mask)的行数"""
+        return int(self.mask(**conditions).sum())
+    
+    def count_by(self, name: str, **conditions: Any) -> Dict[Any, int]:
+        """
+        按某一列的取值分组计数
+        
+        Args:
+            name: 分组列名，src_ip/dst_ip 的键为字符串，event 的键为事件类型名称
+            conditions: 先按这些条件过滤(同 mask)
+        
+        Returns:
+            Dict[Any, int]: 取值到行数的映射
+        """
+        values = self.column(name)
+        if conditions:
+            values = values[self.mask(**conditions)]
+        keys, counts = np.unique(values, return_counts=True)
+        if name in ("src_ip", "dst_ip"):
+            keys = [int_to_ip(key) for key in keys]
+        elif name == "event":
+            keys = [self.event_types[key] for key in keys]
+        else:
+            keys = keys.tolist()
+        return dict(zip(keys, counts.tolist()))
\ No newline at end of file
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+import time
+from typing import Any, BinaryIO, Iterable, List, Optional, Sequence
+
+from .error_handler import ConfigurationError
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖
+    np = None
+
+# pcap文件格式常量
+PCAP_MAGIC = 0xA1B2C3D4
+PCAP_VERSION = (2, 4)
+LINKTYPE_RAW = 101  # 无链路层头部，直接是IPv4/IPv6报文
+DEFAULT_SNAPLEN = 65535
+
+_GLOBAL_HEADER = struct.Struct("<IHHiIII")
+_RECORD_HEADER = struct.Struct("<IIII")
+
+# pcapng块类型
+PCAPNG_SHB = 0x0A0D0D0A  # 节头块
+PCAPNG_IDB = 0x00000001  # 接口描述块
+PCAPNG_EPB = 0x00000006  # 增强报文块
+PCAPNG_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+_SHB = struct.Struct("<IIIHHqI")
+_IDB = struct.Struct("<IIHHII")
+_EPB_HEADER = struct.Struct("<IIIIIII")
+_BLOCK_TRAILER = struct.Struct("<I")
+
+def write_global_header(fileobj: BinaryIO, snaplen: int = DEFAULT_SNAPLEN,
+                        linktype: int = LINKTYPE_RAW) -> None:
+    """写入pcap全局头部"""
+    fileobj.write(_GLOBAL_HEADER.pack(
+        PCAP_MAGIC, PCAP_VERSION[0], PCAP_VERSION[1], 0, 0, snaplen, linktype
+    ))
+
+def write_packet(fileobj: BinaryIO, data: Any, timestamp: Optional[float] = None) -> int:
+    """
+    写入单条pcap记录
+    
+    Args:
+        fileobj: 已写入全局头部的文件对象
+        data: 原始报文，支持bytes/bytearray/memoryview，或由多个缓冲区组成的元组
+            (如头部和负载)，各部分依次写出，不拼接
+        timestamp: 时间戳(秒)，默认为当前时间
+    
+    Returns:
+        int: 写入的字节数
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    sec = int(timestamp)
+    usec = int(round((timestamp - sec) * 1e6))
+    if usec >= 1000000:
+        sec += 1
+        usec -= 1000000
+    if type(data) is tuple:
+        length = sum(map(len, data))
+        fileobj.write(_RECORD_HEADER.pack(sec, usec, length, length))
+        for part in data:
+            fileobj.write(part)
+    else:
+        length = len(data)
+        fileobj.write(_RECORD_HEADER.pack(sec, usec, length, length))
+        fileobj.write(data)
+    return _RECORD_HEADER.size + length
+
+def write_pcapng_header(fileobj: BinaryIO, snaplen: int = DEFAULT_SNAPLEN,
+                        linktype: int = LINKTYPE_RAW) -> None:
+    """写入pcapng节头块和一个接口描述块(时间戳精度为微秒)"""
+    fileobj.write(_SHB.pack(PCAPNG_SHB, _SHB.size, PCAPNG_BYTE_ORDER_MAGIC, 1, 0, -1, _SHB.size))
+    fileobj.write(_IDB.pack(PCAPNG_IDB, _IDB.size, linktype, 0, snaplen, _IDB.size))
+
+def write_pcapng_packet(fileobj: BinaryIO, data: Any, timestamp: Optional[float] = None) -> int:
+    """
+    写入单个pcapng增强报文块
+    
+    Args:
+        fileobj: 已写入节头块和接口描述块的文件对象
+        data: 原始报文，支持bytes/bytearray/memoryview，或由多个缓冲区组成的元组
+            (如头部和负载)，各部分依次写出，不拼接
+        timestamp: 时间戳(秒)，默认为当前时间
+    
+    Returns:
+        int: 写入的字节数
+    """
+    if timestamp is None:
+        timestamp = time.time()
+    ticks = int(round(timestamp * 1e6))
+    parts = data if type(data) is tuple else (data,)
+    length = sum(map(len, parts))
+    padding = -length % 4
+    block_len = _EPB_HEADER.size + length + padding + _BLOCK_TRAILER.size
+    fileobj.write(_EPB_HEADER.pack(PCAPNG_EPB, block_len, 0, ticks >> 32,
+                                   ticks & 0xFFFFFFFF, length, length))
+    for part in parts:
+        fileobj.write(part)
+    fileobj.write(b"\x00" * padding + _BLOCK_TRAILER.pack(block_len))
+    return block_len
+
+def write_batch(fileobj: BinaryIO, headers: Any,
+                timestamps: Optional[Sequence[float]] = None) -> int:
+    """
+    将定长报文矩阵一次性写入pcap
+    
+    记录头与报文在numpy结构化数组中拼接完成后整体写出，不逐包构造对象。
+    
+    Args:
+        fileobj: 已写入全局头部的文件对象
+        headers: 形状为 N×L 的uint8矩阵，例如 PacketFactory.create_tcp_batch 的结果
+        timestamps: 每个报文的时间戳(秒)，默认全部使用当前时间
+    
+    Returns:
+        int: 写入的字节数
+    """
+    if np is None:
+        raise ConfigurationError("批量写入pcap需要安装numpy")
+    
+    headers = np.ascontiguousarray(headers, dtype=np.uint8)
+    count, length = headers.shape
+    records = np.empty(count, dtype=np.dtype([
+        ("ts_sec", "<u4"), ("ts_usec", "<u4"),
+        ("incl_len", "<u4"), ("orig_len", "<u4"),
+        ("data", np.uint8, (length,)),
+    ]))
+    
+    if timestamps is None:
+        ts = np.full(count, time.time())
+    else:
+        ts = np.asarray(timestamps, dtype=np.float64)
+    sec = np.floor(ts)
+    records["ts_sec"] = sec
+    records["ts_usec"] = np.minimum(np.round((ts - sec) * 1e6), 999999)
+    records["incl_len"] = length
+    records["orig_len"] = length
+    records["data"] = headers
+    
+    fileobj.write(records.tobytes())
+    return records.nbytes
+
+def write_pcap(filename: str, packets: Iterable[Any],
+               timestamps: Optional[Sequence[float]] = None) -> None:
+    """
+    将原始报文写入pcap文件(LINKTYPE_RAW)
+    
+    Args:
+        filename: 输出文件名
+        packets: 原始报文序列，或 N×L 的uint8矩阵
+        timestamps: 每个报文的时间戳(秒)
+    """
+    with open(filename, "wb") as f:
+        write_global_header(f)
+        if np is not None and isinstance(packets, np.ndarray):
+            write_batch(f, packets, timestamps)
+            return
+        if timestamps is None:
+            for data in packets:
+                write_packet(f, data)
+        else:
+            for data, ts in zip(packets, timestamps):
+                write_packet(f, data, ts)
+
+class PcapWriter:
+    """流式pcap/pcapng写入器
+    
+    报文经带缓冲的文件句柄逐条写出，内存占用与运行时长无关；
+    可按文件大小或时长滚动到新文件，文件名依次为 name.pcap、name.1.pcap、name.2.pcap…
+    """
+    
+    FORMATS = ("pcap", "pcapng")
+    
+    def __init__(
+        self,
+        filename: str,
+        format: str = "pcap",
+        max_bytes: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        buffer_size: int = 65536,
+        linktype: int = LINKTYPE_RAW
+    ):
+        """
+        初始化写入器，第一次写入时才创建文件
+        
+        Args:
+            filename: 输出文件名
+            format: 文件格式，pcap或pcapng
+            max_bytes: 单个文件的最大字节数，None表示不按大小滚动
+            max_seconds: 单个文件覆盖的最长时间(按报文时间戳计算)，None表示不按时间滚动
+            buffer_size: 文件写缓冲区大小(字节)
+            linktype: 链路层类型
+        """
+        if format not in self.FORMATS:
+            raise ConfigurationError(f"不支持的抓包文件格式: {format}")
+        self.filename = filename
+        self.format = format
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.buffer_size = buffer_size
+        self.linktype = linktype
+        self.files: List[str] = []
+        self.packets = 0
+        
+        self._file: Optional[BinaryIO] = None
+        self._file_bytes = 0
+        self._file_start: Optional[float] = None
+        if format == "pcapng":
+            self._write_header, self._write_packet = write_pcapng_header, write_pcapng_packet
+        else:
+            self._write_header, self._write_packet = write_global_header, write_packet
+    
+    def _next_filename(self) -> str:
+        index = len(self.files)
+        if not index:
+            return self.filename
+        root, ext = os.path.splitext(self.filename)
+        return f"{root}.{index}{ext}"
+    
+    def rotate(self) -> None:
+        """关闭当前文件，下一次写入时打开新文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    
+    def write(self, data: Any, timestamp: Optional[float] = None) -> None:
+        """
+        写入一个报文
+        
+        Args:
+            data: 原始报文，或由多个缓冲区组成的元组，见 write_packet
+            timestamp: 时间戳(秒)，默认为当前时间
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        if self._file is not None and (
+                (self.max_bytes is not None and self._file_bytes >= self.max_bytes)
+                or (self.max_seconds is not None
+                    and timestamp - self._file_start >= self.max_seconds)):
+            self.rotate()
+        if self._file is None:
+            filename = self._next_filename()
+            self._file = open(filename, "wb", buffering=self.buffer_size)
+            self._write_header(self._file, linktype=self.linktype)
+            self._file_bytes = self._file.tell()
+            self._file_start = timestamp
+            self.files.append(filename)
+        self._file_bytes += self._write_packet(self._file, data, timestamp)
+        self.packets += 1
+    
+    def write_many(self, packets: Iterable[Any], timestamps: Iterable[Optional[float]]) -> None:
+        """依次写入多个报文，参数含义同 write"""
+        write = self.write
+        for data, timestamp in zip(packets, timestamps):
+            write(data, timestamp)
+    
+    def flush(self) -> None:
+        """把缓冲区中的数据写入文件"""
+        if self._file is not None:
+            self._file.flush()
+    
+    def close(self) -> None:
+        """关闭写入器"""
+        self.rotate()
+    
+    def __enter__(self) -> 'PcapWriter':
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
\ No newline at end of file
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import mmap
+import struct
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from .error_handler import ConfigurationError, PacketError
+from .pcap import _GLOBAL_HEADER, _RECORD_HEADER, LINKTYPE_RAW
+
+try:
+    import numpy as np
+except ImportError:  # numpy为可选依赖
+    np = None
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_LINUX_SLL = 113
+
+# 各链路层类型的头部长度，以及该头部中标识IPv4的字段(偏移, 值)
+_LINK_LAYERS = {
+    LINKTYPE_RAW: (0, None),
+    LINKTYPE_ETHERNET: (14, (12, 0x0800)),
+    LINKTYPE_LINUX_SLL: (16, (14, 0x0800)),
+    LINKTYPE_NULL: (4, None),
+}
+
+# 魔数 -> (字节序, 时间戳小数部分的单位数/秒)
+_MAGICS = {
+    0xA1B2C3D4: ("<", 1000000),
+    0xD4C3B2A1: (">", 1000000),
+    0xA1B23C4D: ("<", 1000000000),
+    0x4D3CB2A1: (">", 1000000000),
+}
+
+TCP_COLUMNS = ("index", "timestamp", "src_ip", "dst_ip", "sport", "dport",
+               "seq", "ack", "flags", "payload_len")
+
+class PcapReader:
+    """基于内存映射的pcap读取器
+    
+    记录头直接从映射的缓冲区中解析，报文数据以memoryview返回，不做复制，
+    也不构造Scapy对象；tcp_columns 用numpy一次性解码所有IPv4/TCP报文的头部字段。
+    """
+    
+    def __init__(self, filename: str):
+        """
+        打开pcap文件
+        
+        Args:
+            filename: pcap文件名(不支持pcapng)
+        """
+        self.filename = filename
+        self._file = open(filename, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise PacketError(f"pcap文件为空: {filename}")
+        if len(self._map) < _GLOBAL_HEADER.size:
+            self.close()
+            raise PacketError(f"pcap文件头不完整: {filename}")
+        
+        magic = struct.unpack_from("<I", self._map, 0)[0]
+        if magic not in _MAGICS:
+            self.close()
+            raise PacketError(f"不支持的抓包文件格式(魔数 {magic:#010x}): {filename}")
+        byte_order, self.ts_resolution = _MAGICS[magic]
+        self._global_header = struct.Struct(byte_order + _GLOBAL_HEADER.format[1:])
+        self._record_header = struct.Struct(byte_order + _RECORD_HEADER.format[1:])
+        _, _, _, _, _, self.snaplen, self.linktype = self._global_header.unpack_from(self._map, 0)
+        self._index = None
+    
+    def close(self) -> None:
+        """解除映射并关闭文件"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+    
+    def __enter__(self) -> 'PcapReader':
+        return self
+    
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+    
+    def _build_index(self) -> Tuple[Any, Any, Any, Any]:
+        """遍历记录头，返回各记录的(秒, 小数部分, 数据偏移, 捕获长度)"""
+        index = self._fixed_length_index()
+        if index is not None:
+            return index
+        buf = self._map
+        size = len(buf)
+        unpack_from = self._record_header.unpack_from
+        header_size = self._record_header.size
+        secs, fracs, offsets, lengths = [], [], [], []
+        offset = _GLOBAL_HEADER.size
+        while offset + header_size <= size:
+            sec, frac, incl_len, _ = unpack_from(buf, offset)
+            offset += header_size
+            if offset + incl_len > size:
+                break  # 文件末尾被截断的记录
+            secs.append(sec)
+            fracs.append(frac)
+            offsets.append(offset)
+            lengths.append(incl_len)
+            offset += incl_len
+        return secs, fracs, offsets, lengths
+    
+    def _fixed_length_index(self) -> Optional[Tuple[Any, Any, Any, Any]]:
+        """所有记录等长时(如仿真生成的纯头部报文)直接按步长向量化建立索引"""
+        header_size = self._record_header.size
+        body = len(self._map) - _GLOBAL_HEADER.size
+        if np is None or body < header_size:
+            return None
+        length = self._record_header.unpack_from(self._map, _GLOBAL_HEADER.size)[2]
+        stride = header_size + length
+        if body % stride:
+            return None
+        count = body // stride
+        word = np.dtype(self._record_header.format[0] + "u4")
+        records = np.ndarray((count, 4), dtype=word, buffer=self._map,
+                             offset=_GLOBAL_HEADER.size, strides=(stride, 4))
+        if not (records[:, 2] == length).all():
+            return None
+        offsets = _GLOBAL_HEADER.size + header_size + np.arange(count, dtype=np.int64) * stride
+        # 复制出映射区，避免残留的视图阻止close()解除映射
+        return (records[:, 0].astype(np.int64), records[:, 1].astype(np.int64), offsets,
+                np.full(count, length, dtype=np.int64))
+    
+    def __len__(self) -> int:
+        if self._index is None:
+            self._index = self._build_index()
+        return len(self._index[2])
+    
+    def __iter__(self) -> Iterator[Tuple[float, memoryview]]:
+        """逐条返回(时间戳, 报文数据的memoryview)"""
+        if self._index is None:
+            self._index = self._build_index()
+        view = memoryview(self._map)
+        resolution = self.ts_resolution
+        for sec, frac, offset, length in zip(*self._index):
+            yield sec + frac / resolution, view[offset:offset + length]
+    
+    def tcp_columns(self) -> Dict[str, Any]:
+        """
+        把所有IPv4/TCP报文解码为列式数组
+        
+        Returns:
+            Dict[str, Any]: 键见 TCP_COLUMNS，均为长度相同的numpy数组；
+                src_ip/dst_ip为uint32形式的IPv4地址，index为报文在文件中的序号
+        """
+        if np is None:
+            raise ConfigurationError("列式解码pcap需要安装numpy")
+        if self.linktype not in _LINK_LAYERS:
+            raise PacketError(f"不支持的链路层类型: {self.linktype}")
+        if self._index is None:
+            self._index = self._build_index()
+        secs, fracs, offsets, lengths = self._index
+        
+        buf = np.frombuffer(self._map, dtype=np.uint8)
+        index = np.arange(len(offsets), dtype=np.int64)
+        ip = np.asarray(offsets, dtype=np.int64)
+        caplen = np.asarray(lengths, dtype=np.int64)
+        
+        # 跳过链路层头部，只保留IPv4报文
+        link_len, ethertype = _LINK_LAYERS[self.linktype]
+        keep = caplen >= link_len + 20
+        if ethertype is not None:
+            field = ip + ethertype[0]
+            keep[keep] = _u16(buf, field[keep]) == ethertype[1]
+        ip = ip + link_len
+        keep[keep] = (buf[ip[keep]] >> 4) == 4
+        keep[keep] = buf[ip[keep] + 9] == 6
+        index, ip, caplen = index[keep], ip[keep], caplen[keep] - link_len
+        
+        # 头部被snaplen截断的报文无法解码TCP字段
+        ihl = (buf[ip] & 0x0F).astype(np.int64) * 4
+        keep = caplen >= ihl + 20
+        index, ip, caplen, ihl = index[keep], ip[keep], caplen[keep], ihl[keep]
+        tcp = ip + ihl
+        
+        secs = np.asarray(secs, dtype=np.float64)[index]
+        fracs = np.asarray(fracs, dtype=np.float64)[index]
+        total_len = _u16(buf, ip + 2).astype(np.int64)
+        data_offset = (buf[tcp + 12] >> 4).astype(np.int64) * 4
+        return {
+            "index": index,
+            "timestamp": secs + fracs / self.ts_resolution,
+            "src_ip": _u32(buf, ip + 12),
+            "dst_ip": _u32(buf, ip + 16),
+            "sport": _u16(buf, tcp),
+            "dport": _u16(buf, tcp + 2),
+            "seq": _u32(buf, tcp + 4),
+            "ack": _u32(buf, tcp + 8),
+            "flags": buf[tcp + 13],
+            "payload_len": np.maximum(total_len - ihl - data_offset, 0).astype(np.uint32),
+        }
+
+def _u16(buf: Any, pos: Any) -> Any:
+    """按网络字节序从pos处取出16位整数"""
+    return (buf[pos].astype(np.uint16) << 8) | buf[pos + 1]
+
+def _u32(buf: Any, pos: Any) -> Any:
+    """按网络字节序从pos处取出32位整数"""
+    return ((buf[pos].astype(np.uint32) << 24) | (buf[pos + 1].astype(np.uint32) << 16)
+            | (buf[pos + 2].astype(np.uint32) << 8) | buf[pos + 3])
+
+def read_tcp_columns(filename: str) -> Dict[str, Any]:
+    """读取pcap文件中的IPv4/TCP报文，返回列式数组"""
+    with PcapReader(filename) as reader:
+        columns = reader.tcp_columns()
+    return columns
\ No newline at end of file
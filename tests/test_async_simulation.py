@@ -0,0 +1,80 @@
+import asyncio
+import socket
+import time
+from tcp_simulation.core.async_simulation import AsyncPacketIO, AsyncTCPSimulation, parse_segment
+from tcp_simulation.core.segment import Segment, SYN, ACK, FIN, RST
+
+CONFIG = {
+    'src_ip': '192.168.1.100',
+    'dst_ip': '192.168.1.101',
+    'src_port': 12345,
+    'dst_port': 80,
+    'initial_seq': 1000,
+    'timeout': 1.0,
+}
+
+class LoopbackIO(AsyncPacketIO):
+    """用socketpair代替原始套接字，由进程内的应答方按RTT回包"""
+    
+    def __init__(self, rtt=0.05, closed_ports=()):
+        super().__init__()
+        self.rtt = rtt
+        self.closed_ports = set(closed_ports)
+    
+    def _open_sockets(self):
+        self._peer, recv_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        return self._peer, recv_sock
+    
+    def _transmit(self, data, dst_ip):
+        segment = parse_segment(data)
+        replies = []
+        if segment.dst_port in self.closed_ports:
+            replies.append((RST | ACK, 0, segment.seq + 1))
+        elif segment.flags & SYN:
+            replies.append((SYN | ACK, 5000, segment.seq + 1))
+        elif segment.flags & FIN:
+            replies.append((ACK, 5001, segment.seq + 1))
+            replies.append((FIN | ACK, 5001, segment.seq + 1))
+        loop = asyncio.get_running_loop()
+        for flags, seq, ack in replies:
+            reply = Segment(segment.dst_ip, segment.src_ip, segment.dst_port, segment.src_port,
+                            flags, seq, ack)
+            loop.call_later(self.rtt, self._peer.send, reply.to_bytes())
+
+def test_parse_segment():
+    """测试解析原始IPv4/TCP报文"""
+    data = Segment('10.0.0.1', '10.0.0.2', 1234, 80, SYN | ACK, 7, 9, b'abc').to_bytes()
+    segment = parse_segment(data)
+    assert (segment.src_ip, segment.dst_ip) == ('10.0.0.1', '10.0.0.2')
+    assert (segment.src_port, segment.dst_port) == (1234, 80)
+    assert (segment.flags, segment.seq, segment.ack, segment.payload) == (SYN | ACK, 7, 9, b'abc')
+    assert parse_segment(b'\x00' * 10) is None
+
+def test_async_concurrent_handshakes():
+    """测试多条连接并发握手，总耗时取决于RTT而不是连接数"""
+    io = LoopbackIO(rtt=0.05, closed_ports=(81,))
+    simulation = AsyncTCPSimulation(CONFIG, io=io)
+    targets = [('192.168.1.101', 80)] * 50 + [('192.168.1.101', 81)]
+    
+    started = time.perf_counter()
+    results = simulation.run(targets)
+    elapsed = time.perf_counter() - started
+    
+    # 串行执行至少需要 50 × 2 × RTT = 5 秒
+    assert elapsed < 2.0
+    assert [result['state'] for result in results[:50]] == ['TIME_WAIT'] * 50
+    assert len({result['src_port'] for result in results}) == 51
+    assert all(result['rtt'] >= 0.05 for result in results[:50])
+    assert results[50]['reset'] and results[50]['state'] == 'CLOSED'
+    assert io.sent == 50 * 4 + 1
+    assert io.unmatched == 0
+def test_async_io_close_releases_sockets():
+    """测试关闭后不再持有已关闭的套接字，可以重新启动"""
+    async def main():
+        io = LoopbackIO()
+        for _ in range(2):
+            async with io:
+                assert io._send_sock is not None and io._recv_sock is not None
+            assert io._send_sock is None and io._recv_sock is None
+    
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,41 @@
+import pytest
+
+from benchmarks import suite
+
+def _result(ns, noise=None):
+    return {"ns_per_op": ns, "ops_per_sec": 1e9 / ns, "unit": "op", "noise": noise}
+
+def test_compare_flags_regressions():
+    """测试与基线比较时按阈值标记回退、提升和新增项目"""
+    baseline = {"results": {"a": _result(100.0), "b": _result(100.0), "c": _result(100.0)}}
+    current = {"results": {"a": _result(130.0), "b": _result(105.0), "c": _result(50.0),
+                           "d": _result(10.0)}}
+    
+    status = {row["name"]: row["status"] for row in suite.compare(baseline, current, threshold=0.1)}
+    
+    assert status == {"a": "regression", "b": "ok", "c": "improvement", "d": "new"}
+
+def test_compare_widens_tolerance_by_measured_noise():
+    """测试测得的波动大于阈值时以波动作为容差"""
+    baseline = {"results": {"a": _result(100.0, noise=0.3), "b": _result(100.0, noise=0.05)}}
+    current = {"results": {"a": _result(150.0, noise=0.1), "b": _result(130.0, noise=0.05)}}
+    
+    rows = {row["name"]: row for row in suite.compare(baseline, current, threshold=0.15)}
+    
+    assert rows["a"]["status"] == "regression" and rows["a"]["tolerance"] == pytest.approx(0.4)
+    assert rows["b"]["status"] == "regression" and rows["b"]["tolerance"] == 0.15
+    current["results"]["a"] = _result(135.0, noise=0.1)
+    assert suite.compare(baseline, current, threshold=0.15)[0]["status"] == "ok"
+
+def test_run_reports_ns_per_op():
+    """测试运行基准得到单次操作耗时"""
+    result = suite.run("tcp_state", min_time=0.01, repeat=2, runs=3)
+    
+    assert list(result["results"]) == ["tcp_state.handshake_teardown", "tcp_state.handshake_teardown[legacy]"]
+    entry = result["results"]["tcp_state.handshake_teardown"]
+    assert entry["ns_per_op"] > 0
+    assert entry["unit"] == "transition"
+    assert entry["runs"] == 3 and entry["noise"] >= 0
+    assert result["meta"]["python"] and result["meta"]["runs"] == 3
+    assert suite.run("tcp_state", min_time=0.01, repeat=2)["results"][
+        "tcp_state.handshake_teardown"]["noise"] is None
\ No newline at end of file
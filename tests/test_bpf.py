@@ -0,0 +1,113 @@
+import socket
+
+from tcp_simulation.core.bpf import FlowFilter
+from tcp_simulation.core.packet_factory import PacketFactory
+
+def _run(program, packet):
+    """按内核语义解释执行经典BPF程序，返回放行的字节数"""
+    a = x = pc = 0
+    while True:
+        code, jt, jf, k = program[pc]
+        pc += 1
+        if code == 0x20:
+            a = int.from_bytes(packet[k:k + 4], "big")
+        elif code == 0x28:
+            a = int.from_bytes(packet[k:k + 2], "big")
+        elif code == 0x30:
+            a = packet[k]
+        elif code == 0x48:
+            a = int.from_bytes(packet[x + k:x + k + 2], "big")
+        elif code == 0x50:
+            a = packet[x + k]
+        elif code == 0xB1:
+            x = (packet[k] & 0x0F) * 4
+        elif code == 0x54:
+            a &= k
+        elif code == 0x06:
+            return k
+        else:
+            taken = {0x15: a == k, 0x35: a >= k, 0x25: a > k, 0x45: a & k != 0}[code]
+            pc += jt if taken else jf
+
+def _reply(local_port, remote_port=80, flags="SA", remote_ip="10.0.0.2", local_ip="10.0.0.1"):
+    return PacketFactory.create_tcp_bytes(remote_ip, local_ip, remote_port, local_port, flags, 1, 1)
+
+def test_exact_filter_accepts_only_active_flows():
+    """测试连接较少时逐个匹配四元组"""
+    flow_filter = FlowFilter([("10.0.0.1", 40000, "10.0.0.2", 80), ("10.0.0.1", 40002, "10.0.0.2", 80)])
+    program = flow_filter.compile()
+    
+    assert flow_filter.mode == "exact"
+    assert _run(program, _reply(40000)) and _run(program, _reply(40002))
+    assert not _run(program, _reply(40001))
+    assert not _run(program, _reply(40000, remote_port=81))
+    assert not _run(program, _reply(40000, remote_ip="10.0.0.3"))
+    # 本端发出的报文方向相反，也不放行
+    assert not _run(program, PacketFactory.create_tcp_bytes("10.0.0.1", "10.0.0.2", 40000, 80, "S", 1, 0))
+    assert flow_filter.expression() == ("tcp and ((src host 10.0.0.2 and dst host 10.0.0.1 and "
+                                        "((src port 80 and dst port 40000) or (src port 80 and dst port 40002))))")
+
+def test_filter_escalates_to_ranges_and_masks():
+    """测试连接过多时依次改用端口区间和共有比特匹配，活动连接始终被放行"""
+    flows = [("10.0.0.1", port, "10.0.0.2", 80) for port in range(41000, 41100)]
+    flow_filter = FlowFilter(flows, max_rules=8)
+    program = flow_filter.compile()
+    
+    assert flow_filter.mode == "range"
+    assert all(_run(program, _reply(port)) for port in (41000, 41050, 41099))
+    assert not _run(program, _reply(40999)) and not _run(program, _reply(41100))
+    
+    for port in range(42000, 42100, 2):
+        flow_filter.add(("10.0.0.1", port, "10.0.0.2", 80))
+    program = flow_filter.compile()
+    
+    assert flow_filter.mode == "mask"
+    assert all(_run(program, _reply(port)) for _, port, _, _ in flows)
+    assert _run(program, _reply(42098))
+    assert not _run(program, _reply(40000, remote_port=8080))
+
+def test_filter_falls_back_when_program_is_too_long():
+    """测试地址组合过多、跳转越界时退回只检查协议"""
+    flows = [("10.0.0.1", 40000, f"10.0.{i // 250}.{i % 250 + 1}", 80) for i in range(300)]
+    program = FlowFilter(flows).compile()
+    
+    assert _run(program, _reply(1, remote_ip="192.168.0.1"))
+    # 协议号17(UDP)的IPv4报文
+    assert not _run(program, b"\x45" + bytes(8) + b"\x11" + bytes(30))
+
+def test_flags_filter_and_empty_filter():
+    """测试按TCP标志位过滤，没有连接时丢弃所有报文"""
+    flow_filter = FlowFilter([("10.0.0.1", 40000, "10.0.0.2", 80)], flags=0x12)
+    program = flow_filter.compile()
+    
+    assert _run(program, _reply(40000, flags="SA"))
+    assert not _run(program, _reply(40000, flags="F"))
+    assert flow_filter.expression().endswith("tcp[13] & 0x12 != 0")
+    
+    empty = FlowFilter()
+    assert empty.mode == "none"
+    assert not _run(empty.compile(), _reply(40000))
+    assert empty.expression() == "tcp and not tcp"
+
+class _RecordingSocket:
+    def __init__(self):
+        self.options = []
+    
+    def setsockopt(self, level, option, value):
+        self.options.append((level, option, value))
+
+def test_attach_only_when_flows_change(monkeypatch):
+    """测试连接集合不变时不重新挂载过滤器"""
+    monkeypatch.setattr("sys.platform", "linux")
+    sock = _RecordingSocket()
+    flow_filter = FlowFilter([("10.0.0.1", 40000, "10.0.0.2", 80)])
+    
+    assert flow_filter.attach(sock)
+    assert not flow_filter.attach(sock)
+    flow_filter.add(("10.0.0.1", 40000, "10.0.0.2", 80))
+    assert not flow_filter.attach(sock)
+    flow_filter.add(("10.0.0.1", 40001, "10.0.0.2", 80))
+    assert flow_filter.attach(sock)
+    
+    assert flow_filter.updates == 2 and len(sock.options) == 2
+    assert sock.options[0][:2] == (socket.SOL_SOCKET, 26)
\ No newline at end of file
@@ -0,0 +1,21 @@
+from scapy.all import IP, TCP
+from scapy.supersocket import IterSocket
+from tcp_simulation.core.capture import CaptureSession, reply_filter
+
+def test_reply_filter():
+    """测试只匹配对端发回本端的报文"""
+    assert reply_filter("10.0.0.1", "10.0.0.2") == "tcp and src host 10.0.0.2 and dst host 10.0.0.1"
+
+def test_capture_session_ring_buffer():
+    """测试抓包会话把报文写入环形缓冲区，满时丢弃最旧的报文"""
+    packets = [IP(src="10.0.0.2", dst="10.0.0.1")/TCP(seq=i) for i in range(5)]
+    session = CaptureSession(buffer_size=3, opened_socket=IterSocket(packets))
+    
+    with session:
+        session._sniffer.join(timeout=5)
+        assert session.captured == 5
+        assert session.overwritten == 2
+        assert [session.get(timeout=1)[TCP].seq for _ in range(3)] == [2, 3, 4]
+        assert session.get(timeout=0.01) is None
+    
+    assert not session.is_open
\ No newline at end of file
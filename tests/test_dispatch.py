@@ -0,0 +1,143 @@
+import threading
+import time
+from tcp_simulation.core.dispatch import DispatchQueue, BLOCK, DROP_OLDEST, SAMPLE
+from tcp_simulation.core.events import Event, EventManager, EventType
+from tcp_simulation.core.observers import PacketObserver, Subject
+
+class SlowObserver(PacketObserver):
+    """每个事件都要等待放行的观察者"""
+    
+    def __init__(self):
+        self.events = []
+        self.gate = threading.Event()
+    
+    def update(self, packet, event_type, **kwargs):
+        self.gate.wait()
+        self.events.append(event_type)
+
+def test_queued_observer_does_not_stall_notify():
+    """测试慢速观察者在后台处理，notify不被阻塞，满队列丢弃最旧事件"""
+    subject = Subject()
+    observer = SlowObserver()
+    queued = subject.attach_queued(observer, maxsize=4, policy=DROP_OLDEST)
+    
+    started = time.perf_counter()
+    for i in range(10):
+        subject.notify(None, f"E{i}")
+    assert time.perf_counter() - started < 0.5
+    
+    observer.gate.set()
+    subject.flush_observers(timeout=5)
+    metrics = subject.observer_metrics()["SlowObserver"]
+    assert metrics["processed"] + metrics["dropped"] == 10
+    assert metrics["dropped"] >= 5
+    assert metrics["max_depth"] == 4
+    assert metrics["depth"] == 0
+    assert observer.events[-1] == "E9"
+    
+    subject.detach(observer)
+    assert not subject._observers
+    assert not queued.queue.put(None, "LATE")
+
+def test_dispatch_queue_policies():
+    """测试阻塞策略不丢事件，采样策略在队列过半后按比例接收"""
+    gate = threading.Event()
+    received = []
+    
+    def handler(value):
+        gate.wait()
+        received.append(value)
+    
+    queue = DispatchQueue(handler, maxsize=2, policy=BLOCK)
+    threading.Timer(0.2, gate.set).start()
+    started = time.perf_counter()
+    for i in range(6):
+        assert queue.put(i)
+    assert time.perf_counter() - started >= 0.1
+    queue.close()
+    assert received == list(range(6))
+    assert queue.metrics()["lag"] >= 0.0
+    
+    gate.clear()
+    received.clear()
+    queue = DispatchQueue(handler, maxsize=100, policy=SAMPLE, sample_rate=5)
+    accepted = sum(queue.put(i) for i in range(101))
+    gate.set()
+    queue.close()
+    # 前50个全部进入队列(首个可能已被取出)，之后每5个接收1个
+    assert 50 + 10 <= accepted <= 51 + 11
+    assert queue.dropped == 101 - accepted
+
+def test_event_manager_queued_subscriber():
+    """测试事件管理器的异步订阅者在后台线程中执行"""
+    manager = EventManager()
+    threads = []
+    handler = lambda event: threads.append(threading.current_thread().name)
+    manager.subscribe_queued(EventType.PACKET_SENT, handler)
+    
+    for _ in range(3):
+        manager.emit(Event(EventType.PACKET_SENT, None))
+    manager.flush(timeout=5)
+    assert threads == ["event-PACKET_SENT"] * 3
+    assert list(manager.queue_metrics().values())[0]["processed"] == 3
+    
+    manager.unsubscribe(EventType.PACKET_SENT, handler)
+    manager.emit(Event(EventType.PACKET_SENT, None))
+    assert len(threads) == 3
+
+def test_batched_notifications(tmp_path):
+    """测试按数量和时间批量通知，以及观察者的批量处理"""
+    from scapy.all import rdpcap
+    from tcp_simulation.core.observers import PacketAnalyzerObserver, PcapSinkObserver
+    from tcp_simulation.core.offline_simulation import OfflineSimulation
+    
+    class BatchRecorder(PacketObserver):
+        def __init__(self):
+            self.batches = []
+        
+        def update(self, packet, event_type, **kwargs):
+            raise AssertionError("批量模式下不应逐包调用")
+        
+        def update_batch(self, packets, event_types, timestamps=None):
+            self.batches.append(list(event_types))
+    
+    subject = Subject()
+    recorder = BatchRecorder()
+    subject.attach(recorder)
+    subject.enable_batching(size=3)
+    for i in range(7):
+        subject.notify(None, f"E{i}")
+    assert recorder.batches == [["E0", "E1", "E2"], ["E3", "E4", "E5"]]
+    subject.flush_observers()
+    assert recorder.batches[-1] == ["E6"]
+    
+    subject.enable_batching(size=100, interval=0.05)
+    subject.notify(None, "T0")
+    subject.notify(None, "T1")
+    # 之后没有新的数据包，缓存的数据包也在interval后由后台线程通知
+    deadline = time.monotonic() + 2.0
+    while recorder.batches[-1] != ["T0", "T1"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert recorder.batches[-1] == ["T0", "T1"]
+    subject.notify(None, "T2")
+    subject.disable_batching()
+    assert recorder.batches[-1] == ["T2"]
+    assert subject._batch_flusher is None
+    
+    # 离线仿真中批量写pcap和分析，结果与逐包通知一致
+    simulation = OfflineSimulation({
+        'src_ip': '192.168.1.100', 'dst_ip': '192.168.1.101',
+        'src_port': 12345, 'dst_port': 80, 'initial_seq': 1000,
+        'observer_batch_size': 4,
+    })
+    analyzer = PacketAnalyzerObserver()
+    sink = PcapSinkObserver(str(tmp_path / "batch.pcap"))
+    simulation.attach(analyzer)
+    simulation.attach_queued(sink)
+    simulation.run()
+    simulation.detach(sink)
+    sink.close()
+    
+    assert len(analyzer.table) == 14
+    assert analyzer.get_analysis_results()[0]['event_type'] == "SEND_CLOSED"
+    assert len(rdpcap(str(tmp_path / "batch.pcap"))) == 14
\ No newline at end of file
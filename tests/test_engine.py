@@ -0,0 +1,38 @@
+import random
+
+from tcp_simulation.core.engine import EventScheduler, SimulatedLink
+from tcp_simulation.core.segment import Segment, SYN
+
+def test_scheduler_order():
+    """测试事件按虚拟时间和提交顺序执行"""
+    scheduler = EventScheduler()
+    order = []
+    scheduler.schedule(2.0, order.append, "c")
+    scheduler.schedule(1.0, order.append, "a")
+    scheduler.schedule(1.0, order.append, "b")
+    cancelled = scheduler.schedule(1.5, order.append, "x")
+    cancelled.cancel()
+    
+    assert scheduler.run() == 3
+    assert order == ["a", "b", "c"]
+    assert scheduler.now == 2.0
+
+def test_link_latency_bandwidth_loss():
+    """测试链路的传播时延、串行化时延和丢包"""
+    scheduler = EventScheduler()
+    link = SimulatedLink(scheduler, latency=0.01, bandwidth=40 * 8 * 1000)
+    arrivals = []
+    link.attach(lambda segment: arrivals.append(scheduler.now))
+    
+    for _ in range(2):
+        link.transmit(Segment("10.0.0.1", "10.0.0.2", 1000, 80, SYN, 0, 0))
+    scheduler.run()
+    
+    # 每个40字节报文串行化需要1ms，第二个报文需排队
+    assert arrivals == [0.011, 0.012]
+    
+    lossy = SimulatedLink(scheduler, loss_rate=0.5, rng=random.Random(1))
+    lossy.attach(lambda segment: None)
+    for _ in range(1000):
+        lossy.transmit(Segment("10.0.0.1", "10.0.0.2", 1000, 80, SYN, 0, 0))
+    assert 400 < lossy.dropped < 600
\ No newline at end of file
@@ -0,0 +1,53 @@
+from tcp_simulation.core.engine import EventScheduler, SimulatedLink
+from tcp_simulation.core.flow_table import ConnectionManager
+from tcp_simulation.core.segment import Segment, SYN
+
+def create_hosts(scheduler):
+    """创建通过一对链路相连的客户端和服务端主机"""
+    client_link = SimulatedLink(scheduler, latency=0.001)
+    server_link = SimulatedLink(scheduler, latency=0.001)
+    client = ConnectionManager(scheduler, "10.0.0.1", link=client_link)
+    server = ConnectionManager(scheduler, "10.0.0.2", link=server_link)
+    client_link.attach(server.receive)
+    server_link.attach(client.receive)
+    return client, server
+
+def test_demultiplex_by_four_tuple():
+    """测试报文按四元组分流到各自的连接"""
+    scheduler = EventScheduler()
+    client, server = create_hosts(scheduler)
+    server.listen(80)
+    server.listen(443)
+    
+    first = client.connect("10.0.0.2", 80, local_port=5000)
+    second = client.connect("10.0.0.2", 443, local_port=5000)
+    scheduler.run(until=0.01)
+    
+    assert first.state.name == "ESTABLISHED"
+    assert second.state.name == "ESTABLISHED"
+    assert len(server.flows) == 2
+    assert server.flows.get("10.0.0.2", 80, "10.0.0.1", 5000).state.name == "ESTABLISHED"
+    
+    # 未监听端口的SYN不会创建连接
+    server.receive(Segment("10.0.0.1", "10.0.0.2", 6000, 8080, SYN, 0, 0))
+    assert server.get_stats()['unmatched'] == 1
+    assert len(server.flows) == 2
+
+def test_many_concurrent_flows():
+    """测试大量并发连接同时处于ESTABLISHED状态并最终全部关闭"""
+    scheduler = EventScheduler()
+    client, server = create_hosts(scheduler)
+    server.listen(80)
+    
+    for _ in range(20000):
+        client.connect("10.0.0.2", 80, close_after=1.0)
+    scheduler.run(until=0.5)
+    
+    assert len(client.flows) == 20000
+    assert len(server.flows) == 20000
+    assert all(flow.state.name == "ESTABLISHED" for flow in server.flows)
+    
+    scheduler.run()
+    assert client.get_stats()['closed'] == 20000
+    assert server.get_stats()['closed'] == 20000
+    assert len(client.flows) == 0
\ No newline at end of file
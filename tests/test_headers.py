@@ -0,0 +1,92 @@
+from scapy.all import Ether, IP, Raw, TCP, UDP
+
+from tcp_simulation.core.observers import PacketAnalyzerObserver
+from tcp_simulation.utils.headers import header_of, parse_tcp_header, parse_tcp_options
+from tcp_simulation.utils.packet_analyzer import PacketAnalyzer
+
+def _syn_with_options():
+    return (IP(src="10.0.0.1", dst="10.0.0.2") /
+            TCP(sport=40000, dport=80, flags="S", seq=1000, window=29200,
+                options=[("MSS", 1400), ("NOP", None), ("WScale", 7), ("SAckOK", b""),
+                         ("Timestamp", (5, 6))]) /
+            b"hello")
+
+def test_parse_tcp_header_fields_and_options():
+    """测试解析头部字段、选项和负载"""
+    data = bytes(_syn_with_options())
+    header = parse_tcp_header(data)
+    
+    assert (header.src_ip, header.sport, header.dst_ip, header.dport) == ("10.0.0.1", 40000, "10.0.0.2", 80)
+    assert header.seq == 1000 and header.window == 29200
+    assert header.flag_names == ["SYN"] and header.data_offset == 40
+    assert bytes(header.payload) == b"hello"
+    assert header.mss == 1400
+    assert header.parse_options() == {'mss': 1400, 'wscale': 7, 'sack_permitted': True,
+                                      'timestamp': (5, 6)}
+
+def test_parse_tcp_header_rejects_other_packets():
+    """测试不是完整的IPv4 TCP报文或是后续分片时返回None"""
+    data = bytes(_syn_with_options())
+    
+    assert parse_tcp_header(data[:30]) is None
+    assert parse_tcp_header(bytes(IP(dst="10.0.0.2") / UDP() / (b"x" * 40))) is None
+    assert parse_tcp_header(bytes(IP(dst="10.0.0.2", frag=10) / TCP())) is None
+    # 带IP选项的报文
+    header = parse_tcp_header(bytes(IP(dst="10.0.0.2", options=b"\x01" * 4) / TCP(dport=443)))
+    assert header.ihl == 24 and header.dport == 443
+
+def test_parse_tcp_options_edge_cases():
+    """测试SACK块、未知选项和长度非法的选项"""
+    options = parse_tcp_options(b"\x01\x01\x05\x0a" + (100).to_bytes(4, "big") + (200).to_bytes(4, "big") +
+                                b"\x1e\x04ab" + b"\x02\x09")
+    
+    assert options == {'sack': [(100, 200)], 30: b"ab"}
+    assert parse_tcp_options(b"\x00\x02\x04\x05\xb4") == {}
+
+def test_header_of_uses_captured_bytes():
+    """测试抓包得到的报文直接解析原始字节，以太网填充不计入负载，构造的报文返回None"""
+    frame = Ether(bytes(Ether() / _syn_with_options()) + b"\x00" * 6)
+    
+    assert bytes(header_of(frame).payload) == b"hello"
+    assert header_of(IP(bytes(_syn_with_options()))).mss == 1400
+    assert header_of(_syn_with_options()) is None
+
+def test_modified_packets_fall_back_to_scapy():
+    """测试解析后被修改过的报文不使用过时的原始字节"""
+    for modify in (lambda p: setattr(p[TCP], 'seq', 999), lambda p: setattr(p, 'ttl', 3),
+                   lambda p: setattr(p[Raw], 'load', b"hello, world")):
+        packet = IP(bytes(_syn_with_options()))
+        modify(packet)
+        
+        assert header_of(packet) is None
+        assert PacketAnalyzer.analyze_tcp_packet(packet) == PacketAnalyzer.analyze_tcp_packet(packet, full=True)
+    
+    packet = IP(bytes(_syn_with_options()))
+    packet[TCP].seq = 999
+    observer = PacketAnalyzerObserver()
+    observer.update(packet, "RECV", time=1.0)
+    assert observer.get_analysis_results()[0]['seq'] == 999
+
+def test_analyzer_fast_path_matches_scapy():
+    """测试默认的快速解析与Scapy完整解析结果一致"""
+    packet = IP(bytes(_syn_with_options()))
+    
+    assert PacketAnalyzer.analyze_tcp_packet(packet) == PacketAnalyzer.analyze_tcp_packet(packet, full=True)
+    assert PacketAnalyzer.analyze_tcp_packet(bytes(packet))['flags'] == ["SYN"]
+    assert PacketAnalyzer.analyze_tcp_packet(IP(bytes(IP() / UDP()))) is None
+
+def test_analyzer_observer_rows_match_for_received_packets():
+    """测试收到的报文与构造的报文写入报文表的内容一致"""
+    constructed = _syn_with_options()
+    received = IP(bytes(constructed))
+    observer = PacketAnalyzerObserver()
+    observer.update(constructed, "SEND", time=1.0)
+    observer.update(received, "RECV", time=1.0)
+    observer.update_batch([received, IP(bytes(IP() / UDP()))], ["RECV", "RECV"], [1.0, 1.0])
+    
+    rows = observer.get_analysis_results()
+    assert len(rows) == 3
+    for row in rows:
+        row.pop('event_type')
+    assert rows[0] == rows[1] == rows[2]
+    assert rows[0]['payload_len'] == 5
\ No newline at end of file
@@ -0,0 +1,69 @@
+import socket
+
+import pytest
+
+from tcp_simulation.core.loadgen import BatchSender, SynLoadGenerator, TokenBucket
+from tcp_simulation.core.segment import SYN
+from tcp_simulation.core.async_simulation import parse_segment
+
+def test_token_bucket_limits_rate():
+    """测试令牌桶最多积攒burst个令牌，之后按rate补充"""
+    bucket = TokenBucket(1000, burst=10, now=0.0)
+    
+    assert bucket.consume(50, 0.0) == 10
+    assert bucket.consume(50, 0.0) == 0
+    assert bucket.delay(5, 0.0) == pytest.approx(0.005)
+    assert bucket.consume(50, 0.005) == 5
+    assert bucket.consume(50, 10.0) == 10
+
+@pytest.mark.parametrize("use_sendmmsg", [True, False])
+def test_batch_sender_sends_slots_in_order(use_sendmmsg):
+    """测试批量发送器一次发出缓冲区中的前count个报文"""
+    a, b = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    with a, b:
+        sender = BatchSender(a, batch_size=8, use_sendmmsg=use_sendmmsg)
+        for i in range(5):
+            sender.slot(i)[:] = bytes([i]) * 40
+        
+        assert sender.flush(5) == 5
+        assert [b.recv(100) for _ in range(5)] == [bytes([i]) * 40 for i in range(5)]
+        assert sender.sent == 5 and sender.errors == 0
+
+class _UdpLoadGenerator(SynLoadGenerator):
+    """把SYN作为UDP负载发往本机套接字，测试时不需要root权限"""
+    
+    def _open_sockets(self):
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM), None
+
+def test_load_generator_paces_random_syns():
+    """测试压力发生器按目标速率发送源端口随机的SYN"""
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    sink.settimeout(1.0)
+    reports = []
+    generator = _UdpLoadGenerator("10.0.0.1", "127.0.0.1", 8080, rate=2000, batch_size=16,
+                                  seed=1, report_interval=0.02)
+    generator.address = sink.getsockname()
+    with sink, generator:
+        stats = generator.run(count=200, on_report=reports.append)
+        segments = [parse_segment(sink.recv(100)) for _ in range(200)]
+    
+    assert stats['sent'] == 200 and stats['errors'] == 0
+    # 令牌桶初始只有burst个令牌，其余按速率补充
+    assert stats['elapsed'] >= (200 - generator.burst) / 2000 * 0.9
+    assert reports and all(report['current_rate'] > 0 for report in reports)
+    assert all(segment.flags == SYN and segment.dst_port == 8080 for segment in segments)
+    assert len({segment.src_port for segment in segments}) > 150
+    assert len({segment.seq for segment in segments}) == 200
+def test_load_generator_bounds_pending_syns():
+    """测试等待应答的SYN超过max_pending时丢弃最早的记录，同一源端口的SYN按ISN分别记录"""
+    generator = _UdpLoadGenerator("10.0.0.1", "127.0.0.1", 8080, rate=2000, batch_size=16,
+                                  full_handshake=True, seed=1, max_pending=100)
+    with generator:
+        for _ in range(10):
+            generator._fill_syns(16)
+        
+        assert len(generator.pending) == 100 and generator.expired == 60
+        generator._track([(40000, 1), (40000, 2)])
+        assert (40000, 1) in generator.pending and (40000, 2) in generator.pending
+        assert generator.run(count=0)['expired'] == 62
\ No newline at end of file
@@ -0,0 +1,69 @@
+import logging
+import threading
+from tcp_simulation.core.observers import LoggingObserver
+from tcp_simulation.utils.logger import QueueLogging
+
+class CountingPacket:
+    """记录 summary() 被调用的次数"""
+    
+    def __init__(self):
+        self.summaries = 0
+    
+    def summary(self):
+        self.summaries += 1
+        return "IP / TCP"
+
+class ListHandler(logging.Handler):
+    """保存格式化后的消息及格式化所在的线程"""
+    
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.threads = set()
+    
+    def emit(self, record):
+        self.messages.append(self.format(record))
+        self.threads.add(threading.current_thread().name)
+
+def test_logging_observer_level_and_sampling(caplog):
+    """测试日志级别未启用时不格式化，启用时按采样率每包一条记录"""
+    packet = CountingPacket()
+    observer = LoggingObserver(sample_rate=3)
+    
+    with caplog.at_level(logging.WARNING, logger="tcp_simulation.core.observers"):
+        for _ in range(6):
+            observer.update(packet, "SEND_CLOSED", time=1.0)
+    assert packet.summaries == 0
+    assert not caplog.records
+    
+    with caplog.at_level(logging.INFO, logger="tcp_simulation.core.observers"):
+        for _ in range(6):
+            observer.update(packet, "SEND_CLOSED", time=1.0)
+    assert len(caplog.records) == 2
+    assert caplog.records[0].getMessage() == "事件类型: SEND_CLOSED 数据包: IP / TCP time=1.0"
+
+def test_queue_logging_formats_in_background():
+    """测试后台日志在监听线程中格式化，队列满时丢弃记录"""
+    test_logger = logging.getLogger("tcp_simulation.tests.queue")
+    test_logger.propagate = False
+    test_logger.setLevel(logging.INFO)
+    handler = ListHandler()
+    test_logger.addHandler(handler)
+    
+    with QueueLogging(test_logger) as queue_logging:
+        assert test_logger.handlers == [queue_logging.handler]
+        for i in range(100):
+            test_logger.info("packet %d", i)
+    
+    assert test_logger.handlers == [handler]
+    assert handler.messages == [f"packet {i}" for i in range(100)]
+    assert threading.current_thread().name not in handler.threads
+    
+    # 监听线程未启动时队列很快写满
+    queue_logging = QueueLogging(test_logger, queue_size=10)
+    test_logger.removeHandler(handler)
+    test_logger.addHandler(queue_logging.handler)
+    for i in range(20):
+        test_logger.info("packet %d", i)
+    assert queue_logging.dropped == 10
+    test_logger.removeHandler(queue_logging.handler)
\ No newline at end of file
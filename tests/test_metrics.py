@@ -0,0 +1,81 @@
+import json
+import random
+
+from config import DEFAULT_CONFIG
+from tcp_simulation.core import tcp_simulation as core_simulation
+from tcp_simulation.utils.metrics import LatencyHistogram, PhaseMetrics
+
+def test_histogram_percentiles_within_precision():
+    """测试直方图分位数的相对误差在精度范围内"""
+    rng = random.Random(1)
+    values = sorted(rng.randint(1000, 10 ** 9) for _ in range(20000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    
+    assert histogram.count == len(values)
+    assert histogram.min == values[0]
+    assert histogram.max == values[-1]
+    for quantile in (0.5, 0.99, 0.999):
+        exact = values[int(quantile * len(values)) - 1]
+        assert abs(histogram.percentile(quantile) / exact - 1) < 0.02
+
+def test_histogram_small_values_are_exact_and_merge():
+    """测试小数值精确记录，合并后样本数和最值正确"""
+    first, second = LatencyHistogram(), LatencyHistogram()
+    for value in range(100):
+        first.record(value)
+    second.record(5000)
+    first.merge(second)
+    
+    assert first.percentile(0.5) == 50
+    assert first.count == 101
+    assert first.max == 5000
+    assert first.min == 0
+
+def test_phase_metrics_dump(tmp_path):
+    """测试按阶段导出JSON和Prometheus文本"""
+    metrics = PhaseMetrics()
+    metrics.record("send", 2000)
+    metrics.record("send", 4000)
+    with metrics.time("wait"):
+        pass
+    
+    metrics.dump(str(tmp_path / "metrics.json"))
+    data = json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8"))
+    assert data["send"]["count"] == 2
+    assert data["send"]["max"] == 4e-06
+    
+    metrics.dump(str(tmp_path / "metrics.prom"))
+    text = (tmp_path / "metrics.prom").read_text(encoding="utf-8")
+    assert 'tcp_simulation_phase_seconds_count{phase="send"} 2' in text
+    assert 'tcp_simulation_phase_seconds{phase="wait",quantile="0.99"}' in text
+
+class FakeCapture:
+    """不抓包、总是超时的抓包会话"""
+    
+    is_open = True
+    
+    def open(self):
+        return self
+    
+    def close(self):
+        pass
+    
+    def get(self, timeout=None):
+        return None
+
+def test_tcp_simulation_records_phases(monkeypatch, tmp_path):
+    """测试仿真运行时记录各阶段耗时并写出指标文件"""
+    config = dict(DEFAULT_CONFIG, packet_delay=0, save_pcap=False,
+                  metrics_file=str(tmp_path / "metrics.json"))
+    simulation = core_simulation.TCPSimulation(config)
+    monkeypatch.setattr(simulation.socket, "send", lambda data, dst_ip=None: len(data))
+    simulation.capture = FakeCapture()
+    
+    simulation.run()
+    
+    phases = simulation.get_metrics()
+    assert set(phases) == {"build", "send", "dispatch", "wait", "transition"}
+    assert phases["send"]["count"] == phases["wait"]["count"] > 0
+    assert json.loads((tmp_path / "metrics.json").read_text(encoding="utf-8")) == phases
\ No newline at end of file
@@ -0,0 +1,61 @@
+from tcp_simulation.core.observers import PacketObserver
+from tcp_simulation.core.offline_simulation import OfflineSimulation
+from tcp_simulation.utils.pcap_reader import PcapReader
+
+CONFIG = {
+    'src_ip': '192.168.1.100',
+    'dst_ip': '192.168.1.101',
+    'src_port': 12345,
+    'dst_port': 80,
+    'initial_seq': 1000,
+}
+
+class SentPacketObserver(PacketObserver):
+    """记录发送的数据包"""
+    
+    def __init__(self):
+        self.sent = []
+    
+    def update(self, packet, event_type, **kwargs):
+        if event_type.startswith("SEND_"):
+            self.sent.append(packet)
+
+def test_offline_handshake_and_teardown():
+    """测试离线仿真完成一次完整的握手和挥手"""
+    simulation = OfflineSimulation(CONFIG)
+    observer = SentPacketObserver()
+    simulation.attach(observer)
+    
+    stats = simulation.run()
+    
+    assert stats['completed'] == 1
+    assert stats['active_flows'] == 0
+    assert simulation.server.get_stats()['closed'] == 1
+    
+    flags = [str(packet["TCP"].flags) for packet in observer.sent]
+    assert flags == ["S", "SA", "A", "FA", "A", "FA", "A"]
+    first = observer.sent[0]
+    assert first["TCP"].seq == 1000
+    assert first["TCP"].sport == 12345
+
+def test_offline_many_connections_with_loss():
+    """测试有丢包时大量连接仍能通过重传完成"""
+    config = dict(CONFIG, loss_rate=0.05, latency=0.02, seed=7)
+    simulation = OfflineSimulation(config)
+    
+    stats = simulation.run(connections=1000)
+    
+    assert stats['connections'] == 1000
+    assert stats['packets_dropped'] > 0
+    assert stats['completed'] + stats['failed'] == 1000
+    assert stats['completed'] >= 990
+
+def test_offline_run_writes_pcap(tmp_path):
+    """测试指定pcap文件名时按时间顺序写出所有发送的报文"""
+    filename = str(tmp_path / "offline.pcap")
+    stats = OfflineSimulation(CONFIG).run(connections=5, interval=0.01, pcap_filename=filename)
+    
+    with PcapReader(filename) as reader:
+        timestamps = [timestamp for timestamp, _ in reader]
+    assert len(timestamps) == stats['packets_sent']
+    assert timestamps == sorted(timestamps)
\ No newline at end of file
@@ -3,13 +3,14 @@ from tcp_simulation.core.packet_factory import PacketFactory
 
 def test_create_syn_packet():
     """测试创建SYN数据包"""
-    factory = PacketFactory()
-    packet = factory.create_syn_packet(
+    packet = PacketFactory.create_tcp_packet(
         src_ip="192.168.1.100",
         dst_ip="192.168.1.101",
         src_port=12345,
         dst_port=80,
-        seq=1000
+        flags="S",
+        seq=1000,
+        ack=0
     )
     
     assert packet["IP"].src == "192.168.1.100"
@@ -21,12 +22,12 @@ def test_create_syn_packet():
 
 def test_create_ack_packet():
     """测试创建ACK数据包"""
-    factory = PacketFactory()
-    packet = factory.create_ack_packet(
+    packet = PacketFactory.create_tcp_packet(
         src_ip="192.168.1.100",
         dst_ip="192.168.1.101",
         src_port=12345,
         dst_port=80,
+        flags="A",
         seq=1000,
         ack=2000
     )
@@ -37,4 +38,120 @@ def test_create_ack_packet():
     assert packet["TCP"].dport == 80
     assert packet["TCP"].seq == 1000
     assert packet["TCP"].ack == 2000
-    assert packet["TCP"].flags == "A" 
\ No newline at end of file
+    assert packet["TCP"].flags == "A" 
+
+def test_create_tcp_bytes_matches_scapy():
+    """测试模板生成的字节与Scapy构造结果一致"""
+    cases = [
+        ("S", 12345, 80, 1000, 0),
+        ("SA", 80, 12345, 0xFFFFFFFF, 1001),
+        ("A", 1, 65535, 0, 0xFFFFFFFF),
+        ("FA", 40000, 443, 123456789, 987654321),
+    ]
+    for flags, sport, dport, seq, ack in cases:
+        expected = bytes(PacketFactory.create_tcp_packet(
+            "192.168.1.100", "192.168.1.101", sport, dport, flags, seq, ack
+        ))
+        actual = PacketFactory.create_tcp_bytes(
+            "192.168.1.100", "192.168.1.101", sport, dport, flags, seq, ack
+        )
+        assert actual == expected
+    
+    # 非默认的通告窗口
+    for payload in (None, b"abc"):
+        expected = bytes(PacketFactory.create_tcp_packet(
+            "192.168.1.100", "192.168.1.101", 12345, 80, "PA", 1000, 2000, payload=payload, window=65535
+        ))
+        assert PacketFactory.create_tcp_bytes(
+            "192.168.1.100", "192.168.1.101", 12345, 80, "PA", 1000, 2000, payload=payload, window=65535
+        ) == expected
+    assert PacketFactory.create_tcp_header(
+        "192.168.1.100", "192.168.1.101", 12345, 80, "PA", 1000, 2000, b"abc", window=65535
+    ) + b"abc" == expected
+
+@pytest.mark.parametrize("length", [1, 2, 1459, 1460])
+def test_create_tcp_bytes_with_memoryview_payload(length):
+    """测试memoryview负载的序列化结果与Scapy一致，头部可单独生成"""
+    data = bytes(range(256)) * 6
+    payload = memoryview(data)[3:3 + length]
+    expected = bytes(PacketFactory.create_tcp_packet(
+        "192.168.1.100", "192.168.1.101", 12345, 80, "PA", 0xFFFFFF00, 1001,
+        payload=bytes(payload)
+    ))
+    
+    actual = PacketFactory.create_tcp_bytes(
+        "192.168.1.100", "192.168.1.101", 12345, 80, "PA", 0xFFFFFF00, 1001, payload=payload
+    )
+    header = PacketFactory.create_tcp_header(
+        "192.168.1.100", "192.168.1.101", 12345, 80, "PA", 0xFFFFFF00, 1001, payload
+    )
+    
+    assert actual == expected
+    assert header + payload == expected
+
+@pytest.mark.parametrize("payload", ["é", "你好，世界"])
+def test_create_tcp_bytes_with_non_ascii_str_payload(payload):
+    """测试非ASCII字符串负载与Scapy一样按UTF-8编码，头部和完整报文都一致"""
+    expected = bytes(PacketFactory.create_tcp_packet(
+        "192.168.1.100", "192.168.1.101", 12345, 80, "PA", 1000, 2000, payload=payload
+    ))
+    
+    actual = PacketFactory.create_tcp_bytes(
+        "192.168.1.100", "192.168.1.101", 12345, 80, "PA", 1000, 2000, payload=payload
+    )
+    header = PacketFactory.create_tcp_header(
+        "192.168.1.100", "192.168.1.101", 12345, 80, "PA", 1000, 2000, payload
+    )
+    
+    assert actual == expected
+    assert header + payload.encode("utf-8") == expected
+
+def test_template_mode_packet():
+    """测试模板模式下create_tcp_packet返回等价的数据包，修改返回的数据包不影响缓存"""
+    PacketFactory.template_mode = True
+    try:
+        packet = PacketFactory.create_tcp_packet(
+            "192.168.1.100", "192.168.1.101", 12345, 80, "S", 1000, 0
+        )
+        packet["TCP"].window = 1
+        other = PacketFactory.create_tcp_packet(
+            "192.168.1.100", "192.168.1.101", 40000, 443, "S", 2000, 0
+        )
+    finally:
+        PacketFactory.template_mode = False
+    
+    assert packet["TCP"].seq == 1000
+    assert packet["TCP"].flags == "S"
+    # 是构造出来的数据包而不是由字节解析得到的
+    assert not packet.original
+    assert bytes(other) == bytes(PacketFactory.create_tcp_packet(
+        "192.168.1.100", "192.168.1.101", 40000, 443, "S", 2000, 0
+    ))
+
+def test_create_tcp_batch(tmp_path):
+    """测试批量构造的头部矩阵与逐包构造一致"""
+    np = pytest.importorskip("numpy")
+    src_ips = ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+    ports = np.array([1000, 2000, 3000])
+    seqs = np.array([0, 123456789, 0xFFFFFFFF], dtype=np.uint64)
+    
+    batch = PacketFactory.create_tcp_batch(
+        src_ips, "192.168.1.101", ports, 80, seqs, 0, "S"
+    )
+    
+    assert batch.shape == (3, 40)
+    assert batch.dtype == np.uint8
+    for i, src_ip in enumerate(src_ips):
+        expected = PacketFactory.create_tcp_bytes(
+            src_ip, "192.168.1.101", int(ports[i]), 80, "S", int(seqs[i]), 0
+        )
+        assert batch[i].tobytes() == expected
+    
+    # 批量结果可以直接写成pcap并被Scapy读取
+    from scapy.all import rdpcap
+    from tcp_simulation.utils.pcap import write_pcap
+    filename = str(tmp_path / "batch.pcap")
+    write_pcap(filename, batch, timestamps=[1.0, 2.0, 3.0])
+    packets = rdpcap(filename)
+    assert len(packets) == 3
+    assert bytes(packets[1]) == batch[1].tobytes()
\ No newline at end of file
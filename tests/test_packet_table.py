@@ -0,0 +1,60 @@
+import pytest
+from tcp_simulation.core.observers import PacketAnalyzerObserver
+from tcp_simulation.core.offline_simulation import OfflineSimulation
+from tcp_simulation.utils.packet_table import PacketTable, ip_to_int
+
+np = pytest.importorskip("numpy")
+
+def test_packet_table_queries():
+    """测试列式报文表的追加、过滤、聚合和导出"""
+    table = PacketTable()
+    client, server = ip_to_int("10.0.0.1"), ip_to_int("10.0.0.2")
+    table.append(0.0, client, server, 1234, 80, 100, 0, 0x02, event="SEND")
+    table.append(0.1, server, client, 80, 1234, 500, 101, 0x12, event="RECEIVE")
+    table.append(0.2, client, server, 1234, 80, 101, 501, 0x10, event="SEND")
+    table.append(0.3, client, server, 1234, 80, 101, 501, 0x18, payload_len=5, event="SEND")
+    
+    assert len(table) == 4
+    assert table.row(1)["src_ip"] == "10.0.0.2"
+    assert table.row(1)["event"] == "RECEIVE"
+    assert table.count(flags=0x10) == 3
+    assert table.count(src_ip="10.0.0.1", start=0.1) == 2
+    assert table.count(event="UNKNOWN") == 0
+    assert list(table.select(dport=80)["seq"]) == [100, 101, 101]
+    assert table.count_by("event") == {"SEND": 3, "RECEIVE": 1}
+    assert table.count_by("src_ip", flags=0x02) == {"10.0.0.1": 1, "10.0.0.2": 1}
+    
+    records = table.to_structured()
+    assert records.dtype["src_ip"] == np.uint32
+    assert records.dtype["flags"] == np.uint8
+    assert int(records[3]["payload_len"]) == 5
+    
+    # 导出的数组不影响继续追加
+    columns = table.to_numpy()
+    table.extend({"timestamp": columns["timestamp"], "src_ip": columns["src_ip"],
+                  "dst_ip": columns["dst_ip"], "sport": columns["sport"],
+                  "dport": columns["dport"], "seq": columns["seq"], "ack": columns["ack"],
+                  "flags": columns["flags"]}, event="REPLAY")
+    assert len(table) == 8
+    assert table.count(event="REPLAY", flags=0x02) == 2
+
+def test_analyzer_observer_table():
+    """测试数据包分析观察者把离线仿真的报文写入列式表"""
+    simulation = OfflineSimulation({
+        'src_ip': '192.168.1.100', 'dst_ip': '192.168.1.101',
+        'src_port': 12345, 'dst_port': 80, 'initial_seq': 1000,
+    })
+    observer = PacketAnalyzerObserver()
+    simulation.attach(observer)
+    simulation.run()
+    
+    table = observer.table
+    assert len(table) == 14
+    assert table.count(flags=0x01, src_ip='192.168.1.100') == 2
+    results = observer.get_analysis_results()
+    assert results[0]['seq'] == 1000
+    assert results[0]['event_type'].startswith("SEND_")    
+    with pytest.deprecated_call():
+        assert observer.analysis_results == results
+    with pytest.raises(AttributeError):
+        observer.analysis_results = []
\ No newline at end of file
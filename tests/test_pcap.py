@@ -0,0 +1,104 @@
+import pytest
+from scapy.all import IP, TCP, rdpcap
+from tcp_simulation.core.observers import PcapSinkObserver
+from tcp_simulation.core.offline_simulation import OfflineSimulation
+from tcp_simulation.utils.pcap import PcapWriter
+
+def _packet(seq):
+    return bytes(IP(src="10.0.0.1", dst="10.0.0.2")/TCP(sport=1234, dport=80, seq=seq))
+
+def test_pcap_writer_formats(tmp_path):
+    """测试pcap和pcapng两种格式都能被Scapy读回"""
+    for fmt in ("pcap", "pcapng"):
+        filename = str(tmp_path / f"out.{fmt}")
+        with PcapWriter(filename, format=fmt) as writer:
+            for i in range(3):
+                writer.write(_packet(i), 1000.0 + i * 0.25)
+        
+        packets = rdpcap(filename)
+        assert [p[TCP].seq for p in packets] == [0, 1, 2]
+        assert float(packets[2].time) == 1000.5
+
+def test_pcap_writer_rotation(tmp_path):
+    """测试按大小和按时长滚动文件"""
+    filename = str(tmp_path / "size.pcap")
+    with PcapWriter(filename, max_bytes=200) as writer:
+        for i in range(10):
+            writer.write(_packet(i), 1000.0)
+    # 全局头24字节 + 每条记录16+40字节，每个文件写满4条后滚动
+    assert len(writer.files) == 3
+    assert writer.files[1] == str(tmp_path / "size.1.pcap")
+    assert sum(len(rdpcap(name)) for name in writer.files) == 10
+    
+    filename = str(tmp_path / "time.pcapng")
+    with PcapWriter(filename, format="pcapng", max_seconds=1.0) as writer:
+        for i in range(10):
+            writer.write(_packet(i), 1000.0 + i * 0.5)
+    assert [len(rdpcap(name)) for name in writer.files] == [2, 2, 2, 2, 2]
+
+def test_pcap_sink_observer(tmp_path):
+    """测试流式抓包观察者记录离线仿真的报文和虚拟时间"""
+    filename = str(tmp_path / "offline.pcap")
+    simulation = OfflineSimulation({
+        'src_ip': '192.168.1.100', 'dst_ip': '192.168.1.101',
+        'src_port': 12345, 'dst_port': 80, 'initial_seq': 1000,
+    })
+    observer = PcapSinkObserver(filename)
+    simulation.attach(observer)
+    simulation.run()
+    observer.close()
+    
+    packets = rdpcap(filename)
+    assert len(packets) == 14
+    assert str(packets[0][TCP].flags) == "S"
+    assert float(packets[-1].time) <= simulation.scheduler.now
+
+def test_pcap_reader_columns(tmp_path):
+    """测试内存映射读取器解码的列与Scapy解析结果一致"""
+    pytest.importorskip("numpy")
+    from scapy.all import Ether, Raw, wrpcap
+    from tcp_simulation.utils.packet_analyzer import PacketAnalyzer
+    from tcp_simulation.utils.pcap_reader import PcapReader, read_tcp_columns
+    
+    packets = [
+        Ether()/IP(src="10.0.0.1", dst="10.0.0.2")/TCP(sport=1234, dport=80, flags="S", seq=7),
+        Ether()/IP(src="10.0.0.2", dst="10.0.0.1")/TCP(sport=80, dport=1234, flags="SA",
+                                                        seq=4000000000, ack=8),
+        Ether()/IP(src="10.0.0.1", dst="10.0.0.2")/TCP(sport=1234, dport=80, flags="PA",
+                                                        options=[("MSS", 1460)])/Raw(b"hello"),
+        Ether()/IP(src="10.0.0.1", dst="10.0.0.2")/IP(proto=17),
+    ]
+    for i, packet in enumerate(packets):
+        packet.time = 100.0 + i * 0.5
+    filename = str(tmp_path / "ether.pcap")
+    wrpcap(filename, packets)
+    
+    columns = read_tcp_columns(filename)
+    assert list(columns["index"]) == [0, 1, 2]
+    assert list(columns["timestamp"]) == [100.0, 100.5, 101.0]
+    assert list(columns["src_ip"]) == [0x0A000001, 0x0A000002, 0x0A000001]
+    assert list(columns["sport"]) == [1234, 80, 1234]
+    assert list(columns["seq"]) == [7, 4000000000, 0]
+    assert list(columns["ack"]) == [0, 8, 0]
+    assert list(columns["flags"]) == [0x02, 0x12, 0x18]
+    assert list(columns["payload_len"]) == [0, 0, 5]
+    
+    with PcapReader(filename) as reader:
+        assert len(reader) == 4
+        records = [(ts, bytes(data)) for ts, data in reader]
+    assert records[0] == (100.0, bytes(packets[0]))
+    
+    # 等长记录走按步长建立索引的路径
+    filename = str(tmp_path / "raw.pcap")
+    with PcapWriter(filename) as writer:
+        for i in range(5):
+            writer.write(_packet(i), 200.0 + i)
+    columns = read_tcp_columns(filename)
+    assert list(columns["seq"]) == [0, 1, 2, 3, 4]
+    assert list(columns["timestamp"]) == [200.0, 201.0, 202.0, 203.0, 204.0]
+    
+    summary = PacketAnalyzer.analyze_pcap(str(tmp_path / "ether.pcap"))
+    assert summary['packets'] == 3
+    assert summary['connections'] == 1
+    assert summary['flags']['SYN'] == 2
+    assert summary['duration'] == 1.0
\ No newline at end of file
@@ -0,0 +1,55 @@
+import socket
+
+from tcp_simulation.core.packet_factory import PacketFactory
+from tcp_simulation.core.raw_socket import RawSocket
+
+class _UdpRawSocket(RawSocket):
+    """把报文作为UDP负载发往本机套接字，测试时不需要root权限"""
+    
+    def __init__(self, sink):
+        super().__init__()
+        self.sink = sink
+        self.opened = 0
+    
+    def _open_socket(self):
+        self.opened += 1
+        return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    
+    def _address(self, dst_ip):
+        assert dst_ip == "192.168.1.101"
+        return self.sink.getsockname()
+
+def test_raw_socket_reuses_one_socket():
+    """测试多次发送复用同一个套接字，IP报文、字节和分段缓冲区发出的内容一致"""
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    sink.settimeout(1.0)
+    packet = PacketFactory.create_tcp_packet("192.168.1.100", "192.168.1.101", 12345, 80,
+                                             "PA", 1000, 2000, payload=b"hello")
+    data = bytes(packet)
+    
+    with sink, _UdpRawSocket(sink) as raw:
+        raw.send(packet)
+        raw.send(data)
+        raw.send((data[:40], memoryview(data)[40:]))
+        
+        assert [sink.recv(100) for _ in range(3)] == [data] * 3
+        assert raw.opened == 1
+        assert raw.sent == 3 and raw.bytes_sent == 3 * len(data)
+    
+    assert not raw.is_open
+
+def test_raw_socket_reopens_after_close():
+    """测试关闭后再次发送时重新打开套接字"""
+    sink = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sink.bind(("127.0.0.1", 0))
+    data = PacketFactory.create_tcp_bytes("192.168.1.100", "192.168.1.101", 12345, 80, "S", 1, 0)
+    raw = _UdpRawSocket(sink)
+    
+    with sink:
+        raw.send(data)
+        raw.close()
+        raw.send(data)
+        raw.close()
+    
+    assert raw.opened == 2
\ No newline at end of file
@@ -0,0 +1,133 @@
+from tcp_simulation.core.engine import EventScheduler
+from tcp_simulation.core.offline_simulation import OfflineSimulation
+from tcp_simulation.core.responder import IsnGenerator, ListenQueue, RawResponder, Responder, SynCookies
+from tcp_simulation.core.segment import Segment, SYN, ACK
+from tcp_simulation.core.tcp_state import ESTABLISHED
+
+CONFIG = {
+    'src_ip': '192.168.1.100',
+    'dst_ip': '192.168.1.101',
+    'src_port': 40000,
+    'dst_port': 80,
+    'initial_seq': 1000,
+    'latency': 0.01,
+    'seed': 3,
+}
+
+KEY = ('192.168.1.101', 80, '192.168.1.100', 40000)
+
+def test_syn_cookie_roundtrip():
+    """测试cookie可以还原MSS，篡改或过期的cookie被拒绝"""
+    cookies = SynCookies(b"k" * 16)
+    cookie = cookies.make(KEY, 1000, 1460, now=100.0)
+    
+    assert cookies.check(KEY, 1000, cookie, now=100.0) == 1460
+    assert cookies.check(KEY, 1000, cookie, now=100.0 + SynCookies.PERIOD) == 1460
+    assert cookies.check(KEY, 1000, cookie + 1, now=100.0) is None
+    assert cookies.check(KEY, 1000 + 0x10000, cookie, now=100.0) is None
+    assert cookies.check(('10.0.0.1',) + KEY[1:], 1000, cookie, now=100.0) is None
+    assert cookies.check(KEY, 1000, cookie, now=100.0 + 4 * SynCookies.PERIOD) is None
+    assert cookies.check(KEY, 1000, cookies.make(KEY, 1000, 1000, now=0.0), now=0.0) == 536
+
+def test_isn_depends_on_four_tuple_and_clock():
+    """测试不同四元组的ISN不同，同一四元组的ISN随时间递增"""
+    isn = IsnGenerator(b"s" * 16)
+    other = KEY[:3] + (40001,)
+    
+    assert isn(KEY, 1.0) != isn(other, 1.0)
+    assert (isn(KEY, 2.0) - isn(KEY, 1.0)) % (1 << 32) == 250000
+
+def test_listen_queue_limits():
+    """测试SYN队列满时丢弃SYN，重复的SYN返回同一个半连接"""
+    queue = ListenQueue(backlog=4, syn_backlog=2, secret=b"s" * 16)
+    keys = [KEY[:3] + (port,) for port in range(40000, 40003)]
+    
+    first = queue.on_syn(keys[0], 1000, 0.0)
+    assert queue.on_syn(keys[0], 1000, 0.0) is first
+    assert queue.on_syn(keys[1], 2000, 0.0) is not None
+    assert queue.on_syn(keys[2], 3000, 0.0) is None
+    assert queue.syn_dropped == 1
+    
+    # ACK号不对时半连接保持不变
+    assert queue.on_ack(keys[0], 1001, first.isn, 0.1) is None
+    assert queue.on_ack(keys[0], 1001, first.isn + 1, 0.1) is first
+    assert len(queue.syn_queue) == 1
+
+def test_responder_establishes_on_final_ack():
+    """测试第三次握手的ACK到达后才创建处于ESTABLISHED的连接"""
+    responder = Responder(EventScheduler(), KEY[0], secret=b"s" * 16)
+    responder.listen(80)
+    sent = []
+    accepted = []
+    responder.on_send = lambda endpoint, segment: sent.append((endpoint, segment))
+    responder.on_accept = accepted.append
+    
+    responder.receive(Segment(KEY[2], KEY[0], KEY[3], 80, SYN, 1000, 0))
+    assert len(responder.flows) == 0
+    endpoint, synack = sent[0]
+    assert endpoint is None and synack.flags == SYN | ACK and synack.ack == 1001
+    
+    responder.receive(Segment(KEY[2], KEY[0], KEY[3], 80, ACK, 1001, synack.seq + 1))
+    assert len(accepted) == 1
+    assert accepted[0].state is ESTABLISHED
+    assert accepted[0].snd_nxt == synack.seq + 1
+
+def test_offline_simulation_with_responder():
+    """测试服务端使用监听队列时所有连接正常完成"""
+    simulation = OfflineSimulation(dict(CONFIG, listen_backlog=128))
+    
+    stats = simulation.run(connections=50, interval=0.001)
+    
+    assert stats['completed'] == 50
+    assert stats['listener']['established'] == 50
+    assert stats['listener']['syn_queue'] == 0
+
+def test_syn_cookies_complete_handshakes_when_syn_queue_is_full():
+    """测试SYN队列很小时SYN cookie仍能让握手完成"""
+    config = dict(CONFIG, listen_backlog=128, syn_backlog=2)
+    without = OfflineSimulation(dict(config, max_retries=0)).run(connections=50, interval=0.0001)
+    with_cookies = OfflineSimulation(dict(config, syn_cookies=True)).run(connections=50, interval=0.0001)
+    
+    assert without['listener']['syn_dropped'] > 0
+    assert without['failed'] > 0
+    assert with_cookies['completed'] == 50
+    assert with_cookies['listener']['cookies_accepted'] > 0
+
+def test_slow_accept_saturates_listen_queue():
+    """测试应用accept过慢时accept队列填满，新的SYN被丢弃"""
+    config = dict(CONFIG, listen_backlog=4, syn_backlog=8, accept_rate=10.0, hold_time=1.0)
+    
+    stats = OfflineSimulation(config).run(connections=100, interval=0.001)
+    
+    listener = stats['listener']
+    assert listener['max_accept_queue'] == 4
+    assert listener['listen_overflows'] > 0
+    assert stats['failed'] > 0
+
+def test_raw_responder_retransmits_only_expired_half_open():
+    """测试原始套接字监听方只处理到期的半连接：已完成握手的不重传，超限后移出SYN队列"""
+    responder = RawResponder('192.168.1.101', 80, synack_retries=1, synack_timeout=1.0)
+    sent = []
+    responder._transmit = lambda key, flags, seq, ack: sent.append((key[3], flags))
+    synacks = {}
+    for port in range(40000, 40100):
+        responder.handle(Segment('192.168.1.100', '192.168.1.101', port, 80, SYN, port, 0), 0.0)
+        synacks[port] = responder.queue.syn_queue[('192.168.1.101', 80, '192.168.1.100', port)]
+    # 重复的SYN不重复设置定时器
+    responder.handle(Segment('192.168.1.100', '192.168.1.101', 40000, 80, SYN, 40000, 0), 0.0)
+    for port in range(40001, 40100):
+        entry = synacks[port]
+        responder.handle(Segment('192.168.1.100', '192.168.1.101', port, 80, ACK,
+                                 entry.rcv_nxt, entry.isn + 1), 0.1)
+    sent.clear()
+    
+    assert responder._retransmit(0.5) == 0.5
+    assert sent == [] and len(responder._timers) == 100
+    
+    assert responder._retransmit(1.0) == 1.0
+    assert sent == [(40000, "SA")]
+    assert [timer[2].key[3] for timer in responder._timers] == [40000]
+    
+    assert responder._retransmit(3.0) == 1.0
+    assert responder.queue.synack_timeouts == 1 and not responder.queue.syn_queue
+    assert not responder._timers
\ No newline at end of file
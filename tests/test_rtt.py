@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from config import DEFAULT_CONFIG
+from tcp_simulation.core import tcp_simulation as core_simulation
+from tcp_simulation.core.capture import CaptureSession
+from tcp_simulation.core.offline_simulation import OfflineSimulation
+from tcp_simulation.core.rtt import RTTEstimator
+
+def test_rtt_estimator_follows_rfc6298():
+    """测试SRTT/RTTVAR/RTO按RFC 6298更新"""
+    rtt = RTTEstimator(initial_rto=1.0, min_rto=0.0, granularity=0.001)
+    assert rtt.rto == 1.0
+    
+    assert rtt.sample(0.1) == pytest.approx(0.1 + 4 * 0.05)
+    assert rtt.srtt == 0.1
+    assert rtt.rttvar == 0.05
+    
+    rtt.sample(0.2)
+    assert rtt.rttvar == pytest.approx(0.75 * 0.05 + 0.25 * 0.1)
+    assert rtt.srtt == pytest.approx(0.875 * 0.1 + 0.125 * 0.2)
+    assert rtt.rto == pytest.approx(rtt.srtt + 4 * rtt.rttvar)
+
+def test_rtt_estimator_bounds_and_backoff():
+    """测试RTO的上下限和指数退避"""
+    rtt = RTTEstimator(initial_rto=1.0, min_rto=0.2, max_rto=3.0)
+    assert rtt.sample(0.001) == 0.2
+    assert rtt.backoff() == 0.4
+    assert rtt.backoff() == 0.8
+    rtt.backoff()
+    assert rtt.backoff() == 3.0
+    
+    # 新的样本撤销退避
+    assert rtt.sample(0.001) == pytest.approx(0.2)
+
+def test_offline_endpoint_adapts_rto():
+    """测试离线仿真中端点按测得的RTT调整重传超时"""
+    config = dict(DEFAULT_CONFIG, latency=0.01, rto=3.0, rto_min=0.05)
+    simulation = OfflineSimulation(config)
+    endpoint = simulation.client.connect(simulation.dst_ip, simulation.dst_port)
+    simulation.scheduler.run(until=0.5)
+    
+    assert endpoint.rtt.srtt == pytest.approx(0.02)
+    assert endpoint.rtt.rto < 3.0
+
+class SilentCapture:
+    """不抓包、总是超时的抓包会话，记录每次等待的超时"""
+    
+    is_open = True
+    
+    def __init__(self):
+        self.timeouts = []
+    
+    def open(self):
+        return self
+    
+    def close(self):
+        pass
+    
+    def get(self, timeout=None):
+        self.timeouts.append(timeout)
+        return None
+
+def test_live_retransmits_syn_with_backoff(monkeypatch):
+    """测试实时模式下SYN未收到应答时按指数退避重传"""
+    sent = []
+    config = dict(DEFAULT_CONFIG, save_pcap=False, rto=0.5, reply_retries=2)
+    simulation = core_simulation.TCPSimulation(config)
+    monkeypatch.setattr(simulation.socket, "send", lambda data, dst_ip=None: sent.append(data))
+    capture = simulation.capture = SilentCapture()
+    
+    simulation.send_and_capture(simulation.create_syn_packet(), "SYN")
+    
+    assert len(sent) == 3
+    assert capture.timeouts == [0.5, 1.0, 2.0]
+    
+    # 纯ACK不等待应答也不重传
+    simulation.send_and_capture(simulation.create_ack_packet(), "ACK")
+    assert len(sent) == 4
+    assert capture.timeouts[-1] == 0
+
+def test_live_ack_step_does_not_wait(monkeypatch):
+    """测试实时模式下纯ACK步骤不按RTO阻塞"""
+    config = dict(DEFAULT_CONFIG, save_pcap=False, rto=1.0, rto_min=1.0, packet_delay=0)
+    simulation = core_simulation.TCPSimulation(config)
+    monkeypatch.setattr(simulation.socket, "send", lambda data, dst_ip=None: None)
+    # 已打开但收不到任何报文的真实抓包会话
+    capture = simulation.capture = CaptureSession()
+    monkeypatch.setattr(CaptureSession, "is_open", True)
+    
+    start = time.perf_counter()
+    simulation.send_and_capture(simulation.create_ack_packet(), "ACK")
+    
+    assert time.perf_counter() - start < 0.1
+    assert len(capture) == 0
\ No newline at end of file
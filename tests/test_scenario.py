@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+
+from tcp_simulation.core.scenario import (
+    OP_SEND, compile_scenario, load_scenarios, run_scenarios
+)
+from tcp_simulation.utils.error_handler import ConfigurationError
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "scenarios", "basic.json")
+
+HANDSHAKE = [
+    {"send": "S"},
+    {"expect": "SA", "seq": 0, "ack": 1},
+    {"send": "A"},
+]
+
+def test_example_scenarios_pass():
+    """测试仓库自带的场景全部通过"""
+    results = run_scenarios([EXAMPLES])
+    
+    assert results
+    assert all(result.passed for result in results), [result.error for result in results]
+
+def test_compiled_sequence_numbers():
+    """测试编译时按初始序列号算出绝对序列号和确认号"""
+    scenario = compile_scenario({
+        "client": {"isn": 0xFFFFFFFF},
+        "server": {"isn": 5000},
+        "steps": HANDSHAKE + [{"send": "PA", "data": "hello"}, {"send": "FA"}],
+    })
+    
+    segments = [action[1] for action in scenario.actions if action[0] == OP_SEND]
+    assert [(segment.seq, segment.ack) for segment in segments] == [
+        (0xFFFFFFFF, 0), (0, 5001), (0, 5001), (5, 5001)
+    ]
+    assert bytes(segments[2].payload) == b"hello"
+
+def test_unexpected_reply_fails_with_step():
+    """测试收到的报文与期望不符时报告出错的步骤"""
+    scenario = compile_scenario({
+        "server": {"isn": 5000},
+        "steps": [{"send": "S"}, {"expect": "SA", "ack": 2}],
+    })
+    
+    result = scenario.run()
+    
+    assert not result.passed
+    assert result.step == 2
+    assert "ack=" in result.error
+
+def test_quiet_and_timeout():
+    """测试静默期收到报文和等待超时都判为失败"""
+    noisy = compile_scenario({"steps": [{"send": "S"}, {"quiet": 0.5}]}).run()
+    assert not noisy.passed and noisy.step == 2
+    
+    silent = compile_scenario({
+        "steps": HANDSHAKE + [{"expect": "A", "timeout": 0.5}],
+    }).run()
+    assert not silent.passed
+    assert silent.virtual_time == pytest.approx(0.502)
+
+def test_delay_past_max_time_fails_at_delay_step():
+    """测试等待超过最长运行时间时判为失败，并报告等待所在的步骤"""
+    result = compile_scenario({
+        "max_time": 10,
+        "steps": [{"send": "S"}, {"expect": "SA"}, {"delay": 500}],
+    }).run()
+    
+    assert not result.passed
+    assert result.step == 3
+    assert "最长运行时间" in result.error
+
+def test_random_loss_is_reproducible():
+    """测试随机丢包按种子复现"""
+    scenario = compile_scenario({
+        "link": {"loss_rate": 0.5},
+        "steps": HANDSHAKE,
+    })
+    
+    results = [scenario.run(seed=seed).passed for seed in range(20)]
+    
+    assert results == [scenario.run(seed=seed).passed for seed in range(20)]
+    assert True in results and False in results
+
+@pytest.mark.parametrize("spec", [
+    {"steps": []},
+    {"steps": [{"send": "SX"}]},
+    {"steps": [{"send": "S", "bogus": 1}]},
+    {"steps": [{"wait": 1}]},
+    {"steps": [{"delay": -1}]},
+    {"steps": [{"send": "S", "seq": "a"}]},
+    {"steps": [{"send": "S", "ack": 1.5}]},
+    {"steps": [{"send": "S", "window": None}]},
+    {"steps": [{"send": "S", "len": -1}]},
+    {"steps": [{"send": "S", "extra_delay": "0.1"}]},
+    {"steps": [{"send": "S"}, {"expect": "SA", "len": "x"}]},
+    {"steps": [{"send": "S"}, {"expect": "SA", "timeout": True}]},
+])
+def test_invalid_scenarios(spec):
+    """测试无效的场景描述"""
+    with pytest.raises(ConfigurationError):
+        compile_scenario(spec)
+
+def test_load_yaml_and_json_lists(tmp_path):
+    """测试读取YAML和JSON场景文件，未命名的场景按文件名编号"""
+    yaml = pytest.importorskip("yaml")
+    yaml_file = tmp_path / "handshake.yaml"
+    yaml_file.write_text(yaml.safe_dump({"steps": HANDSHAKE}))
+    json_file = tmp_path / "list.json"
+    json_file.write_text(json.dumps([{"name": "a", "steps": HANDSHAKE}, {"steps": HANDSHAKE}]))
+    
+    assert load_scenarios(str(yaml_file))[0]["name"] == "handshake.yaml#1"
+    results = run_scenarios([str(yaml_file), str(json_file)])
+    assert [result.name for result in results] == ["handshake.yaml#1", "a", "list.json#2"]
+    assert all(result.passed for result in results)
\ No newline at end of file
@@ -0,0 +1,102 @@
+from multiprocessing import shared_memory
+
+from tcp_simulation.core.offline_simulation import OfflineSimulation
+import pytest
+
+from tcp_simulation.core.sharded_simulation import (ShardedSimulation, _CaptureBuffer, _iter_shard, shard_configs,
+                                                      shard_of)
+from tcp_simulation.utils.headers import parse_tcp_header
+from tcp_simulation.utils.pcap_reader import PcapReader
+
+CONFIG = {
+    'src_ip': '192.168.1.100',
+    'dst_ip': '192.168.1.101',
+    'src_port': 12345,
+    'dst_port': 80,
+    'initial_seq': 1000,
+}
+
+def test_shard_assignment_is_stable():
+    """测试四元组到分片的映射稳定且覆盖所有分片"""
+    shards = {shard_of('10.0.0.1', port, '10.0.0.2', 80, 4) for port in range(1000, 1100)}
+    assert shards == {0, 1, 2, 3}
+    assert shard_of('10.0.0.1', 1000, '10.0.0.2', 80, 4) == shard_of('10.0.0.1', 1000, '10.0.0.2', 80, 4)
+
+def test_sharded_simulation_merges_stats_and_pcap(tmp_path):
+    """测试多进程分片仿真合并统计信息，并按时间顺序写出所有报文"""
+    filename = str(tmp_path / "sharded.pcap")
+    stats = ShardedSimulation(CONFIG, workers=2).run(connections=20, interval=0.01,
+                                                      pcap_filename=filename)
+    single = OfflineSimulation(CONFIG).run(connections=20, interval=0.01)
+    
+    assert len(stats['shards']) == 2
+    assert stats['connections'] == 20
+    assert stats['completed'] == single['completed'] == 20
+    assert stats['packets_sent'] == single['packets_sent']
+    assert stats['flags']['SYN'] == 40
+    assert stats['packets_captured'] == stats['packets_sent']
+    
+    with PcapReader(filename) as reader:
+        timestamps = [timestamp for timestamp, _ in reader]
+    assert len(timestamps) == stats['packets_captured']
+    assert timestamps == sorted(timestamps)
+
+def test_sharded_simulation_uses_configured_isn_once(tmp_path):
+    """测试只有第0条连接使用配置的初始序列号，各分片其余连接的序列号互不相同"""
+    filename = str(tmp_path / "isn.pcap")
+    ShardedSimulation(dict(CONFIG, seed=1), workers=4).run(connections=40, pcap_filename=filename)
+    
+    isns = []
+    with PcapReader(filename) as reader:
+        for _, data in reader:
+            header = parse_tcp_header(data)
+            if header.flag_names == ["SYN"]:
+                isns.append(header.seq)
+            del header, data
+    assert len(isns) == 40
+    assert isns.count(CONFIG['initial_seq']) == 1
+    assert len(set(isns)) == 40
+
+def test_capture_buffer_grows_in_shared_memory():
+    """测试报文直接写入共享内存，空间不够时扩容且保留已写入的报文"""
+    buffer = _CaptureBuffer(size=64)
+    packets = [bytes([i]) * (20 + i) for i in range(50)]
+    for i, packet in enumerate(packets):
+        buffer.append(i * 0.5, packet[:20], memoryview(packet)[20:])
+    
+    assert buffer.shm.size > 64
+    name, size = buffer.detach()
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        records = [(timestamp, bytes(data)) for timestamp, data in _iter_shard(shm, size)]
+    finally:
+        shm.close()
+        shm.unlink()
+    assert records == [(i * 0.5, packet) for i, packet in enumerate(packets)]
+
+def test_shard_configs_split_shared_capacity():
+    """测试链路带宽、accept速率和监听队列按连接数比例分给各分片，总和等于配置值"""
+    config = dict(CONFIG, bandwidth=1e6, accept_rate=100, listen_backlog=10, syn_backlog=0)
+    configs = shard_configs(config, [5, 3, 2, 0])
+    
+    assert [c['bandwidth'] for c in configs] == [5e5, 3e5, 2e5, 0]
+    assert sum(c['accept_rate'] for c in configs) == 100
+    assert [c['listen_backlog'] for c in configs] == [5, 3, 2, 0]
+    assert [c['syn_backlog'] for c in configs] == [0, 0, 0, 0]
+    # 未设置syn_backlog时按默认值256分配
+    assert sum(c['syn_backlog'] for c in shard_configs(dict(CONFIG, listen_backlog=7), [4, 4, 3])) == 256
+    assert [c['listen_backlog'] for c in shard_configs(dict(CONFIG, listen_backlog=7), [4, 4, 3])] == [3, 2, 2]
+    assert shard_configs(CONFIG, [1, 1]) == [CONFIG, CONFIG]
+
+@pytest.mark.parametrize("options", [
+    {'bandwidth': 1e6, 'transfer_bytes': 20000},
+    {'listen_backlog': 4, 'accept_rate': 100},
+])
+def test_sharded_capacity_matches_single_process(options):
+    """测试设置了带宽或监听队列时分片运行与单进程运行的结果一致"""
+    config = dict(CONFIG, **options)
+    sharded = ShardedSimulation(config, workers=4).run(connections=40)
+    single = OfflineSimulation(config).run(connections=40)
+    
+    assert sharded['completed'] == single['completed']
+    assert sharded['virtual_time'] == pytest.approx(single['virtual_time'], rel=0.01)
\ No newline at end of file
@@ -1,14 +1,27 @@
 import pytest
+from config import DEFAULT_CONFIG
 from tcp_simulation.core.tcp_simulation import TCPSimulation
 
+CONFIG = dict(DEFAULT_CONFIG, src_ip="192.168.1.100", dst_ip="192.168.1.101", src_port=12345,
+              dst_port=80, save_pcap=False, metrics_file=None, reply_retries=0)
+
+class SilentCapture:
+    """不抓包、立即超时的抓包会话"""
+    
+    is_open = True
+    
+    def open(self):
+        return self
+    
+    def close(self):
+        pass
+    
+    def get(self, timeout=None):
+        return None
+
 def test_tcp_simulation_initialization():
     """测试TCP仿真初始化"""
-    simulation = TCPSimulation(
-        src_ip="192.168.1.100",
-        dst_ip="192.168.1.101",
-        src_port=12345,
-        dst_port=80
-    )
+    simulation = TCPSimulation(CONFIG)
     
     assert simulation.src_ip == "192.168.1.100"
     assert simulation.dst_ip == "192.168.1.101"
@@ -16,17 +29,20 @@ def test_tcp_simulation_initialization():
     assert simulation.dst_port == 80
     assert simulation.current_state.name == "CLOSED"
 
-def test_tcp_simulation_state_transition():
-    """测试TCP状态转换"""
-    simulation = TCPSimulation(
-        src_ip="192.168.1.100",
-        dst_ip="192.168.1.101"
-    )
+def test_tcp_simulation_state_transition(monkeypatch):
+    """测试TCP状态转换：按固定脚本走完握手和挥手，回到CLOSED"""
+    simulation = TCPSimulation(CONFIG)
+    sent = []
+    monkeypatch.setattr(simulation.socket, "send", lambda data, dst_ip=None: sent.append(data))
+    simulation.capture = SilentCapture()
+    states = []
+    monkeypatch.setattr(simulation, "notify",
+                        lambda packet, event_type, **kwargs: states.append(event_type))
     
-    # 测试从CLOSED到LISTEN的转换
-    simulation.handle_packet(None, "SYN")
-    assert simulation.current_state.name == "LISTEN"
+    simulation.run()
     
-    # 测试从LISTEN到SYN_RECEIVED的转换
-    simulation.handle_packet(None, "SYN")
-    assert simulation.current_state.name == "SYN_RECEIVED" 
\ No newline at end of file
+    assert states == ["SEND_ClosedState", "SEND_ListenState", "SEND_SynReceivedState",
+                      "SEND_EstablishedState", "SEND_FinWait1State", "SEND_FinWait2State",
+                      "SEND_TimeWaitState"]
+    assert [int(data[33]) for data in sent] == [0x02, 0x12, 0x10, 0x11, 0x10, 0x11, 0x10]
+    assert simulation.current_state.name == "CLOSED"
\ No newline at end of file
@@ -1,14 +1,43 @@
 import pytest
 from tcp_simulation.core.tcp_state import TCPState, ClosedState, ListenState
 
+class Context:
+    """记录发送报文的连接上下文，create_*_packet 返回报文名称"""
+    
+    def __init__(self):
+        self.sent = []
+    
+    def send(self, packet):
+        self.sent.append(packet)
+    
+    def create_syn_packet(self):
+        return "S"
+    
+    def create_syn_ack_packet(self):
+        return "SA"
+    
+    def create_ack_packet(self):
+        return "A"
+    
+    def create_fin_packet(self):
+        return "FA"
+
 def test_closed_state():
     """测试CLOSED状态"""
     state = ClosedState()
     assert state.name == "CLOSED"
     
     # 测试状态转换
-    next_state = state.handle_packet(None, "SYN")
-    assert isinstance(next_state, ListenState)
+    context = Context()
+    assert state.on_event(context, "OPEN").name == "SYN_SENT"
+    assert context.sent == ["S"]
+    assert isinstance(state.on_event(context, "LISTEN"), ListenState)
+    assert state.on_event(context, "RST") is state
+    assert context.sent == ["S"]
+    
+    # 固定脚本：发送SYN，下一步为LISTEN
+    assert state.handle_packet(context) == "S"
+    assert isinstance(state.get_next_state(), ListenState)
 
 def test_listen_state():
     """测试LISTEN状态"""
@@ -16,8 +45,33 @@ def test_listen_state():
     assert state.name == "LISTEN"
     
     # 测试状态转换
-    next_state = state.handle_packet(None, "SYN")
+    context = Context()
+    next_state = state.on_event(context, "SYN")
     assert next_state.name == "SYN_RECEIVED"
+    assert context.sent == ["SA"]
+    
+    next_state = state.on_event(context, "RST")
+    assert next_state.name == "CLOSED"
+    assert state.on_event(context, "CLOSE").name == "CLOSED"
+    assert context.sent == ["SA"]
+    
+    assert state.handle_packet(context) == "SA"
+    assert state.get_next_state().name == "SYN_RECEIVED"
+
+def test_states_are_singletons():
+    """测试状态对象为无状态单例，事件转换只查表"""
+    from tcp_simulation.core.tcp_state import CLOSED, SYN_SENT, ESTABLISHED, TIME_WAIT
+    
+    assert ClosedState() is ClosedState() is CLOSED
+    assert not hasattr(CLOSED, "__dict__")
+    
+    context = Context()
+    state = CLOSED.on_event(context, "OPEN")
+    assert state is SYN_SENT
+    state = state.on_event(context, "SYN_ACK")
+    assert state is ESTABLISHED
+    assert context.sent == ["S", "A"]
     
-    next_state = state.handle_packet(None, "RST")
-    assert next_state.name == "CLOSED" 
\ No newline at end of file
+    # 未定义的事件保持当前状态
+    assert ESTABLISHED.on_event(context, "TIMEOUT") is ESTABLISHED
+    assert TIME_WAIT.on_event(context, "RST") is CLOSED
\ No newline at end of file
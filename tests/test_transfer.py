@@ -0,0 +1,180 @@
+import pytest
+
+from tcp_simulation.core.congestion import Cubic, Reno, create_congestion_control
+from tcp_simulation.core.offline_simulation import OfflineSimulation
+from tcp_simulation.core.segment import ACK, Segment
+from tcp_simulation.core.transfer import DataReceiver, open_payload
+from tcp_simulation.utils.pcap import PcapWriter
+from scapy.all import IP, TCP, Raw, rdpcap
+from tcp_simulation.utils.error_handler import ConfigurationError
+
+CONFIG = {
+    'src_ip': '192.168.1.100',
+    'dst_ip': '192.168.1.101',
+    'src_port': 12345,
+    'dst_port': 80,
+    'initial_seq': 1000,
+    'latency': 0.01,
+    'bandwidth': 10_000_000,
+    'seed': 7,
+}
+
+@pytest.mark.parametrize("algorithm", ["reno", "cubic", "bbr"])
+def test_transfer_completes_under_loss(algorithm):
+    """测试各拥塞控制算法在丢包链路上都能完整送达数据"""
+    config = dict(CONFIG, transfer_bytes=300_000, loss_rate=0.02, congestion_control=algorithm)
+    simulation = OfflineSimulation(config)
+    received = []
+    simulation.server.on_send = lambda endpoint, segment: received.append(endpoint)
+    
+    stats = simulation.run()
+    
+    assert stats['completed'] == 1
+    assert stats['bytes_delivered'] == 300_000
+    assert stats['retransmitted_segments'] > 0
+    assert stats['goodput'] > 0
+    assert received[-1].receiver.received == 300_000
+
+def test_transfer_without_loss_has_no_retransmissions():
+    """测试无丢包时数据一次发完，吞吐量不超过链路带宽"""
+    simulation = OfflineSimulation(dict(CONFIG, transfer_bytes=200_000))
+    
+    stats = simulation.run()
+    
+    assert stats['bytes_delivered'] == 200_000
+    assert stats['retransmitted_segments'] == 0
+    assert 0 < stats['goodput'] <= CONFIG['bandwidth']
+
+def test_close_waits_for_data_acked():
+    """测试写入的数据全部被确认后才发送FIN"""
+    simulation = OfflineSimulation(dict(CONFIG, transfer_bytes=50_000))
+    events = []
+    
+    def record(endpoint, segment):
+        if endpoint.sender is not None:
+            events.append((segment.flags & 0x01, endpoint.sender.done))
+    
+    simulation.client.on_send = record
+    simulation.run()
+    
+    fins = [done for fin, done in events if fin]
+    assert fins == [True]
+
+def test_segments_share_source_buffer(tmp_path):
+    """测试报文段负载是源数据的切片，写入pcap后内容正确"""
+    source = bytearray(b"0123456789" * 2000)
+    simulation = OfflineSimulation(CONFIG)
+    segments = []
+    simulation.on_send = lambda endpoint, segment: segment.payload and segments.append(segment)
+    simulation.client.connect(CONFIG['dst_ip'], CONFIG['dst_port'], data=source, close_after=0.0)
+    
+    simulation.run(connections=0)
+    
+    assert sum(len(segment.payload) for segment in segments) == len(source)
+    assert all(segment.payload.obj is source for segment in segments)
+    
+    filename = str(tmp_path / "transfer.pcap")
+    with PcapWriter(filename) as writer:
+        for segment in segments:
+            writer.write(segment.to_parts(), 0.0)
+    packets = rdpcap(filename)
+    assert b"".join(packet[Raw].load for packet in packets) == bytes(source)
+    assert [bytes(packet) for packet in packets] == [segment.to_bytes() for segment in segments]
+
+def test_captured_segments_carry_advertised_window(tmp_path):
+    """测试写入pcap的报文段携带仿真中通告的接收窗口，校验和仍然正确"""
+    filename = str(tmp_path / "window.pcap")
+    OfflineSimulation(dict(CONFIG, transfer_bytes=20_000, rcv_wnd=12345)).run(pcap_filename=filename)
+    
+    packets = rdpcap(filename)
+    assert any(Raw in packet for packet in packets)
+    assert {packet[TCP].window for packet in packets} == {12345}
+    for packet in packets:
+        rebuilt = IP(bytes(packet))
+        del rebuilt[IP].chksum, rebuilt[TCP].chksum
+        assert bytes(rebuilt) == bytes(packet)
+    
+    segment = Segment("10.0.0.1", "10.0.0.2", 1, 2, ACK, 3, 4, window=512)
+    assert segment.to_packet()[TCP].window == 512
+    assert IP(segment.to_bytes())[TCP].window == 512
+
+def test_open_payload_maps_file(tmp_path):
+    """测试文件以内存映射方式打开，可以只取前size字节"""
+    path = tmp_path / "payload.bin"
+    path.write_bytes(b"abcdef")
+    
+    assert bytes(open_payload(str(path))) == b"abcdef"
+    assert bytes(open_payload(path, size=3)) == b"abc"
+    assert bytes(open_payload(size=4)) == bytes(4)
+    assert len(open_payload()) == 0
+    
+    empty = tmp_path / "empty.bin"
+    empty.write_bytes(b"")
+    assert len(open_payload(empty)) == 0
+
+def test_transfer_file(tmp_path):
+    """测试transfer_file的内容被完整送达"""
+    path = tmp_path / "payload.bin"
+    path.write_bytes(bytes(range(256)) * 400)
+    simulation = OfflineSimulation(dict(CONFIG, transfer_file=str(path), loss_rate=0.01))
+    
+    stats = simulation.run()
+    
+    assert stats['bytes_delivered'] == 102_400
+
+def test_receiver_reassembles_out_of_order():
+    """测试接收方缓存乱序报文段，缺口补上后一次交付"""
+    receiver = DataReceiver(65535)
+    rcv_nxt = 1000
+    
+    rcv_nxt = receiver.accept(2000, 1000, rcv_nxt)
+    assert rcv_nxt == 1000
+    rcv_nxt = receiver.accept(3000, 500, rcv_nxt)
+    assert rcv_nxt == 1000
+    rcv_nxt = receiver.accept(1000, 1000, rcv_nxt)
+    assert rcv_nxt == 3500
+    assert receiver.received == 2500
+    
+    # 重复的报文段不重复计数
+    assert receiver.accept(1000, 1000, rcv_nxt) == 3500
+    assert receiver.received == 2500
+
+def test_receiver_wraps_sequence_space():
+    """测试接收序列号跨越2^32回绕"""
+    receiver = DataReceiver(65535)
+    start = (1 << 32) - 500
+    
+    rcv_nxt = receiver.accept(start, 1000, start)
+    
+    assert rcv_nxt == 500
+    assert receiver.received == 1000
+
+def test_reno_window_growth_and_loss():
+    """测试Reno慢启动、拥塞避免和快速重传后的窗口"""
+    cc = Reno(1000, initial_window=2)
+    cc.on_ack(1000, 0.1, None, 0.0, 0)
+    assert cc.cwnd == 3000
+    
+    cc.on_loss(0.1, 8000)
+    assert cc.ssthresh == cc.cwnd == 4000
+    cc.on_ack(1000, 0.1, None, 0.2, 0)
+    assert cc.cwnd == pytest.approx(4250)
+    
+    cc.on_timeout(0.3, 4000)
+    assert cc.cwnd == 1000
+
+def test_cubic_reduces_by_beta():
+    """测试CUBIC丢包后窗口乘以0.7，之后向丢包前的窗口增长"""
+    cc = Cubic(1000, initial_window=100)
+    cc.on_loss(0.0, 100_000)
+    assert cc.cwnd == pytest.approx(70_000)
+    
+    before = cc.cwnd
+    for i in range(1, 200):
+        cc.on_ack(1000, 0.05, None, i * 0.05, 0)
+    assert before < cc.cwnd
+
+def test_unknown_congestion_control():
+    """测试未知的拥塞控制算法名称"""
+    with pytest.raises(ConfigurationError):
+        create_congestion_control("vegas", 1460)
\ No newline at end of file